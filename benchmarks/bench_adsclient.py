@@ -0,0 +1,363 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+'''
+Benchmarks of the ADS cycle on a simulated ADS server (FakeConnection)
+
+Usage:
+    python benchmarks/bench_adsclient.py [--quick] [--latency 0.0005] [--output results.json]
+
+The results are written as JSON, one entry per benchmark, durations in ms.
+'''
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from adsclientthread import AdsClienthandler
+from models.adsdata import Adsdata
+from models.adsrecorder import Adsrecorder
+from models.adsreplay import Adsreplay
+from models.adssnapshot import Adssnapshot
+from utils.ads_vars import Ads_Vars
+from utils.fakeconnection import FakeConnection
+
+
+DATATYPES = ('BOOL', 'INT', 'DINT', 'REAL', 'LREAL')
+
+
+def symboltable(count:int)->dict:
+    '''
+    Return: ads name -> datatype of count symbols with mixed datatypes
+    '''
+    return {'GVL.var' + str(i): DATATYPES[i % len(DATATYPES)] for i in range(count)}
+
+
+def symbolfile(symbols:dict, writeratio:float=0.5)->str:
+    '''
+    Write the ads symbol list of the symbols, the first writeratio are write symbols
+
+    Return: Path of the temporary symbol list
+    '''
+    writecount = int(len(symbols) * writeratio)
+    lines = ['symbols:']
+
+    for i, (adsname, datatype) in enumerate(symbols.items()):
+        lines.append('  ' + adsname + ':')
+        lines.append('    type: ' + datatype)
+        lines.append('    mode: ' + ('W' if i < writecount else 'R'))
+
+    file = tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False)
+    file.write('\n'.join(lines) + '\n')
+    file.close()
+
+    return file.name
+
+
+def summarize(durations)->dict:
+    '''
+    Return: Statistics of the durations [s] in ms
+    '''
+    durations = sorted(durations)
+    count = len(durations)
+
+    return {'count': count,
+            'mean': sum(durations) / count * 1000.0,
+            'p50': durations[count // 2] * 1000.0,
+            'p99': durations[min(count - 1, int(count * 0.99))] * 1000.0,
+            'max': durations[-1] * 1000.0}
+
+
+def measure(func, repeat:int)->dict:
+    durations = list()
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return summarize(durations)
+
+
+def createmodel(count:int, latency:float):
+    '''
+    Return: (Adsdata with resolved symbols, FakeConnection, path of the symbol list)
+    '''
+    symbols = symboltable(count)
+    path = symbolfile(symbols)
+    plc = FakeConnection(symbols=symbols, latency=latency)
+    adsmodel = Adsdata(path)
+    adsmodel.resolvesymbols(plc)
+
+    return adsmodel, plc, path
+
+
+def bench_startup(sizes):
+    results = list()
+
+    for count in sizes:
+        path = symbolfile(symboltable(count))
+        cachepath = path + '.cache'
+
+        try:
+            start = time.perf_counter()
+            Ads_Vars(path)
+            duration = time.perf_counter() - start
+
+            # The first start compiles the symbol cache
+            Ads_Vars(path, cachepath)
+            start = time.perf_counter()
+            Ads_Vars(path, cachepath)
+            cached = time.perf_counter() - start
+
+        finally:
+            os.remove(path)
+            if os.path.exists(cachepath):
+                os.remove(cachepath)
+
+        results.append({'benchmark': 'ads_vars_startup', 'params': {'symbols': count},
+                        'duration': duration * 1000.0})
+        results.append({'benchmark': 'ads_vars_startup_cached', 'params': {'symbols': count},
+                        'duration': cached * 1000.0})
+
+    return results
+
+
+def bench_cycle(sizes, latency:float, repeat:int):
+    results = list()
+
+    for count in sizes:
+        adsmodel, plc, path = createmodel(count, latency)
+
+        try:
+            adsmodel.readads(plc)
+            requests = plc.requests
+            read = measure(lambda: adsmodel.readads(plc), repeat)
+            read['requests'] = (plc.requests - requests) / repeat
+
+            writenames = list(adsmodel.writedict)
+
+            def writecycle():
+                for adsname in writenames:
+                    adsmodel.write(adsname, adsmodel.read(adsname))
+                adsmodel.writeads(plc)
+
+            write = measure(writecycle, repeat)
+
+            rawresult = {adsname: bytes(plc.memory[adsname]) for adsname in adsmodel.readlist}
+            update = measure(lambda: adsmodel.updatereaddata({}, rawresult), repeat)
+
+        finally:
+            os.remove(path)
+
+        params = {'symbols': count, 'latency': latency}
+        results.append(dict({'benchmark': 'readads', 'params': params}, **read))
+        results.append(dict({'benchmark': 'writeads_all_changed', 'params': params}, **write))
+        results.append(dict({'benchmark': 'updatereaddata', 'params': params}, **update))
+
+    return results
+
+
+def bench_contention(count:int, readers, latency:float, duration:float):
+    results = list()
+
+    for readercount in readers:
+        for mode in ('read', 'snapshot'):
+            adsmodel, plc, path = createmodel(count, latency)
+            names = list(adsmodel.readlist)
+            reads = [0] * readercount
+            window = [0.0]
+            barrier = threading.Barrier(readercount + 1)
+
+            # The readers stop by themselves, an unfair lock can starve the ADS cycle
+            def reader(i):
+                rand = random.Random(i)
+                barrier.wait()
+                while time.perf_counter() < window[0]:
+                    adsname = names[rand.randrange(len(names))]
+                    if mode == 'read':
+                        adsmodel.read(adsname)
+                    else:
+                        adsmodel.getsnapshot().read(adsname)
+                    reads[i] += 1
+
+            threads = [threading.Thread(target=reader, args=(i,)) for i in range(readercount)]
+            for thread in threads:
+                thread.start()
+
+            cycles = list()
+            window[0] = time.perf_counter() + duration
+            barrier.wait()
+
+            try:
+                while not cycles or time.perf_counter() < window[0]:
+                    start = time.perf_counter()
+                    adsmodel.readads(plc)
+                    cycles.append(time.perf_counter() - start)
+
+            finally:
+                for thread in threads:
+                    thread.join()
+                os.remove(path)
+
+            result = {'benchmark': 'read_contention', 'params': {'symbols': count, 'readers': readercount,
+                                                                  'mode': mode, 'latency': latency},
+                      'reads_per_second': sum(reads) / duration}
+            result['cycle'] = summarize(cycles)
+            results.append(result)
+
+    return results
+
+
+def bench_jitter(count:int, latency:float, cycletime:float, duration:float):
+    symbols = symboltable(count)
+    path = symbolfile(symbols)
+    config = types.SimpleNamespace(adsserver_netid='127.0.0.1.1.1',
+                                   adsnotificationmode=False,
+                                   adsreconnectmindelay=100,
+                                   adsreconnectmaxdelay=5000,
+                                   adskeepaliveinterval=1000,
+                                   adsoutagewrites='buffer')
+    run_event = threading.Event()
+    run_event.set()
+
+    try:
+        handler = AdsClienthandler("ADS client", run_event, config, Adsdata(path),
+                                   cycletime=cycletime,
+                                   connection=lambda netid, port: FakeConnection(netid, port, symbols, latency))
+        handler.start()
+        time.sleep(duration)
+        run_event.clear()
+        handler.join()
+
+    finally:
+        os.remove(path)
+
+    return [dict({'benchmark': 'cycle_jitter', 'params': {'symbols': count, 'latency': latency,
+                                                          'cycletime': cycletime * 1000.0}},
+                 **handler.scheduler.stats.summary())]
+
+
+def bench_recorder(count:int, changes:int, cycles:int):
+    '''
+    Cost of the recorder writer thread per cycle, with changes random bytes changed per cycle
+    '''
+    adsmodel, plc, path = createmodel(count, 0.0)
+    output = path + '.rec'
+    image = adsmodel.adsdata.image
+    rand = random.Random(0)
+    snapshots = list()
+
+    for cycle in range(cycles):
+        for i in range(changes):
+            image[rand.randrange(len(image))] ^= 1
+        snapshots.append(Adssnapshot(cycle + 1, 0.0, adsmodel.adsdata))
+
+    recorder = Adsrecorder(adsmodel, output)
+    recorder.openfile()
+
+    try:
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            recorder.record(time.monotonic_ns(), snapshot)
+        recorder.flush()
+        duration = time.perf_counter() - start
+
+    finally:
+        recorder.closefile()
+        os.remove(output)
+        os.remove(path)
+
+    return [{'benchmark': 'recorder_cycle', 'params': {'symbols': count, 'changes': changes},
+             'mean': duration / cycles * 1000.0,
+             'bytes_per_cycle': recorder.stats['bytes'] / cycles}]
+
+
+def bench_replay(count:int, changes:int, cycles:int):
+    '''
+    Cycles per second of the model replaying a recording as fast as possible
+    '''
+    adsmodel, plc, path = createmodel(count, 0.0)
+    output = path + '.rec'
+    names = list(plc.memory)
+    rand = random.Random(0)
+    recorder = Adsrecorder(adsmodel, output)
+    recorder.start()
+
+    try:
+        for cycle in range(cycles):
+            for i in range(changes):
+                adsname = names[rand.randrange(len(names))]
+                plc.setvalue(adsname, rand.randrange(2))
+            adsmodel.readads(plc)
+        recorder.stop()
+
+        replay = Adsreplay(Adsdata(path), output)
+        stats = replay.run()
+
+    finally:
+        os.remove(output)
+        os.remove(path)
+
+    return [{'benchmark': 'replay', 'params': {'symbols': count, 'cycles': stats['cycles']},
+             'mean': stats['duration'] / max(stats['cycles'], 1) * 1000.0,
+             'cycles_per_second': stats['cyclespersecond']}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the ADS cycle on a simulated ADS server")
+    parser.add_argument('--quick', action='store_true', help="small symbol tables and short runs")
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated delay of each ADS request [s]")
+    parser.add_argument('--output', help="path of the JSON results, default stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.quick:
+        startupsizes, cyclesizes, repeat, duration = (1000, 5000), (100, 1000), 20, 0.5
+    else:
+        startupsizes, cyclesizes, repeat, duration = (1000, 10000, 100000), (100, 1000, 10000), 200, 2.0
+
+    results = list()
+    results += bench_startup(startupsizes)
+    results += bench_cycle(cyclesizes, args.latency, repeat)
+    results += bench_contention(cyclesizes[-1], (1, 4, 16), args.latency, duration)
+    results += bench_jitter(cyclesizes[-1], args.latency, 0.005, duration)
+    results += bench_recorder(5000, 50, repeat * 10)
+    results += bench_replay(cyclesizes[-1], 50, repeat * 10)
+
+    report = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'timestamp': time.time(),
+              'results': results}
+
+    output = json.dumps(report, indent=2, default=str)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pyads
+from adsclientthread import AdsClienthandler
+from models.adsdata import Adsdata
+from utils.yamlconfig import yamlconfig
+
+
+class AsyncAdsClient(object):
+    '''
+    An asyncio client class
+
+    Drives the same Adsdata model as AdsClienthandler from an event loop.
+    All blocking pyads calls run in one dedicated executor thread; the
+    consumers read the lock-free snapshots of the model.
+
+    Usage:
+        async with AsyncAdsClient(config, adsmodel) as client:
+            value = await client.read('GVL.input01')
+            async for adsdataname, value in client.changes(['GVL.input01']):
+                ...
+    '''
+
+    def __init__(self, config:yamlconfig,
+                 adsmodel:Adsdata,
+                 netid:str=None,
+                 port:int=pyads.PORT_TC3PLC1,
+                 cycletime:float=None,
+                 overrunpolicy:str=None,
+                 queuesize:int=100,
+                 connection=None)-> None:
+        '''
+        Args:
+            netid [String]: AMS net id of the target, None -> ads_server_netid of the config
+            port [int]: AMS port of the PLC runtime
+            cycletime [float]: cycle time of the ADS cycles [s], None -> ads_cycle_time of the config
+            overrunpolicy [String]: skip, catchup or log, None -> ads_overrun_policy of the config
+            queuesize [int]: max. pending changes of each subscriber, the oldest are dropped
+            connection [FUNCTION]: connection(netid, port) creates the ADS connection,
+                                   None -> pyads.Connection
+        '''
+        self.config = config
+        self.adsmodel = adsmodel
+        self.netid = netid
+        self.port = port
+        self.cycletime = cycletime if cycletime is not None else config.adscycletime / 1000.0
+        self.overrunpolicy = overrunpolicy if overrunpolicy is not None else config.adsoverrunpolicy
+        self.queuesize = queuesize
+        self.connection = connection
+        self.handler = None
+        self.executor = None
+        self.task = None
+        self.cyclewaiters = list()
+        self.subscribers = list()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def runblocking(self, func, *args):
+        '''
+        Run a blocking call in the ADS executor thread
+        '''
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def start(self):
+        '''
+        Connect to the ADS server and start the ADS cycles.
+        If the ADS server is not reachable, the cycles reconnect in the background.
+        '''
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='ADS client')
+
+        # The handler is not started as thread, the cycles run in the executor
+        run_event = threading.Event()
+        run_event.set()
+        self.handler = await self.runblocking(lambda: AdsClienthandler(handlername="ADS client",
+                                                                       run_event=run_event,
+                                                                       config=self.config,
+                                                                       adsmodel=self.adsmodel,
+                                                                       netid=self.netid,
+                                                                       port=self.port,
+                                                                       cycletime=self.cycletime,
+                                                                       overrunpolicy=self.overrunpolicy,
+                                                                       connection=self.connection))
+
+        if not await self.runblocking(self.handler.connect):
+            logging.error("Cannot connect to ADS server " + str(self.handler.netid) + ". Retry in the background.")
+
+        self.task = asyncio.get_running_loop().create_task(self.runcycles())
+
+    async def stop(self):
+        '''
+        Stop the ADS cycles and close the connection
+        '''
+        if self.task is not None:
+            self.task.cancel()
+
+            try:
+                await self.task
+
+            except asyncio.CancelledError:
+                pass
+
+            self.task = None
+
+        if self.handler is not None:
+            await self.runblocking(self.handler.disconnect)
+
+        for waiter in self.cyclewaiters:
+            if not waiter.done():
+                waiter.cancel()
+
+        self.cyclewaiters = list()
+
+        # Not started or start() failed
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    async def runcycles(self):
+        '''
+        Run the ADS cycles on the deadlines of the scheduler
+        '''
+        scheduler = self.handler.scheduler
+        scheduler.start()
+        previous = self.adsmodel.getsnapshot()
+
+        while True:
+            await asyncio.sleep(scheduler.timeout())
+
+            if not scheduler.release():
+                continue
+
+            try:
+                await self.runblocking(self.handler.runcycle)
+
+            except Exception as e:
+                logging.error("ERROR!: cannot read/write ADS server :" + str(e))
+                continue
+
+            snapshot = self.adsmodel.getsnapshot()
+
+            # No new cycle while the connection is lost
+            if snapshot is previous:
+                continue
+
+            self.publish(previous, snapshot)
+            previous = snapshot
+
+    def publish(self, previous, snapshot):
+        '''
+        Complete the cycle waiters and notify the subscribers of changed values
+        '''
+        waiters = self.cyclewaiters
+        self.cyclewaiters = list()
+
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(snapshot)
+
+        if not self.subscribers:
+            return
+
+        # Compare each subscribed symbol once per cycle
+        adsdatanames = set()
+        for names, queue in self.subscribers:
+            adsdatanames.update(names)
+
+        changed = set(snapshot.changed(previous, adsdatanames))
+
+        for names, queue in self.subscribers:
+            for adsdataname in names:
+                if adsdataname not in changed:
+                    continue
+
+                if queue.full():
+                    # Slow consumer -> drop the oldest change
+                    queue.get_nowait()
+
+                queue.put_nowait((adsdataname, snapshot[adsdataname]))
+
+    async def waitcycle(self):
+        '''
+        Wait for the completion of the next ADS cycle
+
+        Return: Snapshot of the cycle
+        '''
+        waiter = asyncio.get_running_loop().create_future()
+        self.cyclewaiters.append(waiter)
+        return await waiter
+
+    async def read(self, adsdataname, nextcycle:bool=False):
+        '''
+        Read single data of the last completed cycle
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+            nextcycle [bool]: True -> wait for the next cycle
+        '''
+        snapshot = await self.waitcycle() if nextcycle else self.adsmodel.getsnapshot()
+        return snapshot.read(adsdataname)
+
+    async def write(self, adsdataname, value, wait:bool=False):
+        '''
+        Write single data to model, sent to the PLC in the next cycle
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+            wait [bool]: True -> wait until the next cycle is completed
+        '''
+        self.adsmodel.write(adsdataname, value)
+
+        if wait:
+            await self.waitcycle()
+
+    async def writenow(self, values:dict, confirm:bool=False):
+        '''
+        Write data to the PLC immediately, between two cycles
+
+        Args:
+            values [DICT]: Ads variable name -> value of write symbols
+            confirm [bool]: read the values back after the write
+
+        Return: Adsurgentwrite with the result and the latency
+        '''
+        request = self.adsmodel.writenow(values, confirm)
+
+        if not request.done:
+            await self.runblocking(self.handler.runurgent)
+
+        return request
+
+    async def changes(self, adsdatanames):
+        '''
+        Async iterator of the value changes of the symbols
+
+        Args:
+            adsdatanames [LIST]: names of the subscribed symbols
+
+        Yield: (ads name, value)
+        '''
+        subscriber = (frozenset(adsdatanames), asyncio.Queue(self.queuesize))
+        self.subscribers.append(subscriber)
+
+        try:
+            while True:
+                yield await subscriber[1].get()
+
+        finally:
+            self.subscribers.remove(subscriber)
@@ -0,0 +1,227 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Event
+import pyads
+from adsclientthread import AdsClienthandler
+from models.adsdata import Adsdata
+from models.adsfacade import Adsfacade
+from utils.ads_metrics import Ads_Metrics, Ads_MetricsServer
+from utils.yamlconfig import yamlconfig
+
+
+class AdsClientmanager(Thread):
+    '''
+    A manager class
+
+    Runs the ADS cycles of several targets (PLCs) on one shared thread pool.
+    Each target has its own connection, ADS data model and cycle time.
+    The urgent writes of all targets wake up the manager loop, they are sent
+    between two cycles of their target.
+    '''
+    # Max. sleep of the manager loop [s], checks the run event
+    MAXWAIT = 0.1
+
+    def __init__(self, managername,
+                 run_event:Event,
+                 config:yamlconfig,
+                 workers:int=4,
+                 metrics=None,
+                 connection=None)-> None:
+        '''
+        Args:
+            workers [int]: number of threads running the ADS cycles of all targets
+            metrics [Ads_Metrics]: metrics shared by all targets, None -> disabled
+            connection [FUNCTION]: connection(netid, port) creates the ADS connections,
+                                   None -> pyads.Connection
+        '''
+        Thread.__init__(self, target=None, name=managername)
+        self.run_event = run_event
+        self.config = config
+        self.workers = workers
+        self.metrics = metrics
+        self.connection = connection
+        self.handlers = {}
+        self.facade = Adsfacade()
+        self.wakeup = threading.Event()
+        self.isReadyToStop = False
+
+        for targetname, target in config.adstargets.items():
+            self.addtarget(targetname, target)
+
+    def addtarget(self, targetname:str, target:dict):
+        '''
+        Create the ADS data model and the handler of a target
+
+        Args:
+            target [DICT]: ads_server_netid, ads_port, ads_var_list_path and cycle_time [ms]
+        '''
+        try:
+            adsmodel = Adsdata(filepath=target.get('ads_var_list_path', self.config.adsvarlistpath),
+                               fullwritecycles=self.config.adsfullwritecycles,
+                               maxsubcommands=self.config.adsmaxsubcommands,
+                               maxchunkbytes=self.config.adsmaxchunkbytes,
+                               parallelchunks=self.config.adsparallelchunks,
+                               snapshothistory=self.config.adssnapshothistory,
+                               metrics=self.metrics,
+                               symbolcache=self.config.adssymbolcache,
+                               maxreadgap=self.config.adsmaxreadgap)
+
+            handler = AdsClienthandler(handlername=str(targetname),
+                                       run_event=self.run_event,
+                                       config=self.config,
+                                       adsmodel=adsmodel,
+                                       netid=target['ads_server_netid'],
+                                       port=target.get('ads_port', pyads.PORT_TC3PLC1),
+                                       cycletime=target.get('cycle_time', self.config.adscycletime) / 1000.0,
+                                       overrunpolicy=target.get('overrun_policy', self.config.adsoverrunpolicy),
+                                       connection=self.connection)
+
+            # writenow() of the target wakes up the manager loop
+            adsmodel.urgentevent = self.wakeup
+            self.handlers[targetname] = handler
+            self.facade.addmodel(targetname, adsmodel)
+            logging.info("Successfully add the ads target [" + str(targetname) + "]")
+
+        except Exception as e:
+            logging.error("Cannot add the ads target [" + str(targetname) + "]: " + str(e))
+
+    def getstats(self):
+        '''
+        Return: Health statistics of each target
+        '''
+        return {targetname: dict(handler.stats, scheduler=handler.scheduler.stats.summary())
+                for targetname, handler in self.handlers.items()}
+
+    def run(self):
+        '''
+        Overwrite run method of Thread
+        '''
+        if not self.handlers:
+            logging.error("No ads target. Manager stop.")
+            self.isReadyToStop = True
+            return
+
+        executor = ThreadPoolExecutor(max(self.workers, 1))
+
+        # Connect all targets in parallel, unreachable targets reconnect in their cycles
+        ready = dict(zip(self.handlers, executor.map(lambda handler: handler.connect(),
+                                                     self.handlers.values())))
+
+        for targetname, isReady in ready.items():
+            if not isReady:
+                logging.error("Cannot connect the ads target [" + str(targetname) + "]. Retry in the background.")
+
+        handlers = dict(self.handlers)
+        running = {}
+
+        for handler in handlers.values():
+            handler.scheduler.start()
+
+        while self.run_event.is_set() and handlers:
+            # Set by a finished cycle, an urgent write or by stop()
+            self.wakeup.clear()
+            now = time.monotonic()
+            timeout = self.MAXWAIT
+
+            for targetname, handler in list(handlers.items()):
+                future = running.get(targetname)
+
+                if future is not None:
+                    if not future.done():
+                        continue
+
+                    del running[targetname]
+
+                    if future.exception() is not None:
+                        logging.error("ERROR!: cannot read/write the ads target [" + str(targetname) + "]: "
+                                      + str(future.exception()))
+
+                # The next cycle of a target starts at its deadline, it sends the urgent writes first
+                if handler.scheduler.release(now):
+                    running[targetname] = executor.submit(handler.runcycle)
+                    running[targetname].add_done_callback(lambda future: self.wakeup.set())
+
+                # Urgent writes between two cycles, the deadline is not changed
+                elif handler.adsmodel.urgentwrites:
+                    running[targetname] = executor.submit(handler.runurgent)
+                    running[targetname].add_done_callback(lambda future: self.wakeup.set())
+
+                else:
+                    timeout = min(timeout, handler.scheduler.timeout(now))
+
+            # Sleep until the next deadline, the end of a cycle or an urgent write
+            self.wakeup.wait(timeout)
+
+        executor.shutdown(wait=True)
+
+        for handler in handlers.values():
+            handler.disconnect()
+
+        self.isReadyToStop = True
+
+    def stop(self):
+        '''
+        Stop all targets
+        '''
+        logging.info("Terminating all ads targets ... ")
+        self.run_event.clear()
+        self.wakeup.set()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG, format='%(levelname)s %(threadName)s %(message)s')
+
+    logging.info("Initializing ....")
+
+    # Init run event
+    run_event = threading.Event()
+
+    #Get config
+    config = yamlconfig(configpath='./configs/config.yml')
+
+    # Set run event
+    run_event.set()
+
+    # Init metrics, disabled -> no overhead
+    metrics = None
+    if config.adsmetrics:
+        metrics = Ads_Metrics()
+
+        if config.adsmetricsport:
+            Ads_MetricsServer(metrics, port=config.adsmetricsport).start()
+
+    # Init the ads client manager with all targets of the config
+    adsclientmanager = AdsClientmanager(managername="ADS manager",
+                                        run_event=run_event,
+                                        config=config,
+                                        workers=config.adsworkers,
+                                        metrics=metrics)
+
+    # Start thread
+    adsclientmanager.start()
+
+     # Stop when KeyboardInterrupt
+    try:
+        while 1:
+            if adsclientmanager.isReadyToStop:
+                adsclientmanager.join()
+                break
+            time.sleep(0.1)
+
+    except KeyboardInterrupt:
+        logging.info("Terminating ... ")
+        run_event.clear()
@@ -19,6 +19,14 @@ from threading import Thread, Event
 import logging
 import pyads
 from models.adsdata import Adsdata
+from models.adsgateway import Adsgateway
+from models.adsrecorder import Adsrecorder
+from models.adsreplay import Adsreplayconnection
+from models.adssharedimage import Adssharedimage
+from models.adssymbolwatcher import Adssymbolwatcher
+from utils.ads_metrics import Ads_Metrics, Ads_MetricsServer
+from utils.ads_scheduler import Ads_Scheduler
+from utils.fakeconnection import FakeConnection
 from utils.yamlconfig import yamlconfig
 
 
@@ -27,12 +35,36 @@ class AdsClienthandler(Thread):
     An handler class
 
     ADS client for controlling cameras
+
+    The connection is supervised: a lost connection is detected by failed
+    requests or the keep-alive, and reconnected in the background with
+    exponential backoff. The symbols are resolved again after each reconnect.
     '''
+    DISCONNECTED = 'disconnected'
+    CONNECTED = 'connected'
+
+    # Writes during a connection loss: buffer -> write after the reconnect, drop -> discard
+    BUFFER = 'buffer'
+    DROP = 'drop'
 
     def __init__(self, handlername, 
                 run_event:Event, 
                 config:yamlconfig,
-                adsmodel:Adsdata)-> None:
+                adsmodel:Adsdata,
+                netid:str=None,
+                port:int=pyads.PORT_TC3PLC1,
+                cycletime:float=0.01,
+                overrunpolicy:str=Ads_Scheduler.SKIP,
+                connection=None)-> None:
+        '''
+        Args:
+            netid [String]: AMS net id of the target, None -> ads_server_netid of the config
+            port [int]: AMS port of the PLC runtime
+            cycletime [float]: cycle time of the ADS cycles [s]
+            overrunpolicy [String]: skip, catchup or log, see Ads_Scheduler
+            connection [FUNCTION]: connection(netid, port) creates the ADS connection,
+                                   None -> pyads.Connection
+        '''
 
         # init process attrributes
         Thread.__init__(self, target=None, name=handlername)
@@ -40,71 +72,260 @@ class AdsClienthandler(Thread):
         self.adsmodel = adsmodel
         self.run_event = run_event
         self.config = config
+        self.netid = netid if netid is not None else config.adsserver_netid
+        self.port = port
+        self.cycletime = cycletime
+        self.adsmodel.setcycletime(cycletime)
+        self.scheduler = Ads_Scheduler(cycletime, overrunpolicy)
+        self.connection = connection
+        self.metrics = adsmodel.metrics
+        self.plc = None
+        self.state = self.DISCONNECTED
         self.isconnected = False
         self.isReadyToStop = False
 
-        # Checking PLC connection
-        self.testconnection()
+        # Reconnect and keep-alive settings [s]
+        self.reconnectmindelay = config.adsreconnectmindelay / 1000.0
+        self.reconnectmaxdelay = config.adsreconnectmaxdelay / 1000.0
+        self.keepaliveinterval = config.adskeepaliveinterval / 1000.0
+        self.outagewrites = config.adsoutagewrites
+        self.reconnectdelay = 0.0
+        self.nextretry = 0.0
+        self.nextkeepalive = 0.0
+
+        # Symbols of the ads symbol list missing in the PLC, reported once
+        self.missingsymbols = set()
+
+        self.stats = {'connected': False,
+                      'state': self.state,
+                      'reconnects': 0,
+                      'cycles': 0,
+                      'errors': 0,
+                      'lasterror': None,
+                      'duration': 0.0,
+                      'timestamp': None}
+
+
+    def createconnection(self):
+        '''
+        Return: New ADS connection to the target
+        '''
+        if self.connection is not None:
+            return self.connection(self.netid, self.port)
 
+        return pyads.Connection(self.netid, self.port)
 
-    def testconnection(self):
+    def setstate(self, state:str):
+        self.state = state
+        self.isconnected = state == self.CONNECTED
+        self.stats['state'] = state
+        self.stats['connected'] = self.isconnected
+
+    def connect(self)->bool:
         '''
-        Test connection to ADS server
+        Open the connection, resolve all symbols and register the device notifications.
+        If it fails, the next attempt is scheduled with exponential backoff.
+        Symbols missing in the PLC are a config error, reported once and skipped by the ADS cycles.
+
+        Return: True -> Ready for ADS cycles, False -> Cannot connect
         '''
+        notFoundSymbol = True
+
         try:
-            logging.info("Testing connection to ADS server ...")
-            self.plc = pyads.Connection(self.config.adsserver_netid,
-                                        pyads.PORT_TC3PLC1)
+            # Build connection
+            self.plc = self.createconnection()
             self.plc.open()
-            self.isconnected = True
-            logging.info("Successfully connected to ADS Server.")
-            self.plc.close()
+
+            # pyads opens the connection without a request, a missing symbol shall not hide an unreachable target
+            self.plc.read_state()
+
+            # check if all sysbols exists in the target plc and resolve their handles
+            notFoundSymbol = self.adsmodel.resolvesymbols(self.plc) and not self.adsmodel.unresolved
+
+            if self.adsmodel.unresolved != self.missingsymbols:
+                self.missingsymbols = set(self.adsmodel.unresolved)
+
+                if self.missingsymbols:
+                    logging.error("Cannot find the ads symbols " + ", ".join(sorted(self.missingsymbols)) +
+                                  " of [" + str(self.netid) + "]. They are not read or written.")
+
+            if notFoundSymbol:
+                logging.error("Cannot resolve the ads symbols of [" + str(self.netid) + "].")
+
+            elif self.config.adsnotificationmode:
+                # register device notifications instead of polling
+                self.adsmodel.addnotifications(self.plc)
 
         except Exception as e:
-            errmsg = "ERROR!: cannot connect to ADS server :"
-            errmsg = errmsg + str(e)
-            logging.error(errmsg)
+            self.stats['lasterror'] = str(e)
+            logging.error("Cannot connect to ADS server: " + str(e))
 
+        if notFoundSymbol:
+            self.closeconnection()
+            self.reconnectdelay = min(max(self.reconnectdelay * 2, self.reconnectmindelay), self.reconnectmaxdelay)
+            self.nextretry = time.monotonic() + self.reconnectdelay
+            self.setstate(self.DISCONNECTED)
+            logging.info("Reconnect to [" + str(self.netid) + "] in " + str(self.reconnectdelay) + " s")
 
-    def run(self):
+            return False
+
+        self.reconnectdelay = 0.0
+        self.nextkeepalive = time.monotonic() + self.keepaliveinterval
+        self.setstate(self.CONNECTED)
+
+        return True
+
+    def reconnect(self)->bool:
         '''
-        Overwrite run method of Thread
+        Connect again after a connection loss and restart the cycle grid
+
+        Return: True -> Reconnected
         '''
-        if self.isconnected:
+        if not self.connect():
+            return False
 
-            try:
-                # Build connection
-                self.plc = pyads.Connection(self.config.adsserver_netid,
-                                        pyads.PORT_TC3PLC1)
-                self.plc.open()
+        self.stats['reconnects'] += 1
+        self.metrics.inc('ads_reconnects', target=self.name)
+
+        if self.outagewrites == self.DROP:
+            dropped = self.adsmodel.dropwrites()
+            if dropped:
+                logging.warning("Discard writes during the connection loss: " + str(dropped))
+
+        self.scheduler.start()
+        logging.info("Successfully reconnected to [" + str(self.netid) + "]")
+
+        return True
+
+    def connectionlost(self, error:Exception):
+        '''
+        Forget the connection and schedule the reconnect, the first attempt immediately
+        '''
+        logging.error("Lost connection to [" + str(self.netid) + "]: " + str(error))
+        self.stats['lasterror'] = str(error)
+        self.metrics.inc('ads_connection_losses', target=self.name)
+        self.adsmodel.resethandles()
+        self.closeconnection()
+        self.nextretry = time.monotonic()
+        self.setstate(self.DISCONNECTED)
+
+    def closeconnection(self):
+        try:
+            if self.plc is not None:
+                self.plc.close()
+
+        except Exception as e:
+            logging.debug("Cannot close ADS connection: " + str(e))
+
+    def keepalive(self):
+        '''
+        Read the ADS state if a request of the cycle failed or the keep-alive interval elapsed.
+        Raises an exception if the ADS server is not reachable.
+        '''
+        now = time.monotonic()
+        failed = any(stats['error'] for stats in self.adsmodel.readchunkstats + self.adsmodel.writechunkstats)
+
+        if failed or now >= self.nextkeepalive:
+            self.plc.read_state()
+            self.nextkeepalive = now + self.keepaliveinterval
+
+    def runcycle(self):
+        '''
+        Run one ADS cycle: write the changed data, then read all data.
+        Without connection, try to reconnect when the backoff delay elapsed.
+        '''
+        # Reload of the ads symbol list between two cycles
+        if self.adsmodel.pendingreload is not None:
+            self.adsmodel.applyreload(self.plc if self.state == self.CONNECTED else None,
+                                      notifications=self.config.adsnotificationmode)
+
+        if self.state != self.CONNECTED:
+            if time.monotonic() >= self.nextretry:
+                self.reconnect()
+            return
+
+        start = time.perf_counter()
 
-                # check if all sysbols exists in the target plc
-                notFoundSymbol = self.adsmodel.checkallsymbols(self.plc)
+        try:
+            # Urgent writes queued during the sleep go first
+            if self.adsmodel.urgentwrites:
+                self.adsmodel.writeurgent(self.plc)
+
+            # Write ads data
+            self.adsmodel.writeads(self.plc)
+            written = time.perf_counter()
+            self.scheduler.stats.addlatency('write', written - start)
+            self.metrics.observe('ads_write_seconds', written - start, target=self.name)
+
+            # Read ads data
+            self.adsmodel.readads(self.plc)
+            read = time.perf_counter()
+            self.scheduler.stats.addlatency('read', read - written)
+            self.metrics.observe('ads_read_seconds', read - written, target=self.name)
+
+            self.keepalive()
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.metrics.inc('ads_cycle_errors', target=self.name)
+            self.connectionlost(e)
+
+        finally:
+            self.scheduler.finish()
+            self.stats['cycles'] += 1
+            self.stats['duration'] = time.perf_counter() - start
+            self.stats['timestamp'] = time.time()
+            self.metrics.inc('ads_cycles', target=self.name)
+            self.metrics.observe('ads_cycle_seconds', self.stats['duration'], target=self.name)
+
+    def runurgent(self):
+        '''
+        Send the urgent writes between two cycles, the deadlines of the cycles are not changed
+        '''
+        start = time.perf_counter()
 
-                if notFoundSymbol:
-                    logging.error("Cannot find all ads symbols. Terminate the ads client thread")
+        # Urgent writes fail without connection, a late write is not intended
+        self.adsmodel.writeurgent(self.plc if self.state == self.CONNECTED else None)
+        self.scheduler.stats.addlatency('urgent', time.perf_counter() - start)
 
+    def disconnect(self):
+        '''
+        Delete the notifications, release the handles and close the connection
+        '''
+        if self.state == self.CONNECTED:
+            try:
+                # Clean up connection
+                self.adsmodel.delnotifications(self.plc)
+                self.adsmodel.releasehandles(self.plc)
 
             except Exception as e:
-                logging.error("Cannot connect to ADS server: " + str(e))
+                logging.error("Cannot close ADS connection: " + str(e))
+
+        self.closeconnection()
+        self.setstate(self.DISCONNECTED)
 
-            while self.run_event.is_set() and not notFoundSymbol:
+    def run(self):
+        '''
+        Overwrite run method of Thread
+        '''
+        if not self.connect():
+            logging.error("Cannot connect to ADS Server. Retry in the background.")
 
-                try:
+        self.scheduler.start()
 
-                    # Write ads data
-                    self.adsmodel.writeads(self.plc)
-                    # Read ads data
-                    self.adsmodel.readads(self.plc)
+        while self.run_event.is_set():
 
-                    time.sleep(0.01)
+            try:
+                # Sleep until the deadline of the next cycle or an urgent write
+                if self.scheduler.wait(self.adsmodel.urgentevent):
+                    self.runcycle()
+                else:
+                    self.runurgent()
 
-                except Exception as e:
-                    logging.error("ERROR!: cannot read/write ADS server :" +str(e))
-                    break
+            except Exception as e:
+                logging.error("ERROR!: cannot read/write ADS server :" +str(e))
 
-        else:
-            logging.error("Cannot connect to ADS Server. Thread stop.")
+        self.disconnect()
 
 
     def stop(self):
@@ -153,8 +374,63 @@ if __name__ == '__main__':
     #Get config
     config = yamlconfig(configpath='./configs/config.yml')
 
+    # Init metrics, disabled -> no overhead
+    metrics = None
+    if config.adsmetrics:
+        metrics = Ads_Metrics()
+
+        if config.adsmetricsport:
+            Ads_MetricsServer(metrics, port=config.adsmetricsport).start()
+
     # Init ads data models with ads symbol list
-    adsmodel = Adsdata(filepath='./configs/adssymbols.yml')
+    adsmodel = Adsdata(filepath='./configs/adssymbols.yml',
+                       fullwritecycles=config.adsfullwritecycles,
+                       maxsubcommands=config.adsmaxsubcommands,
+                       maxchunkbytes=config.adsmaxchunkbytes,
+                       parallelchunks=config.adsparallelchunks,
+                       snapshothistory=config.adssnapshothistory,
+                       metrics=metrics,
+                       symbolcache=config.adssymbolcache,
+                       maxreadgap=config.adsmaxreadgap)
+
+    # Record the process image of each cycle
+    recorder = None
+    if config.adsrecorderpath:
+        recorder = Adsrecorder(adsmodel, config.adsrecorderpath,
+                               filesize=config.adsrecorderfilesize * 1024 * 1024,
+                               maxfiles=config.adsrecorderfiles)
+        recorder.start()
+
+    # Share the process image with other local processes
+    sharedimage = None
+    if config.adssharedmemory:
+        sharedimage = Adssharedimage(adsmodel, config.adssharedmemory)
+        sharedimage.start()
+
+    # Serve the model to local clients over one PLC connection
+    gateway = None
+    if config.adsgatewayaddress:
+        gateway = Adsgateway(adsmodel, config.adsgatewayaddress)
+        gateway.start()
+
+    # Simulate the PLC with the symbols of the ads symbol list
+    connection = None
+    if config.adsfakeconnection:
+        plcsymbols = {adsname: adsmodel.adsdata.types[i].name
+                      for adsname, i in adsmodel.adsdata.index.items() if adsmodel.adsdata.types[i] is not None}
+        connection = lambda netid, port: FakeConnection(netid, port, symbols=plcsymbols,
+                                                        registry=adsmodel.adsdata.registry)
+
+    # Replay a recording instead of a PLC, writes are captured
+    if config.adsreplaypath:
+        connection = lambda netid, port: Adsreplayconnection(config.adsreplaypath, netid, port,
+                                                             speed=config.adsreplayspeed)
+
+    # Apply changes of the ads symbol list between two cycles
+    symbolwatcher = None
+    if config.adssymbolreload:
+        symbolwatcher = Adssymbolwatcher(adsmodel, './configs/adssymbols.yml')
+        symbolwatcher.start()
 
     # Set run event
     run_event.set()
@@ -163,7 +439,10 @@ if __name__ == '__main__':
     adsclienthandler = AdsClienthandler(handlername="ADS client",
                                         run_event=run_event,
                                         config=config,
-                                        adsmodel=adsmodel)
+                                        adsmodel=adsmodel,
+                                        cycletime=config.adscycletime / 1000.0,
+                                        overrunpolicy=config.adsoverrunpolicy,
+                                        connection=connection)
     
     # Start thread
     adsclienthandler.start()
@@ -183,6 +462,18 @@ if __name__ == '__main__':
         if adsclienthandler.isReadyToStop:
             adsclienthandler.join()
 
+    if symbolwatcher is not None:
+        symbolwatcher.stop()
+
+    if recorder is not None:
+        recorder.stop()
+
+    if gateway is not None:
+        gateway.stop()
+
+    if sharedimage is not None:
+        sharedimage.stop()
+
     logging.info("Threads successfully closed")
     exit
 
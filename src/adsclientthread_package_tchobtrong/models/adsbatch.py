@@ -0,0 +1,79 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+
+class Adsbatch(object):
+    '''
+    Transaction of writes to the ADS data model
+
+    Writes of the thread inside the with block are collected and applied
+    together with Adsdata.writemany() at the end of the block, so they go out
+    in the same write cycle. An exception inside the block discards them.
+
+    Attrs:
+        adsmodel [Adsdata]: model of the transaction
+        values [DICT]: ads name -> value of the collected writes
+        depth [INT]: number of nested with blocks of the thread
+        committed [BOOL]: True -> the writes are applied to the model
+    '''
+
+    def __init__(self, adsmodel):
+        self.adsmodel = adsmodel
+        self.values = {}
+        self.depth = 0
+        self.committed = False
+
+    def write(self, adsdataname, value):
+        '''
+        Collect single data for the end of the transaction
+        '''
+        self.values[adsdataname] = value
+
+    def read(self, adsdataname):
+        '''
+        Return: Collected value of the symbol, otherwise the value of the model
+        '''
+        if adsdataname in self.values:
+            return self.values[adsdataname]
+
+        return self.adsmodel.read(adsdataname)
+
+    def __enter__(self):
+        local = self.adsmodel.local
+        outer = getattr(local, 'batch', None)
+
+        # Nested blocks join the outer transaction
+        if outer is not None and outer is not self:
+            outer.depth += 1
+            return outer
+
+        local.batch = self
+        self.depth += 1
+        return self
+
+    def __exit__(self, exctype, excvalue, traceback):
+        batch = self.adsmodel.local.batch
+        batch.depth -= 1
+
+        if exctype is not None:
+            batch.values = {}
+
+        if batch.depth > 0:
+            return False
+
+        self.adsmodel.local.batch = None
+
+        if batch.values:
+            batch.committed = self.adsmodel.writemany(batch.values)
+            batch.values = {}
+
+        return False
@@ -10,14 +10,37 @@
 # permissions and limitations under the License.
 # Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
 
+import collections
+import fnmatch
 import logging
 from os import execv
 import threading
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 import pyads
 from pyads import Connection
+from pyads.constants import (ADSIGRP_SYM_INFOBYNAMEEX, ADSIGRP_SYM_VALBYHND, ADSIGRP_SYM_VERSION,
+                             ADSSYMBOLFLAG_BITVALUE, ADSSYMBOLFLAG_READONLY)
+from pyads.structs import SAdsSymbolEntry
+from models.adsbatch import Adsbatch
+from models.adssnapshot import Adssnapshot
+from models.adssubscription import Adsdispatcher, Adssubscription
+from models.adsurgentwrite import Adsurgentwrite
+from utils.ads_metrics import NULLMETRICS, Ads_TimedLock
 from utils.ads_vars import Ads_Vars
+from utils.ads_symboltable import Ads_SymbolTable
+from utils.ads_sumcommand import SUBREQUESTBYTES, AdsSumRead, AdsSumWrite, coalesce, splitchunks
+
+
+# ADS error codes of a missing symbol and an invalid symbol version (online change)
+ADSERR_SYMBOLNOTFOUND = 1808
+ADSERR_SYMBOLVERSIONINVALID = 1809
+
+# Transmission modes of device notifications
+TRANSMODES = {'onchange': pyads.ADSTRANS_SERVERONCHA,
+              'cyclic': pyads.ADSTRANS_SERVERCYCLE}
 
 
 class Adsdata (object):
@@ -27,16 +50,77 @@ class Adsdata (object):
     The current data of ADS server
     '''
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, fullwritecycles:int=0,
+                 maxsubcommands:int=pyads.constants.MAX_ADS_SUB_COMMANDS,
+                 maxchunkbytes:int=65536,
+                 parallelchunks:int=1,
+                 snapshothistory:int=16,
+                 metrics=None,
+                 symbolcache:bool=False,
+                 maxreadgap:int=32):
+        '''
+        Args:
+            filepath [String]: path of the ads symbol list (yaml)
+            fullwritecycles [int]: write all write symbols every N cycles, 0 -> only changed symbols
+            maxsubcommands [int]: max. number of symbols in one ADS request
+            maxchunkbytes [int]: max. payload bytes of one ADS request
+            parallelchunks [int]: number of ADS requests sent in parallel over the connection
+            snapshothistory [int]: number of recent snapshots kept for getsnapshot(cycle)
+            metrics [Ads_Metrics]: instrumentation of the model, None -> disabled
+            symbolcache [bool]: keep the compiled symbol list in <filepath>.cache
+            maxreadgap [int]: max. unused bytes between two symbols read as one memory block, < 0 -> no blocks
+        '''
         try:
-            self.lock = threading.Lock()
-            self.adsdata = Ads_Vars(filepath)
+            self.metrics = metrics if metrics is not None else NULLMETRICS
+            self.lock = Ads_TimedLock(self.metrics) if self.metrics.enabled else threading.Lock()
+            self.adsdata = Ads_Vars(filepath, filepath + '.cache' if symbolcache else None)
             self.readlist = list()
+            self.pollreadlist = list()
             self.writedict = {}
+            self.dirtyset = set()
+            self.fullwritecycles = fullwritecycles
+            self.writecycle = 0
+            self.notificationhandles = {}
+            self.symbolinfo = {}
+            self.symbolversion = None
+            self.generated = False
+            self.compiled = False
+            self.onlinechange = False
+            self.sumreads = list()
+            self.sumreadcache = {}
+            self.readblocks = {}
+            self.namereads = {}
+            self.rejected = set()
+            self.unresolved = set()
+            self.sumwrite = None
+            self.namereadlist = list()
+            self.cycletime = 0.01
+            self.groupcycles = {}
+            self.readcycle = 0
+            self.pendingreads = set()
+            self.maxsubcommands = maxsubcommands
+            self.maxchunkbytes = maxchunkbytes
+            self.maxreadgap = maxreadgap
+            self.executor = ThreadPoolExecutor(parallelchunks) if parallelchunks > 1 else None
+            self.readchunkstats = list()
+            self.writechunkstats = list()
+            self.cycle = 0
+            self.snapshots = [None] * max(snapshothistory, 1)
+            self.snapshot = None
+            self.dispatcher = None
+            self.recorder = None
+            self.sharedimage = None
+            self.gateway = None
+            self.urgentwrites = collections.deque()
+            self.urgentevent = threading.Event()
+            self.pendingreload = None
+            self.local = threading.local()
             readlist = list()
 
             self.setreadlist(self.adsdata.readlist)
             self.setwritelist(self.adsdata.writelist)
+            self.publishsnapshot()
+            logging.info("Added " + str(len(self.readlist)) + " read and " + str(len(self.writedict)) + " write symbols.")
 
 
             # self.setreadlist(readlist)
@@ -66,157 +150,1440 @@ class Adsdata (object):
         return err
 
 
-    def setreadlist(self, readlist):
-        for adsdata in readlist:
-            adstext = adsdata.replace('.', '_dot_')
-            if hasattr(self.adsdata, adstext):
-                self.readlist.append(adsdata)
-                msg = "Successfully add ["
-                msg = msg + str(adsdata)
-                msg = msg + "] in the ads readlist"
-                logging.info(msg)
-            else:
-                errmsg = "ERROR!!: Unknow variables. Cannot add ["
-                errmsg = errmsg + str(adsdata)
-                errmsg = errmsg + "] in the ads readlist"
-                logging.error(errmsg)
+    def resolvesymbols(self, plcconn:Connection)->bool:
+        '''
+        Resolve and cache index group/offset and byte size of all symbols in
+        readlist and writedict for the precompiled sum commands.
+        The symbols are validated against the symbol table of the ADS server,
+        uploaded with one request. The upload is skipped if the symbol cache
+        holds the symbols of the PLC project, identified by the symbol version
+        and the counts and sizes of the symbol tables. ADS servers without
+        symbol upload are resolved per symbol with handles.
 
-    def setwritelist(self, writelist):
-        for adsdataname in writelist:
-            adstext = adsdataname.replace('.', '_dot_')
-            if hasattr(self.adsdata, adstext):
-                adsobj = getattr(self.adsdata, adstext)              
-                self.writedict[adsdataname] = adsobj.value
+        Return: True -> Cannot resolve all symbols, False -> Resolved all symbols
+        '''
+
+        err = False
+        self.releasehandles(plcconn)
+        generate = self.adsdata.upload is not None and not self.generated
+        cache = self.adsdata.cache
+        table = None
+        symbols = None
+
+        try:
+            self.symbolversion = plcconn.read(ADSIGRP_SYM_VERSION, 0, pyads.PLCTYPE_BYTE)
+
+        except Exception as e:
+            logging.error("Cannot read the symbol version: " + str(e))
+            err = True
+
+        try:
+            info = Ads_SymbolTable.uploadinfo(plcconn)
+            project = str(self.symbolversion) + ':' + info.hex()
+
+            if cache is not None and not generate:
+                symbols = cache.getsymbols(self.adsdata.yamlhash, project)
+
+            if symbols is None:
+                table = Ads_SymbolTable.upload(plcconn, datatypes=generate, info=info)
 
-                # create message
-                msg = "Successfully add ["
-                msg = msg + str(adsdataname)
-                msg = msg + "] in the ads writedict"
-                logging.info(msg)
             else:
-                errmsg = "ERROR!!: Unknow variables. Cannot add ["
-                errmsg = errmsg + str(adsdataname)
-                errmsg = errmsg + "] in the ads writedict"
-                logging.error(errmsg)
+                logging.info("Loaded the resolved symbols from the symbol cache.")
 
-    def read(self, adsdataname):
+        except Exception as e:
+            logging.warning("Cannot upload the symbol table. Resolve each symbol: " + str(e))
+
+        if generate and table is not None:
+            self.addsymboltable(table)
+
+        adsnames = self.readlist + [key for key in self.writedict if key not in self.readlist]
+
+        if table is not None:
+            symbols = {}
+
+            for adsdataname in adsnames:
+                entry = table.get(adsdataname)
+
+                if entry is not None:
+                    symbols[adsdataname] = entry[1:4]
+
+            if cache is not None and self.symbolversion is not None:
+                cache.setsymbols(self.adsdata.yamlhash, project, symbols)
+
+        if symbols is not None:
+            err = self.resolvetable(plcconn, symbols, adsnames) or err
+
+        else:
+            err = self.resolvenames(plcconn, adsnames) or err
+
+        # Symbols missing in the PLC are neither read nor written
+        self.unresolved = set(adsnames).difference(self.symbolinfo)
+
+        logging.info("Resolved " + str(len(self.symbolinfo)) + " ads symbols.")
+
+        return err
+
+    def resolvenames(self, plcconn:Connection, adsnames)->bool:
         '''
-        Read single data from model
+        Resolve symbols one by one with their handles
+
+        Return: True -> Cannot resolve all symbols, False -> Resolved all symbols
+        '''
+        err = False
+
+        for adsdataname in adsnames:
+            try:
+                info = plcconn.read_write(ADSIGRP_SYM_INFOBYNAMEEX, 0, SAdsSymbolEntry,
+                                          adsdataname, pyads.PLCTYPE_STRING)
+                handle = plcconn.get_handle(adsdataname)
+                self.symbolinfo[adsdataname] = (handle, info.iGroup, info.iOffs, info.size)
+                logging.debug("Resolved the symbol [" + str(adsdataname) + "] in the ADS Server ")
+
+            except Exception as e:
+                logging.error("! Cannot resolve the symbol [" + str(adsdataname) + "]: " + str(e))
+                err = True
+
+        return err
+
+    def reloadsymbols(self, filepath:str=None):
+        '''
+        Load the ads symbol list again and queue its differences for the ADS thread,
+        which applies them between two cycles with applyreload()
+
+        Return: ads names of the added, removed, retyped and changed symbols,
+                None -> unchanged or invalid ads symbol list
+        '''
+        try:
+            plan = self.adsdata.diffsymbols(filepath)
+
+        except Exception as e:
+            logging.error("Cannot reload the ads symbol list: " + str(e))
+            return None
+
+        if plan is None:
+            return None
+
+        diff = {key: plan[key] for key in ('added', 'removed', 'retyped', 'changed')}
+        self.pendingreload = plan
+        logging.info("Reload the ads symbol list: " +
+                     ", ".join(str(len(names)) + " " + key for key, names in diff.items()))
+
+        return diff
+
+    def applyreload(self, plcconn:Connection=None, notifications:bool=False)->bool:
+        '''
+        Apply the queued reload of the ads symbol list, called by the ADS thread between two cycles.
+        Only the affected symbols are resolved again, the other symbols keep their values and handles.
 
         Args:
-            adsdataname [String]: Ads variable name, such as GVL.input01
+            plcconn [Connection]: ADS connection, None -> resolved with the next connect
+            notifications [bool]: register the device notifications of the reloaded symbols
+
+        Return: True -> reload applied
         '''
-        # get token
+        plan = self.pendingreload
+
+        if plan is None:
+            return False
+
+        self.pendingreload = None
+        start = time.perf_counter()
+        stale = set(plan['removed'] + plan['retyped'] + plan['changed'])
+        unresolved = plan['removed'] + plan['retyped']
+
+        for adsdataname in stale.intersection(self.notificationhandles):
+            handles = self.notificationhandles.pop(adsdataname)
+
+            try:
+                if plcconn is not None:
+                    plcconn.del_device_notification(*handles)
+
+            except Exception as e:
+                logging.error("Cannot delete notification for [" + str(adsdataname) + "]: " + str(e))
+
+        for adsdataname in unresolved:
+            info = self.symbolinfo.pop(adsdataname, None)
+
+            try:
+                if plcconn is not None and info is not None and info[0] is not None:
+                    plcconn.release_handle(info[0])
+
+            except Exception as e:
+                logging.error("Cannot release handle of [" + str(adsdataname) + "]: " + str(e))
+
+        # Take token
         self.lock.acquire()
 
         try:
-            adstextname = adsdataname.replace('.', '_dot_')
-            obj = getattr(self.adsdata, adstextname)
+            self.adsdata.applysymbols(plan)
+            self.readlist = list(self.adsdata.readlist)
+            self.pollreadlist = [adsdataname for adsdataname in self.readlist
+                                 if adsdataname not in self.notificationhandles]
+            index = self.adsdata.index
+            self.writedict = {adsdataname: self.writedict[adsdataname] if adsdataname in self.writedict
+                              else self.adsdata.getvalue(index[adsdataname])
+                              for adsdataname in self.adsdata.writelist}
+
+            # Symbols which are no longer written
+            for adsdataname in self.dirtyset.difference(self.writedict):
+                if adsdataname in index:
+                    self.adsdata.dirty[index[adsdataname]] = 0
 
+            self.dirtyset.intersection_update(self.writedict)
+            self.compiled = False
+            self.groupcycles = self.readgroupcycles()
+
+        finally:
             # Release token
             self.lock.release()
-            # logging.warning("Read : [" + str(adsdataname) + "] :" + str(obj.value))
 
-            return obj.value
+        if self.dispatcher is not None and plan['removed']:
+            self.dispatcher.discard(plan['removed'])
 
-        except Exception as e:
-            logging.warning("Cannot read : [" + str(adsdataname) + "] :" + str(e))
+        if plcconn is not None:
+            adsnames = [adsdataname for adsdataname in dict.fromkeys(self.readlist + list(self.writedict))
+                        if adsdataname not in self.symbolinfo]
 
-            # Release token
-            self.lock.release()
-            return
+            if self.resolvenames(plcconn, adsnames):
+                logging.error("Cannot resolve all reloaded ads symbols.")
 
-    def write(self, adsdataname, value):
+            self.unresolved = set(adsnames).difference(self.symbolinfo)
+
+            if notifications:
+                self.addnotifications(plcconn)
+
+        self.publishsnapshot()
+        logging.info("Reloaded the ads symbol list in " + str(round((time.perf_counter() - start) * 1000.0, 3)) + " ms")
+
+        return True
+
+    def addsymboltable(self, table:Ads_SymbolTable)->int:
         '''
-        Write single data to model
+        Add the symbols of the uploaded symbol table, which match the upload
+        settings of the ads symbol list, with the datatypes of the PLC.
+        Symbols listed in the ads symbol list keep their settings.
 
-        Args:
-            adsdataname [String]: Ads variable name, such as GVL.input01
+        Return: Number of added symbols
         '''
-        # TODO: Check input data type
-        # get token
+        settings = self.adsdata.upload or {}
+        include = [str(pattern).upper() for pattern in settings.get('include') or ['*']]
+        exclude = [str(pattern).upper() for pattern in settings.get('exclude') or []]
+        mode = settings.get('mode', Ads_Vars.READONLY)
+        group = settings.get('group')
+        registry = self.adsdata.registry
+        registry.declare(table.datatypes)
+
+        symbols = list()
+        skipped = 0
+
+        for key, (adsname, igroup, ioffs, size, typename, flags) in table.entries.items():
+            if adsname in self.adsdata.index:
+                continue
+
+            if not any(fnmatch.fnmatchcase(key, pattern) for pattern in include) or \
+               any(fnmatch.fnmatchcase(key, pattern) for pattern in exclude):
+                continue
+
+            adstype = registry.get(typename)
+
+            # Bit symbols have a size in bits
+            if flags & ADSSYMBOLFLAG_BITVALUE or adstype is None or adstype.size != size:
+                logging.debug("Skip the symbol [" + str(adsname) + "] of the unsupported datatype " + str(typename))
+                skipped += 1
+                continue
+
+            symbolmode = Ads_Vars.READONLY if flags & ADSSYMBOLFLAG_READONLY and mode == Ads_Vars.WRITEREAD else mode
+            symbols.append(((igroup, ioffs), adsname, typename, symbolmode))
+
+        # Memory order, neighbouring symbols end up in the same chunk
+        symbols.sort()
+
         self.lock.acquire()
 
         try:
-            adstextname = adsdataname.replace('.', '_dot_')
-            obj = getattr(self.adsdata, adstextname)
-            obj.value = value
+            self.adsdata.addsymbols([(adsname, typename, symbolmode, group)
+                                     for address, adsname, typename, symbolmode in symbols])
 
-            # Release token
+        finally:
             self.lock.release()
-            return
 
-        except Exception as e:
-            logging.warning("Cannot write : [" + str(adsdataname) + "] :" + str(e))
+        self.setreadlist([adsname for address, adsname, typename, symbolmode in symbols
+                          if symbolmode in (Ads_Vars.READONLY, Ads_Vars.WRITEREAD)])
+        self.setwritelist([adsname for address, adsname, typename, symbolmode in symbols
+                           if symbolmode == Ads_Vars.WRITEREAD])
+        self.generated = True
+        self.compiled = False
+        self.publishsnapshot()
 
-            # Release token
-            self.lock.release()
-            return
+        logging.info("Added " + str(len(symbols)) + " symbols of the PLC symbol table, skipped "
+                     + str(skipped) + " symbols of unsupported datatypes.")
+
+        return len(symbols)
 
-    def updatereaddata(self, result):
+    def resolvetable(self, plcconn:Connection, symbols:dict, adsnames)->bool:
         '''
-        Update all result to the current model
+        Resolve the symbols from the addresses of the uploaded symbol table or
+        of the symbol cache. Symbols resolved from the table are addressed by
+        index group/offset without handles. Struct members and array elements
+        are not listed in the table, they are resolved one by one.
+
+        Args:
+            symbols [DICT]: ads name -> (index group, index offset, size)
+
+        Return: True -> Cannot resolve all symbols, False -> Resolved all symbols
         '''
-        # Take token
-        self.lock.acquire()
+        err = False
+        missing = list()
+
+        for adsdataname in adsnames:
+            if adsdataname not in symbols:
+                missing.append(adsdataname)
+                continue
+
+            igroup, ioffs, size = symbols[adsdataname]
+            self.symbolinfo[adsdataname] = (None, igroup, ioffs, size)
+
+        if missing:
+            logging.info("Resolve " + str(len(missing)) + " symbols not listed in the symbol table one by one.")
+            err = self.resolvenames(plcconn, missing)
+
+        return err
+
+    def releasehandles(self, plcconn:Connection):
+        '''
+        Release all cached symbol handles
+        '''
+
+        for adsdataname, info in self.symbolinfo.items():
+            if info[0] is None:
+                continue
 
-        for adsname in self.readlist:
             try:
-                adstextname = adsname.replace('.', '_dot_')
-                obj = getattr(self.adsdata, adstextname)
-                obj.value = result[adsname]
+                plcconn.release_handle(info[0])
+
             except Exception as e:
-                logging.error("Cannot update model data [" + str(adsname) +"] :" + str(e))
+                logging.error("Cannot release handle of [" + str(adsdataname) + "]: " + str(e))
 
-        # Release token
-        self.lock.release()
+        self.symbolinfo = {}
+        self.compiled = False
 
-    def updatewritedata(self):
+    def resethandles(self):
         '''
-        Update all current model to the writedict
+        Forget all symbol handles and notifications of a lost connection
+        without ADS calls. They are resolved again after the reconnect.
         '''
+        self.symbolinfo = {}
+        self.unresolved = set()
+        self.notificationhandles = {}
+        self.pollreadlist = list(self.readlist)
+        self.compiled = False
 
-        # Take token
-        self.lock.acquire()
+    def symboltype(self, adsdataname):
+        '''
+        Return: Ads_Type of a resolved symbol, None -> not resolved, unknown datatype or size mismatch
+        '''
+        if adsdataname not in self.symbolinfo:
+            return None
+
+        adstype = self.adsdata.types[self.adsdata.getindex(adsdataname)]
+
+        if adstype is None or adstype.size != self.symbolinfo[adsdataname][3]:
+            if adstype is not None:
+                logging.warning("Size of [" + str(adsdataname) + "] does not match its datatype " + adstype.name)
+            return None
+
+        return adstype
+
+    def mismatched(self, adsdataname)->bool:
+        '''
+        Return: True -> resolved compound symbol (struct, array, string) whose size does not match its datatype.
+                Such symbols cannot be decoded from a read by name either.
+        '''
+        if adsdataname not in self.symbolinfo:
+            return False
+
+        adstype = self.adsdata.types[self.adsdata.getindex(adsdataname)]
+
+        return adstype is not None and adstype.fmt is None and adstype.size != self.symbolinfo[adsdataname][3]
+
+    def compilecommands(self):
+        '''
+        Compile the sum read/write commands of the resolved symbols, split into
+        chunks within the ADS request limits. Symbols at neighbouring addresses
+        are read as one memory block, within their read group.
+        Symbols which cannot be compiled are read and written by name, except
+        compound symbols whose size does not match their datatype and symbols
+        missing in the PLC.
+        '''
+        groups = self.symbolreadgroups()
+        addressed = {}
+        self.readblocks = {}
+        self.namereads = {}
+        self.sumreadcache = {}
+        self.rejected = set(adsdataname for adsdataname in dict.fromkeys(self.pollreadlist + list(self.writedict))
+                            if self.mismatched(adsdataname))
+
+        for adsdataname in self.rejected:
+            logging.error("! Cannot read/write [" + str(adsdataname) + "]: the size of the PLC symbol does not "
+                          "match its datatype " + self.adsdata.types[self.adsdata.getindex(adsdataname)].name)
+
+        self.rejected.update(self.unresolved)
+
+        for adsdataname in self.pollreadlist:
+            group = groups.get(adsdataname)
+
+            if adsdataname in self.rejected:
+                continue
+
+            if self.symboltype(adsdataname) is None:
+                self.namereads.setdefault(group, list()).append(adsdataname)
+                continue
+
+            igroup, ioffs, size = self.symboladdress(adsdataname)
+
+            # Handles are no memory addresses
+            if igroup == ADSIGRP_SYM_VALBYHND:
+                self.readblocks.setdefault(group, list()).append((igroup, ioffs, size, [(adsdataname, 0, size)]))
+            else:
+                addressed.setdefault(group, list()).append((adsdataname, igroup, ioffs, size))
+
+        for group, symbols in addressed.items():
+            self.readblocks.setdefault(group, list()).extend(
+                coalesce(symbols, self.maxreadgap, self.maxchunkbytes - SUBREQUESTBYTES))
+
+        self.sumwrite = AdsSumWrite()
 
         for key in self.writedict:
-            try:
-                adstextname = key.replace('.', '_dot_')
-                obj = getattr(self.adsdata, adstextname)
-                self.writedict[key] = obj.value
-            
-            except Exception as e:
-                logging.error("Cannot update write dict [" + str(key) + "]: " + str(e))
+            adstype = self.symboltype(key)
 
-        # Release token
-        self.lock.release()
+            if adstype is not None:
+                igroup, ioffs, size = self.symboladdress(key)
+                self.sumwrite.addsymbol(key, igroup, ioffs, adstype)
 
-    def readads(self, plc):
+        self.compiled = True
+
+    def getsumreads(self, due):
+        '''
+        Return: Sum read commands of the due read groups, compiled once per combination
+        '''
+        sumreads = self.sumreadcache.get(due)
+
+        if sumreads is None:
+            blocks = [block for group in due for block in self.readblocks.get(group, ())]
+
+            # Symbol version at the end of each read to detect online changes
+            blocks.append((ADSIGRP_SYM_VERSION, 0, 1, [(None, 0, 1)]))
+
+            chunks = splitchunks([block[2] for block in blocks], self.maxsubcommands, self.maxchunkbytes)
+            sumreads = [AdsSumRead(blocks[start:end]) for start, end in chunks]
+            self.sumreadcache[due] = sumreads
+
+        return sumreads
+
+    def setcycletime(self, cycletime:float):
+        '''
+        Set the cycle time of readads [s], the read groups are due every period / cycletime cycles
+        '''
+        self.cycletime = cycletime
+        self.groupcycles = self.readgroupcycles()
+
+    def readgroupcycles(self)->dict:
         '''
-        Read all data from the readlist
+        Round the periods of the read groups to whole cycles. A period which is
+        shorter than the cycle time or no multiple of it is logged as warning.
+
+        Return: read group -> read every n cycles, None -> on demand
+        '''
+        groupcycles = {}
+
+        for group, period in self.adsdata.readgroups.items():
+            if period is None:
+                groupcycles[group] = None
+                continue
+
+            every = max(1, int(round(period / self.cycletime)))
+            groupcycles[group] = every
+
+            if abs(every * self.cycletime - period) > 1e-6:
+                logging.warning("Period " + str(period * 1000.0) + " ms of the read group [" + str(group)
+                                + "] is no multiple of the cycle time " + str(self.cycletime * 1000.0)
+                                + " ms. Read it every " + str(every) + " cycles ("
+                                + str(every * self.cycletime * 1000.0) + " ms).")
+
+        return groupcycles
+
+    def symbolreadgroups(self)->dict:
+        '''
+        Return: ads name -> read group of the symbols in a declared read group
+        '''
+        return {adsdataname: group
+                for group, adsdatanames in self.adsdata.groups.items() if group in self.adsdata.readgroups
+                for adsdataname in adsdatanames}
+
+    def requestread(self, group:str):
+        '''
+        Read a read group in the next cycle, such as an on_demand group
+        '''
+        if group not in self.adsdata.readgroups:
+            logging.warning("Unknown read group [" + str(group) + "]")
+            return
+
+        self.pendingreads.add(group)
+
+    def duegroups(self):
+        '''
+        Count the read cycle and get the read groups to read in this cycle.
+        Symbols without a read group are read every cycle. The groups are
+        staggered, so that groups with the same period are read in different cycles.
+
+        Return: Tuple of the due read groups, None -> symbols without read group
+        '''
+        self.readcycle += 1
+        pending, self.pendingreads = self.pendingreads, set()
+        due = [None]
+
+        for i, (group, period) in enumerate(self.adsdata.readgroups.items()):
+            if self.readcycle == 1 or group in pending:
+                due.append(group)
+
+            elif period is not None:
+                every = self.groupcycles.get(group) or max(1, int(round(period / self.cycletime)))
+
+                if (self.readcycle + i) % every == 0:
+                    due.append(group)
+
+        return tuple(due)
+
+    def symboladdress(self, adsdataname):
+        '''
+        Return: (index group, index offset, size) of a resolved symbol, by handle if it has one
+        '''
+        handle, igroup, ioffs, size = self.symbolinfo[adsdataname]
+
+        if handle is not None:
+            return (ADSIGRP_SYM_VALBYHND, handle, size)
+
+        return (igroup, ioffs, size)
+
+    def runchunks(self, jobs):
+        '''
+        Run ADS requests of all chunks, in parallel if configured.
+        A failed chunk does not discard the results of the other chunks.
+
+        Args:
+            jobs [LIST]: (number of symbols, payload bytes, function) of each chunk
+
+        Return: (result of each chunk, None -> failed, statistics of each chunk)
         '''
-        
+        if self.executor is not None and len(jobs) > 1:
+            results = list(self.executor.map(self.runchunk, jobs))
+        else:
+            results = [self.runchunk(job) for job in jobs]
+
+        chunkstats = [stats for stats, result in results]
+        results = [result for stats, result in results]
+
+        return results, chunkstats
+
+    def runchunk(self, job):
+        '''
+        Run the ADS request of a single chunk
+
+        Return: (statistics, result) of the chunk
+        '''
+        count, nbytes, func = job
+        stats = {'symbols': count, 'bytes': nbytes, 'duration': 0.0, 'error': None}
+        result = None
+        start = time.perf_counter()
+
         try:
-            logging.debug("Reading ADS data ...")
-            result = plc.read_list_by_name(self.readlist)
-            self.updatereaddata(result)
-            logging.debug("Successfully read ADS data.")
-            #logging.info(self.readlist)
+            result = func()
+
         except Exception as e:
-            logging.error("Cannot read ads data: " + str(e) + ":>> " + str(self.readlist))
+            stats['error'] = str(e)
+            logging.error("Cannot execute ads chunk with " + str(count) + " symbols: " + str(e))
 
-    def writeads(self, plc):
+        stats['duration'] = time.perf_counter() - start
+
+        return stats, result
+
+    def addchunkmetrics(self, operation:str, chunkstats):
+        '''
+        Add the bytes and the errors of the chunks of one cycle to the metrics
+        '''
+        if not self.metrics.enabled:
+            return
+
+        self.metrics.inc('ads_bytes', sum(stats['bytes'] for stats in chunkstats), operation=operation)
+        self.metrics.inc('ads_chunks', len(chunkstats), operation=operation)
+        self.metrics.inc('ads_chunk_errors', sum(1 for stats in chunkstats if stats['error']), operation=operation)
+
+        for stats in chunkstats:
+            self.metrics.observe('ads_chunk_seconds', stats['duration'], operation=operation)
+
+    def namechunks(self, adsnames):
         '''
-        Write all data from the readlist
+        Return: Symbol names split into chunks of max. maxsubcommands
+        '''
+        return [adsnames[i:i + self.maxsubcommands]
+                for i in range(0, len(adsnames), self.maxsubcommands)]
+
+    def isolate(self, func, adsnames):
+        '''
+        Call func with a list of symbol names. If a symbol is not found in the
+        ADS server or cannot be converted, the list is split to isolate it.
+
+        Return: Result of func for all found symbols
         '''
-        self.updatewritedata()
         try:
-            plc.write_list_by_name(self.writedict)
-            logging.debug("Successfully write ADS data." )
-            #logging.info(self.writedict)
+            return func(adsnames)
+
+        except pyads.ADSError as e:
+            if e.err_code != ADSERR_SYMBOLNOTFOUND:
+                raise
+
+            if len(adsnames) == 1:
+                logging.error("! Cannot find the symbol [" + str(adsnames[0]) + "]: " + str(e))
+                return {}
+
+        except (KeyError, TypeError, ValueError) as e:
+            # Datatype pyads cannot convert, e.g. structs read by name
+            if len(adsnames) == 1:
+                logging.error("! Cannot convert the symbol [" + str(adsnames[0]) + "]: " + str(e))
+                return {}
+
+        half = len(adsnames) // 2
+        result = self.isolate(func, adsnames[:half])
+        result.update(self.isolate(func, adsnames[half:]))
+
+        return result
+
+    def setreadlist(self, readlist):
+        for adsdata in readlist:
+            if adsdata in self.adsdata.index:
+                self.readlist.append(adsdata)
+                self.pollreadlist.append(adsdata)
+                msg = "Successfully add ["
+                msg = msg + str(adsdata)
+                msg = msg + "] in the ads readlist"
+                logging.debug(msg)
+            else:
+                errmsg = "ERROR!!: Unknow variables. Cannot add ["
+                errmsg = errmsg + str(adsdata)
+                errmsg = errmsg + "] in the ads readlist"
+                logging.error(errmsg)
+
+    def setwritelist(self, writelist):
+        for adsdataname in writelist:
+            if adsdataname in self.adsdata.index:
+                adsobj = self.adsdata.getvar(adsdataname)
+                self.writedict[adsdataname] = adsobj.value
+
+                # create message
+                msg = "Successfully add ["
+                msg = msg + str(adsdataname)
+                msg = msg + "] in the ads writedict"
+                logging.debug(msg)
+            else:
+                errmsg = "ERROR!!: Unknow variables. Cannot add ["
+                errmsg = errmsg + str(adsdataname)
+                errmsg = errmsg + "] in the ads writedict"
+                logging.error(errmsg)
+
+    def addnotifications(self, plcconn:Connection)->int:
+        '''
+        Register ADS device notifications for all read symbols with
+        notification settings. Registered symbols are no longer polled.
+
+        Return: Number of registered device notifications
+        '''
+
+        for adsdataname in self.adsdata.notificationlist:
+            if adsdataname not in self.readlist or adsdataname in self.notificationhandles:
+                continue
+
+            adsobj = self.adsdata.getvar(adsdataname)
+            adstype = self.adsdata.types[adsobj.index]
+
+            if adstype is None:
+                logging.warning("Unsupported datatype for notification [" + str(adsdataname) + "]. Keep polling.")
+                continue
+
+            try:
+                settings = adsobj.notification
+                attr = pyads.NotificationAttrib(length=adstype.size,
+                                                trans_mode=TRANSMODES[settings.get('trans_mode', 'onchange')],
+                                                max_delay=settings.get('max_delay', 10),
+                                                cycle_time=settings.get('cycle_time', 10))
+                # raw PLC memory, copied into the process image
+                callback = plcconn.notification(None)(self.updatenotificationdata)
+                self.notificationhandles[adsdataname] = plcconn.add_device_notification(adsdataname,
+                                                                                        attr,
+                                                                                        callback)
+                self.pollreadlist.remove(adsdataname)
+                self.compiled = False
+                logging.info("Successfully add notification for [" + str(adsdataname) + "]")
+
+            except Exception as e:
+                logging.error("Cannot add notification for [" + str(adsdataname) + "]: " + str(e))
+
+        return len(self.notificationhandles)
+
+    def delnotifications(self, plcconn:Connection):
+        '''
+        Delete all registered ADS device notifications and poll their symbols again
+        '''
+
+        for adsdataname, handles in self.notificationhandles.items():
+            try:
+                plcconn.del_device_notification(*handles)
+
+            except Exception as e:
+                logging.error("Cannot delete notification for [" + str(adsdataname) + "]: " + str(e))
+
+        self.notificationhandles = {}
+        self.pollreadlist = list(self.readlist)
+        self.compiled = False
+
+    def updatenotificationdata(self, handle, adsdataname, timestamp, data):
+        '''
+        Update a single value from an ADS device notification to the current model
+
+        Args:
+            data [BYTEARRAY]: raw PLC memory of the symbol
+        '''
+        # Take token
+        self.lock.acquire()
+
+        try:
+            i = self.adsdata.getindex(adsdataname)
+
+            # Keep values which are not yet written to the PLC
+            if not self.adsdata.dirty[i]:
+                self.adsdata.setbytes(i, data)
+
+        except Exception as e:
+            logging.error("Cannot update model data [" + str(adsdataname) +"] :" + str(e))
+
+        # Release token
+        self.lock.release()
+
+    def read(self, adsdataname):
+        '''
+        Read single data from model
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+        '''
+        batch = getattr(self.local, 'batch', None)
+
+        if batch is not None and adsdataname in batch.values:
+            return batch.values[adsdataname]
+
+        # get token
+        self.lock.acquire()
+
+        try:
+            value = self.adsdata.getvalue(self.adsdata.index[adsdataname])
+
+            # Release token
+            self.lock.release()
+            # logging.warning("Read : [" + str(adsdataname) + "] :" + str(value))
+
+            return value
+
+        except Exception as e:
+            logging.warning("Cannot read : [" + str(adsdataname) + "] :" + str(e))
+
+            # Release token
+            self.lock.release()
+            return
+
+    def write(self, adsdataname, value):
+        '''
+        Write single data to model
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+        '''
+        batch = getattr(self.local, 'batch', None)
+
+        # Collect the value for the end of the transaction
+        if batch is not None:
+            batch.write(adsdataname, value)
+            return
+
+        # TODO: Check input data type
+        # get token
+        self.lock.acquire()
+
+        try:
+            i = self.adsdata.index[adsdataname]
+            self.adsdata.setvalue(i, value)
+
+            # Mark as changed for the next write cycle
+            if adsdataname in self.writedict:
+                self.adsdata.dirty[i] = 1
+                self.dirtyset.add(adsdataname)
+
+            # Release token
+            self.lock.release()
+            return
+
+        except Exception as e:
+            logging.warning("Cannot write : [" + str(adsdataname) + "] :" + str(e))
+
+            # Release token
+            self.lock.release()
+            return
+
+    def readmany(self, adsdatanames)->dict:
+        '''
+        Read several data from model with a single lock acquisition
+
+        Args:
+            adsdatanames [LIST]: Ads variable names
+
+        Return: ads name -> value, None -> unknown symbol
+        '''
+        index = self.adsdata.index
+        unknown = [adsdataname for adsdataname in adsdatanames if adsdataname not in index]
+
+        if unknown:
+            logging.warning("Cannot read : " + str(unknown) + " : unknown symbols")
+
+        values = dict.fromkeys(unknown)
+
+        # get token
+        self.lock.acquire()
+
+        try:
+            index = self.adsdata.index
+            getvalue = self.adsdata.getvalue
+
+            for adsdataname in adsdatanames:
+                i = index.get(adsdataname)
+
+                if i is not None:
+                    values[adsdataname] = getvalue(i)
+
+        except Exception as e:
+            logging.warning("Cannot read : [" + str(adsdataname) + "] :" + str(e))
+
+        # Release token
+        self.lock.release()
+
+        batch = getattr(self.local, 'batch', None)
+
+        if batch is not None:
+            values.update((name, value) for name, value in batch.values.items() if name in values)
+
+        return values
+
+    def encodevalues(self, values:dict):
+        '''
+        Validate several values against the symbol index and encode them in the layout of the image
+
+        Return: (list of (index, raw data or object value), ads name -> error)
+        '''
+        index = self.adsdata.index
+        types = self.adsdata.types
+        encoded = list()
+        errors = {}
+
+        for adsdataname, value in values.items():
+            i = index.get(adsdataname)
+
+            if i is None:
+                errors[adsdataname] = "unknown symbol"
+                continue
+
+            adstype = types[i]
+
+            if adstype is None:
+                encoded.append((i, value))
+                continue
+
+            try:
+                data = bytearray(adstype.size)
+                adstype.pack_into(data, 0, value)
+                encoded.append((i, data))
+
+            except Exception as e:
+                errors[adsdataname] = str(e)
+
+        return encoded, errors
+
+    def applyvalues(self, values:dict, index:dict, encoded, markdirty:bool=True):
+        '''
+        Apply validated values to the image with a single lock acquisition
+
+        Args:
+            index [DICT]: symbol index of the validation, re-validated if the symbol list changed
+            encoded [LIST]: (index, raw data or object value) of encodevalues()
+            markdirty [bool]: True -> write in the next write cycle, False -> already sent
+
+        Return: ads name -> error, empty -> applied
+        '''
+        # get token
+        self.lock.acquire()
+
+        try:
+            # The symbol list changed since the validation
+            if self.adsdata.index is not index:
+                encoded, errors = self.encodevalues(values)
+
+                if errors:
+                    return errors
+
+            types = self.adsdata.types
+            objects = self.adsdata.objects
+            setbytes = self.adsdata.setbytes
+
+            for i, data in encoded:
+                if types[i] is None:
+                    objects[i] = data
+                else:
+                    setbytes(i, data)
+
+            dirty = self.adsdata.dirty
+            writenames = [adsdataname for adsdataname in values if adsdataname in self.writedict]
+
+            for adsdataname in writenames:
+                dirty[self.adsdata.index[adsdataname]] = int(markdirty)
+
+            # Mark as changed for the next write cycle, or drop older values of the write cycle
+            if markdirty:
+                self.dirtyset.update(writenames)
+            else:
+                self.dirtyset.difference_update(writenames)
+
+        finally:
+            # Release token
+            self.lock.release()
+
+        return {}
+
+    def writemany(self, values:dict)->bool:
+        '''
+        Write several data to model as one transaction
+
+        All values are validated first, then applied with a single lock acquisition,
+        so they go out in the same write cycle. An invalid value rejects the whole set.
+
+        Args:
+            values [DICT]: Ads variable name -> value
+
+        Return: True -> all values written, False -> nothing written
+        '''
+        batch = getattr(self.local, 'batch', None)
+
+        if batch is not None:
+            batch.values.update(values)
+            return True
+
+        index = self.adsdata.index
+        encoded, errors = self.encodevalues(values)
+
+        if not errors:
+            errors = self.applyvalues(values, index, encoded)
+
+        if errors:
+            logging.warning("Cannot write " + str(len(values)) + " symbols : " + str(errors))
+            return False
+
+        return True
+
+    def writenow(self, values:dict, confirm:bool=False)->Adsurgentwrite:
+        '''
+        Write data to the PLC immediately, between two cycles instead of with the next write cycle
+
+        The request is queued to the ADS thread, which sends it at once with one ADS request.
+        Older values of the symbols, not yet written by the write cycle, are discarded.
+
+        Args:
+            values [DICT]: Ads variable name -> value of write symbols
+            confirm [bool]: read the values back after the write
+
+        Return: Adsurgentwrite, wait() for the result and the latency
+        '''
+        request = Adsurgentwrite(dict(values), confirm)
+        index = self.adsdata.index
+        encoded, errors = self.encodevalues(request.values)
+        errors.update((adsdataname, "no write symbol") for adsdataname in request.values
+                      if adsdataname not in self.writedict and adsdataname not in errors)
+
+        if not errors:
+            errors = self.applyvalues(request.values, index, encoded, markdirty=False)
+
+        if errors:
+            logging.warning("Cannot write now : " + str(errors))
+            request.finish(errors)
+            return request
+
+        self.urgentwrites.append(request)
+        self.urgentevent.set()
+
+        return request
+
+    def writeurgent(self, plc)->int:
+        '''
+        Send the queued urgent writes, called by the ADS thread between two cycles
+
+        Args:
+            plc [Connection]: ADS connection, None -> not connected, the writes fail
+
+        Return: Number of sent urgent writes
+        '''
+        count = 0
+
+        while self.urgentwrites:
+            request = self.urgentwrites.popleft()
+            readback = {}
+
+            try:
+                if plc is None:
+                    raise ConnectionError("not connected")
+
+                if self.symbolinfo and not self.compiled:
+                    self.compilecommands()
+
+                if self.compiled and all(adsdataname in self.sumwrite for adsdataname in request.values):
+                    errors = self.sumwrite.execute(plc, request.values)
+                else:
+                    result = plc.write_list_by_name(request.values)
+                    errors = {key: err for key, err in (result or {}).items() if err != 'no error'}
+
+                count += 1
+
+                if request.confirm and not errors:
+                    readback = plc.read_list_by_name(list(request.values))
+                    errors = {adsdataname: "read back " + str(readback.get(adsdataname))
+                              for adsdataname in request.values
+                              if readback.get(adsdataname) != self.normalize(adsdataname, request.values[adsdataname])}
+
+            except Exception as e:
+                errors = {adsdataname: str(e) for adsdataname in request.values}
+
+            request.finish(errors, readback)
+            self.metrics.observe('ads_urgent_write_seconds', request.latency)
+
+            if errors:
+                logging.error("Cannot write urgent ads data: " + str(errors))
+                self.metrics.inc('ads_urgent_write_errors')
+
+        return count
+
+    def normalize(self, adsdataname, value):
+        '''
+        Return: Value as read back from the PLC, e.g. a REAL with single precision
+        '''
+        adstype = self.adsdata.types[self.adsdata.index[adsdataname]]
+
+        if adstype is None:
+            return value
+
+        data = bytearray(adstype.size)
+        adstype.pack_into(data, 0, value)
+
+        return adstype.unpack_from(data, 0)
+
+    def batch(self)->Adsbatch:
+        '''
+        Start a transaction of writes, use as: with adsmodel.batch(): ...
+
+        Return: Adsbatch
+        '''
+        batch = getattr(self.local, 'batch', None)
+
+        return batch if batch is not None else Adsbatch(self)
+
+    def updatereaddata(self, result, rawresult=None):
+        '''
+        Update all result to the current model
+
+        Args:
+            result [DICT]: values of the symbols
+            rawresult [DICT]: raw PLC memory of the symbols, copied without decoding
+        '''
+        index = self.adsdata.index
+        dirty = self.adsdata.dirty
+        setvalue = self.adsdata.setvalue
+        setbytes = self.adsdata.setbytes
+
+        # Take token
+        self.lock.acquire()
+
+        for adsname, value in result.items():
+            try:
+                i = index[adsname]
+
+                # Keep values which are not yet written to the PLC
+                if dirty[i]:
+                    continue
+
+                setvalue(i, value)
+            except Exception as e:
+                logging.error("Cannot update model data [" + str(adsname) +"] :" + str(e))
+
+        for adsname, data in (rawresult or {}).items():
+            try:
+                i = index[adsname]
+
+                if dirty[i]:
+                    continue
+
+                setbytes(i, data)
+            except Exception as e:
+                logging.error("Cannot update model data [" + str(adsname) +"] :" + str(e))
+
+        # Release token
+        self.lock.release()
+
+    def updatewritedata(self):
+        '''
+        Update all changed data of the current model to the writedict
+
+        Return: Write batch with the changed symbols, or all write symbols every fullwritecycles
+        '''
+        self.writecycle += 1
+        fullwrite = self.fullwritecycles > 0 and self.writecycle >= self.fullwritecycles
+
+        # Take token
+        self.lock.acquire()
+
+        if fullwrite:
+            self.writecycle = 0
+            names = list(self.writedict)
+        else:
+            names = self.dirtyset
+
+        self.dirtyset = set()
+        writebatch = {}
+
+        for key in names:
+            try:
+                i = self.adsdata.index[key]
+                self.adsdata.dirty[i] = 0
+                value = self.adsdata.getvalue(i)
+                self.writedict[key] = value
+                writebatch[key] = value
+            
+            except Exception as e:
+                logging.error("Cannot update write dict [" + str(key) + "]: " + str(e))
+
+        # Release token
+        self.lock.release()
+
+        return writebatch
+
+    def dropwrites(self):
+        '''
+        Discard all changed data, which are not yet written to the PLC.
+        The next read overwrites them with the values of the PLC.
+
+        Return: Names of the discarded symbols
+        '''
+
+        # Take token
+        self.lock.acquire()
+
+        names = list(self.dirtyset)
+
+        for key in names:
+            self.adsdata.dirty[self.adsdata.index[key]] = 0
+
+        self.dirtyset = set()
+
+        # Release token
+        self.lock.release()
+
+        return names
+
+    def markdirty(self, names):
+        '''
+        Mark symbols as changed again, e.g. after a failed write
+        '''
+
+        # Take token
+        self.lock.acquire()
+
+        for key in names:
+            try:
+                self.adsdata.dirty[self.adsdata.index[key]] = 1
+                self.dirtyset.add(key)
+
+            except Exception as e:
+                logging.error("Cannot mark write data [" + str(key) + "]: " + str(e))
+
+        # Release token
+        self.lock.release()
+
+    def publishsnapshot(self):
+        '''
+        Publish an immutable snapshot of the process image as the next cycle.
+        The snapshot replaces the current one with a single reference swap.
+
+        Return: Published snapshot
+        '''
+        # Take token
+        self.lock.acquire()
+
+        try:
+            snapshot = Adssnapshot(self.cycle + 1, time.time(), self.adsdata)
+
+        finally:
+            # Release token
+            self.lock.release()
+
+        if self.metrics.enabled:
+            changed = len(snapshot.changed(self.snapshot, snapshot.index))
+            self.metrics.set('ads_symbols_changed', changed)
+            self.metrics.inc('ads_symbol_changes', changed)
+
+        self.snapshots[snapshot.cycle % len(self.snapshots)] = snapshot
+        self.snapshot = snapshot
+        self.cycle = snapshot.cycle
+
+        if self.dispatcher is not None:
+            self.dispatcher.put(snapshot)
+
+        if self.recorder is not None:
+            self.recorder.put(snapshot)
+
+        if self.sharedimage is not None:
+            self.sharedimage.publish(snapshot)
+
+        if self.gateway is not None:
+            self.gateway.put(snapshot)
+
+        return snapshot
+
+    def getsnapshot(self, cycle:int=None):
+        '''
+        Get a snapshot of the process image without locking
+
+        Args:
+            cycle [int]: number of the cycle, None -> latest snapshot
+
+        Return: Adssnapshot, None -> the cycle is not kept anymore
+        '''
+        if cycle is None:
+            return self.snapshot
+
+        snapshot = self.snapshots[cycle % len(self.snapshots)]
+
+        if snapshot is None or snapshot.cycle != cycle:
+            return None
+
+        return snapshot
+
+    def matchsymbols(self, patterns)->List[str]:
+        '''
+        Args:
+            patterns [String/LIST]: symbol names, glob patterns such as GVL.b*, or group:<group name>
+
+        Return: Names of the matching symbols
+        '''
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        names = list()
+
+        for pattern in patterns:
+            if pattern.startswith('group:'):
+                matches = self.adsdata.groups.get(pattern[len('group:'):], [])
+            else:
+                matches = fnmatch.filter(self.adsdata.index, pattern)
+
+            if not matches:
+                logging.warning("No ads symbol matches [" + str(pattern) + "]")
+
+            names.extend(name for name in matches if name not in names)
+
+        return names
+
+    def subscribe(self, patterns, callback=None, queue=None, deadband:float=0.0, ratelimit:float=0.0):
+        '''
+        Subscribe to the value changes of symbols. The changes are computed once
+        per cycle and delivered by the dispatcher thread, not the ADS thread.
+
+        Args:
+            patterns [String/LIST]: symbol names, glob patterns or group:<group name>
+            callback [FUNCTION]: callback(adsname, value, snapshot) of each change
+            queue [queue.Queue]: receives (adsname, value, cycle) of each change, if no callback
+            deadband [float]: min. change of numeric values
+            ratelimit [float]: min. interval between two changes of a symbol [s]
+
+        Return: Adssubscription, required for unsubscribe
+        '''
+        subscription = Adssubscription(self.matchsymbols(patterns), callback, queue, deadband, ratelimit)
+
+        if self.dispatcher is None:
+            self.dispatcher = Adsdispatcher(self.snapshot)
+            self.dispatcher.start()
+
+        self.dispatcher.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription:Adssubscription):
+        '''
+        Stop the delivery of a subscription
+        '''
+        if self.dispatcher is not None:
+            self.dispatcher.remove(subscription)
+
+    def readads(self, plc):
+        '''
+        Read all data from the readlist, which are not updated by notifications
+        and whose read group is due, and publish the snapshot of the cycle
+        '''
+        if not self.pollreadlist:
+            self.publishsnapshot()
+            return
+
+        try:
+            logging.debug("Reading ADS data ...")
+
+            if self.symbolinfo and not self.compiled:
+                self.compilecommands()
+
+            due = self.duegroups()
+            jobs = list()
+
+            if self.compiled:
+                sumreads = self.sumreads = self.getsumreads(due)
+                namereadlist = self.namereadlist = [adsdataname for group in due
+                                                    for adsdataname in self.namereads.get(group, ())]
+            else:
+                groups = self.symbolreadgroups()
+                sumreads = list()
+                namereadlist = [adsdataname for adsdataname in self.pollreadlist if groups.get(adsdataname) in due]
+
+            for sumread in sumreads:
+                jobs.append((len(sumread.adsnames), sumread.size,
+                             lambda sumread=sumread: self.sumreadads(plc, sumread)))
+
+            for names in self.namechunks(namereadlist):
+                jobs.append((len(names), 0,
+                             lambda names=names: self.isolate(plc.read_list_by_name, names)))
+
+            results, self.readchunkstats = self.runchunks(jobs)
+            self.addchunkmetrics('read', self.readchunkstats)
+
+            # Sum reads return raw PLC memory, reads by name return values
+            rawresult = dict()
+            result = dict()
+            for i, chunkresult in enumerate(results):
+                if chunkresult is not None:
+                    (rawresult if i < len(sumreads) else result).update(chunkresult)
+
+            self.updatereaddata(result, rawresult)
+            logging.debug("Successfully read ADS data.")
+            #logging.info(self.readlist)
+        except Exception as e:
+            logging.error("Cannot read ads data: " + str(e) + ":>> " + str(self.pollreadlist))
+
+        self.publishsnapshot()
+
+        if self.onlinechange:
+            # Online change -> resolve all symbols again
+            self.onlinechange = False
+            logging.warning("Symbol version of the ADS server changed. Resolve all symbols again.")
+            self.resolvesymbols(plc)
+
+    def sumreadads(self, plc, sumread:AdsSumRead):
+        '''
+        Read the symbols of one chunk with one sum read command
+
+        Return: Raw PLC memory of the symbols without error, memoryview slices of the response
+        '''
+        errors, response = sumread.execute(plc)
+        result = dict()
+
+        for error, members in zip(errors, sumread.members):
+            if members[0][0] is None:
+                # Symbol version
+                if error or response[members[0][1]] != self.symbolversion:
+                    self.onlinechange = True
+
+            elif error:
+                if error == ADSERR_SYMBOLVERSIONINVALID:
+                    self.onlinechange = True
+
+                for adsdataname, start, end in members:
+                    logging.error("Cannot read ads data [" + str(adsdataname) + "]: ADS error " + str(error))
+                    self.metrics.inc('ads_symbol_errors', symbol=adsdataname, operation='read')
+
+            else:
+                for adsdataname, start, end in members:
+                    result[adsdataname] = response[start:end]
+
+        return result
+
+    def writeads(self, plc):
+        '''
+        Write all changed data of the writedict. Skip the ADS call if nothing is changed
+        '''
+        writebatch = self.updatewritedata()
+
+        if not writebatch:
+            return
+
+        try:
+            if self.symbolinfo and not self.compiled:
+                self.compilecommands()
+
+            def writebyname(names):
+                result = plc.write_list_by_name({key: writebatch[key] for key in names})
+                return {key: err for key, err in (result or {}).items() if err != 'no error'}
+
+            def writebysum(names):
+                return self.sumwrite.execute(plc, {key: writebatch[key] for key in names})
+
+            jobs = list()
+            chunknames = list()
+
+            if self.compiled:
+                sumnames = [key for key in writebatch if key in self.sumwrite]
+                namenames = [key for key in writebatch if key not in self.sumwrite and key not in self.rejected]
+                sizes = [self.sumwrite.sizes[key] for key in sumnames]
+
+                for start, end in splitchunks(sizes, self.maxsubcommands, self.maxchunkbytes):
+                    names = sumnames[start:end]
+                    chunknames.append(names)
+                    jobs.append((len(names), sum(sizes[start:end]),
+                                 lambda names=names: writebysum(names)))
+            else:
+                namenames = list(writebatch)
+
+            for names in self.namechunks(namenames):
+                chunknames.append(names)
+                jobs.append((len(names), 0,
+                             lambda names=names: self.isolate(writebyname, names)))
+
+            results, self.writechunkstats = self.runchunks(jobs)
+            self.addchunkmetrics('write', self.writechunkstats)
+
+            # Symbols of failed chunks are written again in the next cycle
+            failed = list()
+            for names, chunkresult in zip(chunknames, results):
+                failed.extend(names if chunkresult is None else chunkresult)
+
+            logging.debug("Successfully write ADS data." )
+            #logging.info(self.writedict)
+
+            if failed:
+                logging.error("Cannot write ads data: " + str(failed))
+                self.markdirty(failed)
+
+                for key in failed:
+                    self.metrics.inc('ads_symbol_errors', symbol=key, operation='write')
 
         except Exception as e:
-            logging.error("Cannot write ads data: " + str(e) + ":>> " + str(self.writedict))
+            logging.error("Cannot write ads data: " + str(e) + ":>> " + str(writebatch))
+            self.markdirty(writebatch)
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG, format='%(levelname)s %(message)s')
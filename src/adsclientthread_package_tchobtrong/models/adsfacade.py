@@ -0,0 +1,167 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+from models.adsdata import Adsdata
+
+
+class Adsfacade(object):
+    '''
+    Namespaced access to the ADS data models of several targets
+
+    Symbols are addressed as <target>:<ads name>, such as plc3:GVL.input01.
+    Without a target name the default target is used.
+
+    Attrs:
+        models [DICT]: target name -> Adsdata
+        default [String]: target of symbols without a target name
+    '''
+    SEPARATOR = ':'
+
+    def __init__(self, models:dict=None, default:str=None):
+        self.models = dict(models or {})
+        self.default = default
+
+        if self.default is None and len(self.models) == 1:
+            self.default = next(iter(self.models))
+
+    def addmodel(self, targetname:str, adsmodel:Adsdata):
+        '''
+        Add the ADS data model of a target, the first model is the default target
+        '''
+        self.models[targetname] = adsmodel
+
+        if self.default is None:
+            self.default = targetname
+
+    def split(self, name:str):
+        '''
+        Return: (target name, ads name) of a namespaced symbol name
+        '''
+        targetname, separator, adsdataname = name.partition(self.SEPARATOR)
+
+        if not separator:
+            return self.default, name
+
+        return targetname, adsdataname
+
+    def getmodel(self, targetname:str)->Adsdata:
+        '''
+        Return: Adsdata of the target, KeyError if unknown
+        '''
+        return self.models[targetname]
+
+    def read(self, name:str):
+        '''
+        Read single data from the model of the target
+
+        Args:
+            name [String]: namespaced variable name, such as plc3:GVL.input01
+        '''
+        targetname, adsdataname = self.split(name)
+
+        try:
+            return self.models[targetname].read(adsdataname)
+
+        except KeyError:
+            logging.warning("Cannot read : [" + str(name) + "] : unknown target")
+            return
+
+    def write(self, name:str, value):
+        '''
+        Write single data to the model of the target
+
+        Args:
+            name [String]: namespaced variable name, such as plc3:GVL.input01
+        '''
+        targetname, adsdataname = self.split(name)
+
+        try:
+            adsmodel = self.models[targetname]
+
+        except KeyError:
+            logging.warning("Cannot write : [" + str(name) + "] : unknown target")
+            return
+
+        adsmodel.write(adsdataname, value)
+
+    def readmany(self, names)->dict:
+        '''
+        Read several data, one lock acquisition per target
+
+        Args:
+            names [LIST]: namespaced variable names
+
+        Return: namespaced name -> value, None -> unknown target or symbol
+        '''
+        values = {}
+
+        for targetname, adsdatanames in self.bytarget(names).items():
+            adsmodel = self.models.get(targetname)
+
+            if adsmodel is None:
+                logging.warning("Cannot read : " + str(list(adsdatanames.values())) + " : unknown target")
+                values.update(dict.fromkeys(adsdatanames.values()))
+                continue
+
+            result = adsmodel.readmany(list(adsdatanames))
+            values.update((name, result.get(adsdataname)) for adsdataname, name in adsdatanames.items())
+
+        return values
+
+    def writemany(self, values:dict)->bool:
+        '''
+        Write several data, as one transaction per target
+
+        Args:
+            values [DICT]: namespaced variable name -> value
+
+        Return: True -> all values written
+        '''
+        targets = self.bytarget(values)
+        unknown = [name for targetname, adsdatanames in targets.items() if targetname not in self.models
+                   for name in adsdatanames.values()]
+
+        if unknown:
+            logging.warning("Cannot write : " + str(unknown) + " : unknown target")
+            return False
+
+        success = True
+
+        for targetname, adsdatanames in targets.items():
+            success &= self.models[targetname].writemany({adsdataname: values[name]
+                                                          for adsdataname, name in adsdatanames.items()})
+
+        return success
+
+    def bytarget(self, names)->dict:
+        '''
+        Return: target name -> ads name -> namespaced name
+        '''
+        targets = {}
+
+        for name in names:
+            targetname, adsdataname = self.split(name)
+            targets.setdefault(targetname, {})[adsdataname] = name
+
+        return targets
+
+    def getsnapshot(self, targetname:str=None, cycle:int=None):
+        '''
+        Return: Snapshot of the process image of the target, None -> unknown target or cycle
+        '''
+        adsmodel = self.models.get(targetname if targetname is not None else self.default)
+
+        if adsmodel is None:
+            return None
+
+        return adsmodel.getsnapshot(cycle)
@@ -0,0 +1,699 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import collections
+import json
+import logging
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from utils.ads_types import Ads_Types
+
+
+# Frame: payload length, message kind, request id (0 -> pushed by the gateway), payload
+FRAME = struct.Struct('<IBI')
+
+# Message kinds
+LAYOUT = 1      # -> empty, <- layout version, json of the symbols and datatypes
+READ = 2        # -> symbol ids, <- VALUES
+VALUES = 3      # <- layout version, cycle, timestamp, then symbol id and raw value of each symbol
+WRITE = 4       # -> layout version, then symbol id and raw value of each symbol, <- ACK
+SUBSCRIBE = 5   # -> symbol ids, empty -> unsubscribe, <- ACK, then VALUES of the changes
+ACK = 6         # <- success, error message
+
+LAYOUTVERSION = struct.Struct('<Q')
+VALUESHEADER = struct.Struct('<QQd')
+SYMBOLID = struct.Struct('<I')
+SUCCESS = struct.Struct('<B')
+
+# Max. payload of a frame, larger frames close the connection
+MAXFRAME = 16 * 1024 * 1024
+
+
+def parseaddress(address:str):
+    '''
+    Args:
+        address [STRING]: host:port of a TCP socket or unix:<path> of a Unix socket
+
+    Return: (address family, socket address)
+    '''
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+
+    host, separator, port = address.rpartition(':')
+
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def packframe(kind:int, requestid:int, payload=b'')->bytes:
+    return FRAME.pack(len(payload), kind, requestid) + payload
+
+
+class Adsgatewaysession(object):
+    '''
+    Connection of one client of the gateway
+
+    Attrs:
+        outbuffer [BYTEARRAY]: frames not yet sent
+        subscribed [SET]: names of the subscribed symbols
+        pending [SET]: changed subscribed symbols not yet sent, coalesced while the client is slow
+        paused [BOOL]: True -> requests are not read until the client takes its replies
+    '''
+
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = peer
+        self.inbuffer = bytearray()
+        self.outbuffer = bytearray()
+        self.subscribed = set()
+        self.pending = set()
+        self.paused = False
+        self.events = 0
+
+
+class Adsgateway(threading.Thread):
+    '''
+    Gateway serving the ADS data model to many local clients over one PLC connection
+
+    Clients use a compact binary protocol on a TCP or Unix socket: the symbol
+    layout is sent once, then symbols are addressed by id and values are
+    transferred as raw PLC memory. One thread serves all clients with
+    non-blocking sockets, the ADS thread only wakes it up after each cycle.
+
+    A client which does not take its data is not read from until its buffer
+    is drained (backpressure). Changes for a slow subscriber are coalesced:
+    only the latest value of each changed symbol is sent.
+
+    Attrs:
+        adsmodel [Adsdata]: model served to the clients
+        address [STRING]: host:port or unix:<path> of the listening socket
+        maxbuffer [INT]: max. bytes queued for one client
+        sessions [DICT]: socket -> Adsgatewaysession
+        stats [DICT]: clients, requests, coalesced changes
+    '''
+
+    def __init__(self, adsmodel, address:str='127.0.0.1:4850', maxbuffer:int=1024 * 1024):
+        threading.Thread.__init__(self, name="ADS gateway", daemon=True)
+        self.adsmodel = adsmodel
+        self.address = address
+        self.maxbuffer = maxbuffer
+        self.sessions = {}
+        self.selector = selectors.DefaultSelector()
+        self.server = None
+        self.isrunning = False
+        self.snapshot = None
+        self.layoutindex = None
+        self.layoutversion = 0
+        self.layout = b''
+        self.names = []
+        self.ids = {}
+        self.types = []
+        self.offsets = []
+        self.subscribed = set()
+        self.stats = {'clients': 0, 'requests': 0, 'coalesced': 0}
+
+        self.wakeupreader, self.wakeupwriter = socket.socketpair()
+        self.wakeupreader.setblocking(False)
+        self.wakeupwriter.setblocking(False)
+
+    def bind(self):
+        '''
+        Open the listening socket
+
+        Return: bound socket address, e.g. with the port chosen for port 0
+        '''
+        family, sockaddress = parseaddress(self.address)
+
+        if family == socket.AF_UNIX and os.path.exists(sockaddress):
+            os.remove(sockaddress)
+
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+
+        if family != socket.AF_UNIX:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        self.server.bind(sockaddress)
+        self.server.listen(64)
+        self.server.setblocking(False)
+        self.selector.register(self.server, selectors.EVENT_READ, 'accept')
+        self.selector.register(self.wakeupreader, selectors.EVENT_READ, 'wakeup')
+
+        if family != socket.AF_UNIX:
+            # Port 0 -> the port chosen by the system
+            self.address = '%s:%d' % self.server.getsockname()[:2]
+
+        return self.server.getsockname()
+
+    def start(self):
+        '''
+        Serve the model and get woken up by each published snapshot
+        '''
+        if self.server is None:
+            self.bind()
+
+        self.isrunning = True
+        threading.Thread.start(self)
+        self.adsmodel.gateway = self
+        logging.info("Serving the ADS model on " + str(self.address))
+
+    def stop(self):
+        if self.adsmodel.gateway is self:
+            self.adsmodel.gateway = None
+
+        self.isrunning = False
+        self.put(None)
+
+        if self.is_alive():
+            self.join()
+
+    def put(self, snapshot):
+        '''
+        Wake up the gateway after a published snapshot, called by the ADS thread
+        '''
+        try:
+            self.wakeupwriter.send(b'\x00')
+
+        except (BlockingIOError, OSError):
+            # Already woken up
+            pass
+
+    def run(self):
+        try:
+            while self.isrunning:
+                for key, mask in self.selector.select(timeout=0.1):
+                    if key.data == 'accept':
+                        self.accept()
+                    elif key.data == 'wakeup':
+                        self.drainwakeup()
+                    else:
+                        if mask & selectors.EVENT_READ:
+                            self.receive(key.data)
+                        if mask & selectors.EVENT_WRITE and key.data.sock in self.sessions:
+                            self.send(key.data)
+
+                snapshot = self.adsmodel.snapshot
+
+                if snapshot is not None and snapshot is not self.snapshot:
+                    self.update(snapshot)
+
+                for session in list(self.sessions.values()):
+                    self.flush(session)
+
+        except Exception as e:
+            logging.error("ADS gateway stopped: " + str(e))
+
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        for session in list(self.sessions.values()):
+            self.disconnect(session)
+
+        if self.server is not None:
+            self.selector.unregister(self.server)
+            self.server.close()
+
+            if self.server.family == socket.AF_UNIX:
+                try:
+                    os.remove(parseaddress(self.address)[1])
+                except OSError:
+                    pass
+
+            self.server = None
+
+        self.selector.close()
+        self.wakeupreader.close()
+        self.wakeupwriter.close()
+
+    def drainwakeup(self):
+        try:
+            while self.wakeupreader.recv(4096):
+                pass
+
+        except BlockingIOError:
+            pass
+
+    def accept(self):
+        try:
+            sock, peer = self.server.accept()
+
+        except BlockingIOError:
+            return
+
+        sock.setblocking(False)
+
+        if sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        session = Adsgatewaysession(sock, peer)
+        session.events = selectors.EVENT_READ
+        self.sessions[sock] = session
+        self.selector.register(sock, session.events, session)
+        self.stats['clients'] = len(self.sessions)
+        logging.info("Gateway client connected: " + str(peer))
+
+    def disconnect(self, session:Adsgatewaysession):
+        if self.sessions.pop(session.sock, None) is None:
+            return
+
+        self.selector.unregister(session.sock)
+        session.sock.close()
+        self.stats['clients'] = len(self.sessions)
+
+        if session.subscribed:
+            self.subscribed = set().union(*(other.subscribed for other in self.sessions.values()))
+
+        logging.info("Gateway client disconnected: " + str(session.peer))
+
+    def receive(self, session:Adsgatewaysession):
+        try:
+            data = session.sock.recv(65536)
+
+        except BlockingIOError:
+            return
+
+        except OSError as e:
+            logging.warning("Gateway client " + str(session.peer) + ": " + str(e))
+            data = b''
+
+        if not data:
+            self.disconnect(session)
+            return
+
+        buffer = session.inbuffer
+        buffer += data
+        start = 0
+
+        # Handle all complete frames of the batch
+        while len(buffer) - start >= FRAME.size:
+            length, kind, requestid = FRAME.unpack_from(buffer, start)
+
+            if length > MAXFRAME:
+                logging.warning("Gateway client " + str(session.peer) + ": frame too large")
+                self.disconnect(session)
+                return
+
+            end = start + FRAME.size + length
+
+            if len(buffer) < end:
+                break
+
+            self.handle(session, kind, requestid, bytes(buffer[start + FRAME.size:end]))
+            start = end
+
+        del buffer[:start]
+
+    def send(self, session:Adsgatewaysession):
+        try:
+            sent = session.sock.send(session.outbuffer)
+
+        except BlockingIOError:
+            return
+
+        except OSError as e:
+            logging.warning("Gateway client " + str(session.peer) + ": " + str(e))
+            self.disconnect(session)
+            return
+
+        del session.outbuffer[:sent]
+
+    def flush(self, session:Adsgatewaysession):
+        '''
+        Queue the coalesced changes of the subscriber and update the socket events
+        '''
+        # Only the latest values of a slow subscriber are sent
+        if session.pending and len(session.outbuffer) < self.maxbuffer // 2:
+            names = [name for name in session.pending if name in self.ids]
+            session.pending.clear()
+
+            if names:
+                session.outbuffer += packframe(VALUES, 0, self.packvalues(names))
+
+        session.paused = len(session.outbuffer) >= self.maxbuffer
+        events = 0 if session.paused else selectors.EVENT_READ
+
+        if session.outbuffer:
+            events |= selectors.EVENT_WRITE
+
+        if events != session.events:
+            session.events = events
+            self.selector.modify(session.sock, events, session)
+
+    def update(self, snapshot):
+        '''
+        Collect the changes of the subscribed symbols of a new snapshot
+        '''
+        previous = self.snapshot
+        self.snapshot = snapshot
+
+        if snapshot.index is not self.layoutindex:
+            self.setlayout(snapshot)
+            previous = None
+
+            for session in self.sessions.values():
+                session.outbuffer += packframe(LAYOUT, 0, self.layout)
+
+        if not self.subscribed:
+            return
+
+        changed = set(snapshot.changed(previous, [name for name in self.subscribed if name in self.ids]))
+
+        for session in self.sessions.values():
+            changes = changed & session.subscribed
+
+            if changes:
+                if session.pending:
+                    self.stats['coalesced'] += len(changes & session.pending)
+                session.pending |= changes
+
+    def setlayout(self, snapshot):
+        '''
+        Number the symbols of the snapshot layout, symbols with an unknown datatype are not served
+        '''
+        types = snapshot.types
+        symbols = [(adsname, i) for adsname, i in snapshot.index.items() if types[i] is not None]
+        self.layoutindex = snapshot.index
+        self.layoutversion += 1
+        self.names = [adsname for adsname, i in symbols]
+        self.ids = {adsname: symbolid for symbolid, adsname in enumerate(self.names)}
+        self.types = [types[i] for adsname, i in symbols]
+        self.offsets = [snapshot.offsets[i] for adsname, i in symbols]
+        layout = {'symbols': [[adsname, adstype.name] for adsname, adstype in zip(self.names, self.types)],
+                  'datatypes': self.adsmodel.adsdata.registry.declarations}
+        self.layout = LAYOUTVERSION.pack(self.layoutversion) + json.dumps(layout, default=str).encode('utf-8')
+
+    def packvalues(self, names)->bytes:
+        '''
+        Return: VALUES payload with the raw values of the symbols of the current snapshot
+        '''
+        snapshot = self.snapshot
+        image = snapshot.image
+        parts = [VALUESHEADER.pack(self.layoutversion, snapshot.cycle, snapshot.timestamp)]
+
+        for name in names:
+            symbolid = self.ids[name]
+            offset = self.offsets[symbolid]
+            parts.append(SYMBOLID.pack(symbolid))
+            parts.append(image[offset:offset + self.types[symbolid].size])
+
+        return b''.join(parts)
+
+    def unpackids(self, payload:bytes):
+        count = len(payload) // SYMBOLID.size
+        ids = struct.unpack('<' + str(count) + 'I', payload[:count * SYMBOLID.size])
+
+        if any(symbolid >= len(self.names) for symbolid in ids):
+            raise KeyError("unknown symbol id")
+
+        return [self.names[symbolid] for symbolid in ids]
+
+    def handle(self, session:Adsgatewaysession, kind:int, requestid:int, payload:bytes):
+        '''
+        Handle one request of a client and queue its reply
+        '''
+        self.stats['requests'] += 1
+
+        snapshot = self.adsmodel.snapshot
+
+        if snapshot is not None and snapshot is not self.snapshot:
+            self.update(snapshot)
+
+        try:
+            if kind == LAYOUT:
+                reply = packframe(LAYOUT, requestid, self.layout)
+
+            elif kind == READ:
+                reply = packframe(VALUES, requestid, self.packvalues(self.unpackids(payload)))
+
+            elif kind == WRITE:
+                reply = packframe(ACK, requestid, self.write(payload))
+
+            elif kind == SUBSCRIBE:
+                names = self.unpackids(payload)
+                session.subscribed = set(names)
+                session.pending = set(names)
+                self.subscribed = set().union(*(other.subscribed for other in self.sessions.values()))
+                reply = packframe(ACK, requestid, SUCCESS.pack(1))
+
+            else:
+                raise ValueError("unknown message kind " + str(kind))
+
+        except Exception as e:
+            reply = packframe(ACK, requestid, SUCCESS.pack(0) + str(e).encode('utf-8'))
+
+        session.outbuffer += reply
+
+    def write(self, payload:bytes)->bytes:
+        '''
+        Decode the raw values of a WRITE request and write them as one transaction
+
+        Return: ACK payload
+        '''
+        layoutversion = LAYOUTVERSION.unpack_from(payload)[0]
+
+        if layoutversion != self.layoutversion:
+            return SUCCESS.pack(0) + b'symbol layout changed'
+
+        values = {}
+        position = LAYOUTVERSION.size
+
+        while position < len(payload):
+            symbolid = SYMBOLID.unpack_from(payload, position)[0]
+            adstype = self.types[symbolid]
+            position += SYMBOLID.size
+            values[self.names[symbolid]] = adstype.unpack_from(payload, position)
+            position += adstype.size
+
+        if not self.adsmodel.writemany(values):
+            return SUCCESS.pack(0) + b'invalid values'
+
+        return SUCCESS.pack(1)
+
+
+class Adsgatewayclient(object):
+    '''
+    Blocking client of the ADS gateway
+
+    Attrs:
+        layout [DICT]: ads name -> (symbol id, Ads_Type)
+        updates [DEQUE]: (cycle, values) of received subscription changes
+        cycle [INT]: ADS cycle of the last received values
+    '''
+
+    def __init__(self, address:str, timeout:float=5.0):
+        family, sockaddress = parseaddress(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(sockaddress)
+
+        if family != socket.AF_UNIX:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.timeout = timeout
+        self.buffer = bytearray()
+        self.requestid = 0
+        self.layout = {}
+        self.names = []
+        self.types = []
+        self.layoutversion = None
+        self.updates = collections.deque()
+        self.cycle = None
+
+        self.request(LAYOUT)
+
+    def close(self):
+        self.sock.close()
+
+    def receiveframe(self, timeout:float):
+        '''
+        Return: (kind, request id, payload) of the next frame, None -> timeout
+        '''
+        deadline = time.monotonic() + timeout
+
+        while True:
+            if len(self.buffer) >= FRAME.size:
+                length, kind, requestid = FRAME.unpack_from(self.buffer)
+                end = FRAME.size + length
+
+                if len(self.buffer) >= end:
+                    payload = bytes(self.buffer[FRAME.size:end])
+                    del self.buffer[:end]
+                    return kind, requestid, payload
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                return None
+
+            self.sock.settimeout(remaining)
+
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                return None
+
+            if not data:
+                raise ConnectionError("Connection closed by the gateway")
+
+            self.buffer += data
+
+    def dispatch(self, kind:int, payload:bytes):
+        '''
+        Handle a frame pushed by the gateway
+        '''
+        if kind == LAYOUT:
+            self.setlayout(payload)
+        elif kind == VALUES:
+            self.updates.append(self.unpackvalues(payload))
+
+    def request(self, kind:int, payload=b''):
+        '''
+        Send a request and wait for its reply
+
+        Return: (kind, payload) of the reply
+        '''
+        self.requestid = self.requestid % 0xFFFFFFFF + 1
+        requestid = self.requestid
+        self.sock.sendall(packframe(kind, requestid, payload))
+
+        while True:
+            frame = self.receiveframe(self.timeout)
+
+            if frame is None:
+                raise TimeoutError("No reply of the gateway")
+
+            replykind, replyid, replypayload = frame
+
+            if replyid != requestid:
+                self.dispatch(replykind, replypayload)
+                continue
+
+            if replykind == LAYOUT:
+                self.setlayout(replypayload)
+
+            return replykind, replypayload
+
+    def setlayout(self, payload:bytes):
+        self.layoutversion = LAYOUTVERSION.unpack_from(payload)[0]
+        content = json.loads(payload[LAYOUTVERSION.size:].decode('utf-8'))
+        registry = Ads_Types(content['datatypes'])
+        self.names = [adsname for adsname, typename in content['symbols']]
+        self.types = [registry.get(typename) for adsname, typename in content['symbols']]
+        self.layout = {adsname: (symbolid, self.types[symbolid]) for symbolid, adsname in enumerate(self.names)}
+
+    def unpackvalues(self, payload:bytes):
+        '''
+        Return: (cycle, ads name -> value)
+        '''
+        layoutversion, cycle, timestamp = VALUESHEADER.unpack_from(payload)
+        position = VALUESHEADER.size
+        values = {}
+
+        while position < len(payload):
+            symbolid = SYMBOLID.unpack_from(payload, position)[0]
+            adstype = self.types[symbolid]
+            position += SYMBOLID.size
+            values[self.names[symbolid]] = adstype.unpack_from(payload, position)
+            position += adstype.size
+
+        self.cycle = cycle
+
+        return cycle, values
+
+    def checkack(self, kind:int, payload:bytes)->bool:
+        if kind == ACK and payload[:1] == b'\x01':
+            return True
+
+        logging.warning("Gateway request failed: " + payload[1:].decode('utf-8', 'replace'))
+        return False
+
+    def packids(self, names)->bytes:
+        return b''.join(SYMBOLID.pack(self.layout[name][0]) for name in names)
+
+    def readmany(self, adsdatanames)->dict:
+        '''
+        Read several data of the same ADS cycle
+
+        Return: ads name -> value, None -> unknown symbol
+        '''
+        known = [name for name in adsdatanames if name in self.layout]
+
+        if len(known) != len(adsdatanames):
+            logging.warning("Cannot read : " + str([name for name in adsdatanames if name not in self.layout]) +
+                            " : unknown symbols")
+
+        values = dict.fromkeys(adsdatanames)
+
+        if known:
+            kind, payload = self.request(READ, self.packids(known))
+
+            if kind != VALUES:
+                self.checkack(kind, payload)
+                return values
+
+            values.update(self.unpackvalues(payload)[1])
+
+        return values
+
+    def read(self, adsdataname):
+        return self.readmany([adsdataname])[adsdataname]
+
+    def writemany(self, values:dict)->bool:
+        '''
+        Write several data as one transaction of the ADS model
+
+        Return: True -> all values written, False -> nothing written
+        '''
+        parts = [LAYOUTVERSION.pack(self.layoutversion)]
+
+        try:
+            for name, value in values.items():
+                symbolid, adstype = self.layout[name]
+                data = bytearray(adstype.size)
+                adstype.pack_into(data, 0, value)
+                parts.append(SYMBOLID.pack(symbolid))
+                parts.append(bytes(data))
+
+        except Exception as e:
+            logging.warning("Cannot write : [" + str(name) + "] :" + str(e))
+            return False
+
+        return self.checkack(*self.request(WRITE, b''.join(parts)))
+
+    def write(self, adsdataname, value)->bool:
+        return self.writemany({adsdataname: value})
+
+    def subscribe(self, adsdatanames)->bool:
+        '''
+        Subscribe to the changes of the symbols, replaces the previous subscription.
+        The current values are sent first.
+        '''
+        return self.checkack(*self.request(SUBSCRIBE, self.packids(adsdatanames)))
+
+    def receive(self, timeout:float=1.0):
+        '''
+        Return: (cycle, ads name -> value) of the next subscription changes, None -> timeout
+        '''
+        deadline = time.monotonic() + timeout
+
+        while not self.updates:
+            frame = self.receiveframe(max(deadline - time.monotonic(), 0))
+
+            if frame is None:
+                return None
+
+            self.dispatch(frame[0], frame[2])
+
+        return self.updates.popleft()
@@ -0,0 +1,422 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from utils.ads_types import Ads_Types
+
+
+# File layout: MAGIC, then records of (kind, payload length, payload)
+MAGIC = b'ADSREC1\n'
+RECORD = struct.Struct('<4sI')
+HEADER = b'HEAD'
+SEGMENT = b'SEGM'
+
+# Number of cycles, number of changed pages, keyframe bytes of a segment
+SEGMENTHEADER = struct.Struct('<III')
+
+
+class Adsrecorder(threading.Thread):
+    '''
+    Recorder of the process image of each ADS read cycle
+
+    The ADS thread only stores the snapshot of the cycle with a monotonic
+    timestamp into a preallocated ring buffer, it never waits for the
+    recorder. The writer thread computes the changed pages of the process
+    image and streams them in compressed columnar segments into a
+    memory-mapped file. Each segment starts with a full image (keyframe),
+    so that it can be decoded on its own. A full ring drops the oldest
+    cycles and counts them.
+
+    Attrs:
+        path [STRING]: path of the recording, rotated to <path>.1, <path>.2, ...
+        stats [DICT]: recorded/dropped cycles, segments, bytes and files of the recording
+    '''
+
+    def __init__(self, adsmodel, path:str, filesize:int=64 * 1024 * 1024, maxfiles:int=4,
+                 capacity:int=4096, pagesize:int=64, segmentcycles:int=1000,
+                 flushinterval:float=1.0, compresslevel:int=1):
+        '''
+        Args:
+            adsmodel [Adsdata]: recorded ADS data model
+            path [String]: path of the recording file
+            filesize [int]: preallocated bytes of each file, a full file is rotated
+            maxfiles [int]: number of files kept, including the current file
+            capacity [int]: number of cycles in the ring buffer
+            pagesize [int]: granularity of the change detection in bytes
+            segmentcycles [int]: max. number of cycles of a segment
+            flushinterval [float]: max. time between two segments [s]
+            compresslevel [int]: zlib level of the segments
+        '''
+        threading.Thread.__init__(self, name="ADS recorder", daemon=True)
+        self.adsmodel = adsmodel
+        self.path = path
+        self.filesize = filesize
+        self.maxfiles = max(maxfiles, 1)
+        self.capacity = capacity
+        self.pagesize = pagesize
+        self.segmentcycles = segmentcycles
+        self.flushinterval = flushinterval
+        self.compresslevel = compresslevel
+        self.ring = [None] * capacity
+        self.head = 0
+        self.tail = 0
+        self.isrunning = False
+        self.file = None
+        self.map = None
+        self.position = 0
+        self.layout = None
+        self.header = b''
+        self.previous = None
+        self.lastcycle = 0
+        self.clearsegment()
+        self.stats = {'recorded': 0, 'dropped': 0, 'segments': 0, 'bytes': 0, 'files': 0}
+
+    def put(self, snapshot):
+        '''
+        Store the snapshot of a cycle into the ring buffer, called by the ADS thread
+        '''
+        self.ring[self.head % self.capacity] = (time.monotonic_ns(), snapshot)
+        self.head += 1
+
+    def start(self):
+        '''
+        Open the recording and record each published snapshot of the model
+        '''
+        self.openfile()
+        self.isrunning = True
+        threading.Thread.start(self)
+        self.adsmodel.recorder = self
+
+    def stop(self):
+        '''
+        Stop recording, write the remaining cycles and close the file
+        '''
+        if self.adsmodel.recorder is self:
+            self.adsmodel.recorder = None
+
+        self.isrunning = False
+
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        try:
+            while self.isrunning:
+                if not self.drain():
+                    time.sleep(0.005)
+
+                if self.cycles and time.monotonic() - self.segmentstart >= self.flushinterval:
+                    self.flush()
+
+            self.drain()
+            self.flush()
+
+        except Exception as e:
+            logging.error("ADS recorder stopped: " + str(e))
+
+        finally:
+            self.closefile()
+
+    def drain(self)->int:
+        '''
+        Record all cycles of the ring buffer
+
+        Return: Number of recorded cycles
+        '''
+        head = self.head
+
+        if head - self.tail > self.capacity:
+            dropped = head - self.tail - self.capacity
+            self.stats['dropped'] += dropped
+            self.adsmodel.metrics.inc('ads_recorder_dropped', dropped)
+            self.tail = head - self.capacity
+
+        # Copy the slots first, the ADS thread may lap them while the cycles are recorded
+        entries = [self.ring[i % self.capacity] for i in range(self.tail, head)]
+        lapped = max(0, min(self.head - self.capacity - self.tail, len(entries)))
+        dropped = lapped
+        count = 0
+
+        # Slots overwritten during the copy hold newer cycles, read by the next drain
+        for timestamp, snapshot in entries[lapped:]:
+            if snapshot.cycle <= self.lastcycle:
+                dropped += 1
+                continue
+
+            self.record(timestamp, snapshot)
+            count += 1
+
+        if dropped:
+            self.stats['dropped'] += dropped
+            self.adsmodel.metrics.inc('ads_recorder_dropped', dropped)
+
+        self.tail = head
+
+        return count
+
+    def record(self, timestamp:int, snapshot):
+        '''
+        Append the changed pages of a snapshot to the current segment
+        '''
+        if snapshot.index is not self.layout:
+            # Symbols were added, start a segment with the new layout
+            self.flush()
+            self.writeheader(snapshot)
+
+        image = snapshot.image
+
+        if self.keyframe is None:
+            self.keyframe = image
+            self.segmentstart = time.monotonic()
+
+        elif image != self.previous:
+            self.diffpages(image, self.previous, 0, -(-len(image) // self.pagesize), len(self.cycles))
+
+        self.cycles.append(snapshot.cycle)
+        self.timestamps.append(timestamp)
+        self.previous = image
+        self.lastcycle = snapshot.cycle
+        self.stats['recorded'] += 1
+
+        if len(self.cycles) >= self.segmentcycles:
+            self.flush()
+
+    def diffpages(self, image:bytes, previous:bytes, first:int, last:int, cycleindex:int):
+        '''
+        Add the changed pages between first and last. Large ranges are halved,
+        so that few changes only cost a few comparisons of the whole image.
+        '''
+        pagesize = self.pagesize
+        start = first * pagesize
+        end = last * pagesize
+
+        if image[start:end] == previous[start:end]:
+            return
+
+        if last - first > 16:
+            middle = (first + last) // 2
+            self.diffpages(image, previous, first, middle, cycleindex)
+            self.diffpages(image, previous, middle, last, cycleindex)
+            return
+
+        for page in range(first, last):
+            start = page * pagesize
+            end = start + pagesize
+
+            if image[start:end] != previous[start:end]:
+                self.deltacycles.append(cycleindex)
+                self.deltapages.append(page)
+                self.deltadata += image[start:end]
+
+    def clearsegment(self):
+        self.cycles = array('Q')
+        self.timestamps = array('q')
+        self.deltacycles = array('I')
+        self.deltapages = array('I')
+        self.deltadata = bytearray()
+        self.keyframe = None
+        self.segmentstart = time.monotonic()
+
+    def flush(self):
+        '''
+        Compress the current segment column by column and write it to the file
+        '''
+        if not self.cycles:
+            return
+
+        payload = b''.join((SEGMENTHEADER.pack(len(self.cycles), len(self.deltapages), len(self.keyframe)),
+                            self.cycles.tobytes(), self.timestamps.tobytes(),
+                            self.deltacycles.tobytes(), self.deltapages.tobytes(),
+                            self.keyframe, self.deltadata))
+        self.writerecord(SEGMENT, zlib.compress(payload, self.compresslevel))
+        self.stats['segments'] += 1
+
+        # The next segment starts with a keyframe of the last image
+        self.clearsegment()
+        self.previous = None
+
+    def writeheader(self, snapshot):
+        '''
+        Write the symbol layout of the snapshot
+        '''
+        self.layout = snapshot.index
+        types = snapshot.types
+        symbols = [[adsname, types[i].name, snapshot.offsets[i], types[i].size]
+                   for adsname, i in snapshot.index.items() if types[i] is not None]
+        header = {'pagesize': self.pagesize,
+                  'symbols': symbols,
+                  'datatypes': self.adsmodel.adsdata.registry.declarations,
+                  'monotonic': time.monotonic_ns(),
+                  'wallclock': time.time()}
+        self.header = json.dumps(header, default=str).encode('utf-8')
+        self.writerecord(HEADER, self.header)
+
+    def writerecord(self, kind:bytes, payload:bytes):
+        '''
+        Write a record into the memory-mapped file, rotate a full file
+        '''
+        size = RECORD.size + len(payload)
+
+        if self.position + size > len(self.map):
+            self.rotate(size)
+
+        self.map[self.position:self.position + RECORD.size] = RECORD.pack(kind, len(payload))
+        self.map[self.position + RECORD.size:self.position + size] = payload
+        self.position += size
+        self.stats['bytes'] += size
+
+    def openfile(self, minsize:int=0):
+        self.file = open(self.path, 'w+b')
+        self.file.truncate(max(self.filesize, len(MAGIC) + minsize))
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.map[0:len(MAGIC)] = MAGIC
+        self.position = len(MAGIC)
+        self.stats['files'] += 1
+
+    def closefile(self):
+        if self.map is None:
+            return
+
+        self.map.flush()
+        self.map.close()
+        self.file.truncate(self.position)
+        self.file.close()
+        self.map = None
+
+    def rotate(self, size:int):
+        '''
+        Close the full file, shift the older files and continue in a new file
+        '''
+        self.closefile()
+
+        for i in range(self.maxfiles - 1, 0, -1):
+            source = self.path + ('.' + str(i - 1) if i > 1 else '')
+            if os.path.exists(source):
+                os.replace(source, self.path + '.' + str(i))
+
+        self.openfile(size + RECORD.size + len(self.header))
+        self.map[self.position:self.position + RECORD.size] = RECORD.pack(HEADER, len(self.header))
+        self.map[self.position + RECORD.size:self.position + RECORD.size + len(self.header)] = self.header
+        self.position += RECORD.size + len(self.header)
+
+
+class Adsrecording(object):
+    '''
+    Reader of a recording of the Adsrecorder
+
+    Attrs:
+        path [STRING]: path of the recording file
+        registry [Ads_Types]: datatypes of the last read layout
+    '''
+
+    def __init__(self, path:str):
+        self.path = path
+        self.registry = None
+
+    def records(self):
+        '''
+        Return: Generator of (kind, payload) of the records of the file
+        '''
+        with open(self.path, 'rb') as file:
+            data = file.read()
+
+        if not data.startswith(MAGIC):
+            raise ValueError("Not an ADS recording: " + str(self.path))
+
+        position = len(MAGIC)
+
+        while position + RECORD.size <= len(data):
+            kind, length = RECORD.unpack_from(data, position)
+
+            if kind not in (HEADER, SEGMENT):
+                break
+
+            position += RECORD.size
+            yield kind, data[position:position + length]
+            position += length
+
+    def frames(self):
+        '''
+        Return: Generator of (cycle, monotonic timestamp [ns], layout, image) of each recorded cycle,
+                layout: ads name -> (Ads_Type, offset)
+        '''
+        layout = None
+        pagesize = 0
+
+        for kind, payload in self.records():
+            if kind == HEADER:
+                header = json.loads(payload.decode('utf-8'))
+                registry = self.registry = Ads_Types(header['datatypes'])
+                pagesize = header['pagesize']
+                layout = {adsname: (registry.get(typename), offset)
+                          for adsname, typename, offset, size in header['symbols']}
+                continue
+
+            data = zlib.decompress(payload)
+            ncycles, ndeltas, nkeyframe = SEGMENTHEADER.unpack_from(data)
+            position = SEGMENTHEADER.size
+            columns = list()
+
+            for typecode, count in (('Q', ncycles), ('q', ncycles), ('I', ndeltas), ('I', ndeltas)):
+                column = array(typecode)
+                column.frombytes(data[position:position + count * column.itemsize])
+                columns.append(column)
+                position += count * column.itemsize
+
+            cycles, timestamps, deltacycles, deltapages = columns
+            image = bytearray(data[position:position + nkeyframe])
+            position += nkeyframe
+            delta = 0
+
+            for i in range(ncycles):
+                while delta < ndeltas and deltacycles[delta] == i:
+                    start = deltapages[delta] * pagesize
+                    length = min(pagesize, nkeyframe - start)
+                    image[start:start + length] = data[position:position + length]
+                    position += length
+                    delta += 1
+
+                yield cycles[i], timestamps[i], layout, bytes(image)
+
+    def changes(self):
+        '''
+        Return: Generator of (cycle, monotonic timestamp [ns], values of the changed symbols) of each cycle
+        '''
+        previous = None
+
+        for cycle, timestamp, layout, image in self.frames():
+            values = {}
+
+            for adsname, (adstype, offset) in layout.items():
+                if adstype is None:
+                    continue
+
+                if previous is None or len(previous) != len(image) or \
+                   image[offset:offset + adstype.size] != previous[offset:offset + adstype.size]:
+                    values[adsname] = adstype.unpack_from(image, offset)
+
+            previous = image
+            yield cycle, timestamp, values
+
+    def series(self, adsname:str):
+        '''
+        Return: (monotonic timestamp [ns], value) of each change of a symbol
+        '''
+        return [(timestamp, values[adsname]) for cycle, timestamp, values in self.changes() if adsname in values]
@@ -0,0 +1,255 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import struct
+import time
+from pyads.constants import ADSIGRP_SUMUP_WRITE
+from models.adsrecorder import Adsrecording
+from utils.fakeconnection import FakeConnection
+
+
+class Adsreplayconnection(FakeConnection):
+    '''
+    Stand-in for pyads.Connection which replays a recording of the Adsrecorder
+
+    The simulated PLC memory shows the process image of one recorded cycle.
+    The frames are advanced by the caller with nextframe(), or follow the
+    clock at the given speed, so it can be used as connection of the
+    AdsClienthandler. Writes are captured instead of reaching a PLC, the
+    next frame overwrites them like the recorded PLC program does.
+
+    Attrs:
+        recording [Adsrecording]: replayed recording
+        speed [FLOAT]: None -> frames advanced by nextframe(), 1.0 -> real time, N -> N times faster
+        cycle [INT]: recorded cycle of the current frame, None -> no frame loaded
+        timestamp [INT]: monotonic timestamp of the current frame [ns]
+        origin [INT]: monotonic timestamp of the first frame [ns]
+        frames [INT]: number of loaded frames
+        finished [BOOL]: True -> the last frame is loaded
+        writes [LIST]: (cycle, ads name, value) of each captured write
+    '''
+
+    def __init__(self, path:str, netid:str=None, port:int=None, speed:float=None, latency:float=0.0):
+        '''
+        Args:
+            path [String]: path of the recording file
+            speed [float]: None or 0 -> frames advanced by nextframe(), otherwise replay speed of the clock
+            latency [float]: delay of each ADS request [s]
+        '''
+        FakeConnection.__init__(self, netid, port, latency=latency)
+        self.recording = Adsrecording(path)
+        self.reader = self.recording.frames()
+        self.speed = speed or None
+        self.layout = None
+        self.slots = list()
+        self.cycle = None
+        self.timestamp = None
+        self.origin = None
+        self.started = None
+        self.frames = 0
+        self.finished = False
+        self.writes = list()
+        self.pending = next(self.reader, None)
+
+        if self.pending is None:
+            raise ValueError("Empty ADS recording: " + str(path))
+
+        # The symbols of the first frame are known before the first request
+        self.nextframe()
+
+    def nextframe(self)->bool:
+        '''
+        Load the next recorded cycle into the simulated PLC memory
+
+        Return: True -> loaded, False -> the recording is finished
+        '''
+        frame = self.pending
+
+        if frame is None:
+            self.finished = True
+            return False
+
+        self.pending = next(self.reader, None)
+        self.finished = self.pending is None
+        self.loadframe(*frame)
+
+        return True
+
+    def loadframe(self, cycle:int, timestamp:int, layout:dict, image:bytes):
+        if layout is not self.layout:
+            self.loadlayout(layout)
+
+        notified = {adsname for adsname, callback in self.notifications.values()}
+        changed = list()
+
+        with self.lock:
+            for adsname, memory, start, end in self.slots:
+                data = image[start:end]
+
+                if adsname in notified and memory != data:
+                    changed.append(adsname)
+
+                memory[:] = data
+
+        self.cycle = cycle
+        self.timestamp = timestamp
+        self.frames += 1
+
+        if self.origin is None:
+            self.origin = timestamp
+
+        for handle, (adsname, callback) in list(self.notifications.items()):
+            if adsname in changed:
+                callback(handle, adsname, time.time(), bytes(self.memory[adsname]))
+
+    def loadlayout(self, layout:dict):
+        '''
+        Add the symbols of a recorded layout, symbols of an older layout keep their PLC memory offset
+        '''
+        self.registry = self.recording.registry
+        self.layout = layout
+
+        for adsname, (adstype, offset) in layout.items():
+            if adstype is not None and adsname not in self.memory:
+                self.addsymbol(adsname, adstype.name)
+
+        self.slots = [(adsname, self.memory[adsname], offset, offset + adstype.size)
+                      for adsname, (adstype, offset) in layout.items()
+                      if adstype is not None and self.types[adsname].size == adstype.size]
+
+    def sync(self):
+        '''
+        Load the frames which are due at the replay clock
+        '''
+        if self.started is None:
+            self.started = time.perf_counter()
+
+        elapsed = (time.perf_counter() - self.started) * self.speed * 1e9
+
+        while self.pending is not None and self.pending[1] - self.origin <= elapsed:
+            self.nextframe()
+
+    def open(self):
+        FakeConnection.open(self)
+
+        # The replay clock starts with the connection
+        self.started = time.perf_counter()
+
+    def request(self):
+        if self.speed is not None:
+            self.sync()
+
+        FakeConnection.request(self)
+
+    def read_write(self, igroup:int, ioffs:int, read_datatype, value, write_datatype,
+                   return_ctypes:bool=False, check_length:bool=True):
+        result = FakeConnection.read_write(self, igroup, ioffs, read_datatype, value, write_datatype,
+                                           return_ctypes, check_length)
+
+        if igroup == ADSIGRP_SUMUP_WRITE:
+            for i in range(ioffs):
+                if struct.unpack_from('<I', result, 4 * i)[0]:
+                    continue
+
+                adsname = self.symbolname(*struct.unpack_from('<II', value, 12 * i))
+                self.writes.append((self.cycle, adsname, self.getvalue(adsname)))
+
+        return result
+
+    def write_list_by_name(self, data, *args, **kwargs):
+        result = FakeConnection.write_list_by_name(self, data, *args, **kwargs)
+
+        for adsname in data:
+            self.writes.append((self.cycle, adsname, self.getvalue(adsname)))
+
+        return result
+
+
+class Adsreplay(object):
+    '''
+    Offline replay of a recording through the ADS data model
+
+    Runs the ADS cycle of the model (writeads, then readads) once per recorded
+    cycle on an Adsreplayconnection, without a PLC. Used for reproducible
+    load and regression runs of the consumers of the model.
+
+    Attrs:
+        adsmodel [Adsdata]: model fed by the replay
+        path [STRING]: path of the recording file
+        speed [FLOAT]: 1.0 -> recorded timing, N -> N times faster, 0 -> as fast as possible
+        plc [Adsreplayconnection]: connection of the last run
+        writes [LIST]: (cycle, ads name, value) of each write of the model
+        stats [DICT]: cycles, duration [s], cycles per second and max. lag behind the recorded timing [s]
+    '''
+
+    def __init__(self, adsmodel, path:str, speed:float=0.0, latency:float=0.0):
+        self.adsmodel = adsmodel
+        self.path = path
+        self.speed = speed
+        self.latency = latency
+        self.plc = None
+        self.writes = list()
+        self.stats = {'cycles': 0,
+                      'duration': 0.0,
+                      'cyclespersecond': 0.0,
+                      'maxlag': 0.0}
+
+    def run(self, maxcycles:int=None)->dict:
+        '''
+        Replay the recording
+
+        Args:
+            maxcycles [int]: max. number of replayed cycles, None -> whole recording
+
+        Return: stats of the run
+        '''
+        plc = self.plc = Adsreplayconnection(self.path, latency=self.latency)
+        plc.open()
+
+        if self.adsmodel.resolvesymbols(plc):
+            logging.warning("Cannot find all ads symbols in the recording " + str(self.path))
+
+        self.writes = plc.writes
+        cycles = 0
+        maxlag = 0.0
+        start = time.perf_counter()
+
+        try:
+            while maxcycles is None or cycles < maxcycles:
+                if self.speed:
+                    due = start + (plc.timestamp - plc.origin) / 1e9 / self.speed
+                    delay = due - time.perf_counter()
+
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        maxlag = max(maxlag, -delay)
+
+                self.adsmodel.writeads(plc)
+                self.adsmodel.readads(plc)
+                cycles += 1
+
+                if not plc.nextframe():
+                    break
+
+        finally:
+            duration = time.perf_counter() - start
+            plc.close()
+
+        self.stats = {'cycles': cycles,
+                      'duration': duration,
+                      'cyclespersecond': cycles / duration if duration > 0 else 0.0,
+                      'maxlag': maxlag}
+        logging.info("Replayed " + str(cycles) + " cycles in " + str(round(duration, 3)) + " s")
+
+        return self.stats
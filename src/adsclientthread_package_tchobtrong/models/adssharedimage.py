@@ -0,0 +1,333 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import json
+import logging
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from utils.ads_types import Ads_Types
+
+
+# Segment layout: header, symbol layout (json), packed process image
+# Header: magic, sequence, then layout version, cycle, timestamp, layout bytes, image offset, image bytes
+HEADER = struct.Struct('<8sQQQdQQQ')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCEOFFSET = 8
+BODY = struct.Struct('<QQdQQQ')
+BODYOFFSET = 16
+
+# Magic of a segment in use and of a segment replaced by a larger one
+OPEN = b'ADSSHM1\n'
+CLOSED = b'ADSSHM0\n'
+
+# Min. size of a segment and alignment of the process image
+MINSIZE = 65536
+ALIGNMENT = 64
+
+# Number of attempts of a reader to get a consistent copy
+MAXRETRIES = 1000
+
+
+class Adssharedimage(object):
+    '''
+    Publisher of the process image into a named shared memory segment
+
+    The ADS thread copies the image of each published snapshot into the
+    segment. A sequence counter works as seqlock: it is odd while the
+    image is written, readers retry until they copied the image between
+    two equal, even counter values. The writer never waits for readers.
+
+    Attrs:
+        adsmodel [Adsdata]: model of the published process image
+        name [STRING]: name of the shared memory segment
+        size [INT]: size of the segment, 0 -> twice the size of the first image
+        memory [SharedMemory]: segment, None -> not started
+        layout [DICT]: symbol index of the published layout
+        sequence [INT]: seqlock counter, odd -> write in progress
+    '''
+
+    def __init__(self, adsmodel, name:str, size:int=0):
+        self.adsmodel = adsmodel
+        self.name = name
+        self.size = size
+        self.memory = None
+        self.layout = None
+        self.layoutversion = 0
+        self.layoutsize = 0
+        self.imageoffset = 0
+        self.sequence = 0
+
+    def start(self):
+        '''
+        Create the segment and publish each snapshot of the model
+        '''
+        snapshot = self.adsmodel.getsnapshot()
+        self.create(self.segmentsize(snapshot))
+
+        if snapshot is not None:
+            self.publish(snapshot)
+
+        self.adsmodel.sharedimage = self
+
+    def stop(self):
+        '''
+        Stop publishing and remove the segment
+        '''
+        if self.adsmodel.sharedimage is self:
+            self.adsmodel.sharedimage = None
+
+        self.close()
+
+    def segmentsize(self, snapshot, layout:bytes=b'')->int:
+        imagesize = len(snapshot.image) if snapshot is not None else 0
+        needed = HEADER.size + len(layout) + ALIGNMENT + imagesize
+
+        return max(self.size, 2 * needed, MINSIZE)
+
+    def create(self, size:int):
+        try:
+            self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+
+        except FileExistsError:
+            # Left over by a crashed client
+            logging.warning("Replace the shared memory segment " + str(self.name))
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(self.name, create=True, size=size)
+
+        self.memory.buf[0:HEADER.size] = HEADER.pack(OPEN, self.sequence, 0, 0, 0.0, 0, 0, 0)
+        self.layout = None
+        logging.info("Created the shared memory segment " + str(self.name) + " of " + str(size) + " bytes")
+
+    def close(self):
+        if self.memory is None:
+            return
+
+        # Readers attached to the segment attach again
+        self.memory.buf[0:len(CLOSED)] = CLOSED
+        self.memory.close()
+
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+        self.memory = None
+
+    def publish(self, snapshot):
+        '''
+        Copy the process image of the snapshot into the segment, called by the ADS thread
+        '''
+        try:
+            layout = None
+
+            if snapshot.index is not self.layout:
+                layout = self.packlayout(snapshot)
+
+                if ALIGNMENT + len(layout) + len(snapshot.image) > len(self.memory.buf) - HEADER.size:
+                    self.close()
+                    self.create(self.segmentsize(snapshot, layout))
+
+            buf = self.memory.buf
+            self.sequence += 1
+            SEQUENCE.pack_into(buf, SEQUENCEOFFSET, self.sequence)
+
+            if layout is not None:
+                self.layout = snapshot.index
+                self.layoutversion += 1
+                self.layoutsize = len(layout)
+                self.imageoffset = -(-(HEADER.size + len(layout)) // ALIGNMENT) * ALIGNMENT
+                buf[HEADER.size:HEADER.size + len(layout)] = layout
+
+            image = snapshot.image
+            buf[self.imageoffset:self.imageoffset + len(image)] = image
+            BODY.pack_into(buf, BODYOFFSET, self.layoutversion, snapshot.cycle, snapshot.timestamp,
+                           self.layoutsize, self.imageoffset, len(image))
+            self.sequence += 1
+            SEQUENCE.pack_into(buf, SEQUENCEOFFSET, self.sequence)
+
+        except Exception as e:
+            logging.error("Cannot publish the shared process image: " + str(e))
+
+    def packlayout(self, snapshot)->bytes:
+        '''
+        Return: Symbol layout of the snapshot, symbols with an unknown datatype are not shared
+        '''
+        types = snapshot.types
+        symbols = [[adsname, types[i].name, snapshot.offsets[i]]
+                   for adsname, i in snapshot.index.items() if types[i] is not None]
+        layout = {'symbols': symbols,
+                  'datatypes': self.adsmodel.adsdata.registry.declarations}
+
+        return json.dumps(layout, default=str).encode('utf-8')
+
+
+class Adssharedclient(object):
+    '''
+    Read-only client of a process image published by Adssharedimage
+
+    Reads the symbols of another process by name without an ADS connection.
+
+    Attrs:
+        name [STRING]: name of the shared memory segment
+        layout [DICT]: ads name -> (Ads_Type, offset in the image)
+        layoutversion [INT]: layout version of the segment of the loaded layout
+        cycle [INT]: ADS cycle of the last read
+        timestamp [FLOAT]: time.time() of the ADS cycle of the last read
+    '''
+
+    def __init__(self, name:str):
+        self.name = name
+        self.memory = None
+        self.layout = {}
+        self.layoutversion = None
+        self.cycle = None
+        self.timestamp = None
+        self.stats = {'retries': 0}
+
+    def attach(self):
+        try:
+            self.memory = shared_memory.SharedMemory(self.name, track=False)
+
+        except TypeError:
+            # Python < 3.13 tracks attached segments and removes them at exit
+            self.memory = shared_memory.SharedMemory(self.name)
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+
+        self.layoutversion = None
+
+    def close(self):
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+
+    def copy(self, start:int=None, end:int=None):
+        '''
+        Copy consistent data of one published cycle, with the seqlock protocol
+
+        Args:
+            start, end [INT]: range of the image, None -> whole image
+
+        Return: (header, copied bytes of the image)
+        '''
+        for attempt in range(MAXRETRIES):
+            if self.memory is None:
+                self.attach()
+
+            buf = self.memory.buf
+            sequence = SEQUENCE.unpack_from(buf, SEQUENCEOFFSET)[0]
+            header = HEADER.unpack_from(buf)
+
+            if header[0] != OPEN:
+                self.close()
+                time.sleep(0.001)
+                continue
+
+            if sequence & 1 or header[1] != sequence:
+                self.stats['retries'] += 1
+                time.sleep(0)
+                continue
+
+            magic, sequence, layoutversion, cycle, timestamp, layoutsize, imageoffset, imagesize = header
+
+            if layoutversion != self.layoutversion:
+                layout = bytes(buf[HEADER.size:HEADER.size + layoutsize])
+
+                if SEQUENCE.unpack_from(buf, SEQUENCEOFFSET)[0] != sequence:
+                    continue
+
+                self.loadlayout(layout)
+                self.layoutversion = layoutversion
+                continue
+
+            if start is None:
+                data = bytes(buf[imageoffset:imageoffset + imagesize])
+            else:
+                data = bytes(buf[imageoffset + start:imageoffset + end])
+
+            if SEQUENCE.unpack_from(buf, SEQUENCEOFFSET)[0] == sequence:
+                self.cycle = cycle
+                self.timestamp = timestamp
+                return header, data
+
+            self.stats['retries'] += 1
+
+        raise TimeoutError("No consistent copy of the shared process image " + str(self.name))
+
+    def loadlayout(self, layout:bytes):
+        content = json.loads(layout.decode('utf-8'))
+        registry = Ads_Types(content['datatypes'])
+        self.layout = {adsname: (registry.get(typename), offset)
+                       for adsname, typename, offset in content['symbols']}
+
+    def read(self, adsdataname):
+        '''
+        Read single data from the shared process image
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+
+        Return: Value of the symbol, None -> unknown symbol
+        '''
+        try:
+            for attempt in range(MAXRETRIES):
+                # Load the current layout for a symbol not yet known
+                if self.layoutversion is None or adsdataname not in self.layout:
+                    self.copy(0, 0)
+
+                layoutversion = self.layoutversion
+                adstype, offset = self.layout[adsdataname]
+                header, data = self.copy(offset, offset + adstype.size)
+
+                # The layout changed in between
+                if header[2] == layoutversion:
+                    return adstype.unpack_from(data, 0)
+
+                self.stats['retries'] += 1
+
+            logging.warning("Cannot read shared image : [" + str(adsdataname) + "] : the layout changed "
+                            + str(MAXRETRIES) + " times during the read")
+            return
+
+        except Exception as e:
+            logging.warning("Cannot read shared image : [" + str(adsdataname) + "] :" + str(e))
+            return
+
+    def readmany(self, adsdatanames)->dict:
+        '''
+        Read several data of the same ADS cycle
+
+        Return: ads name -> value, None -> unknown symbol
+        '''
+        try:
+            header, image = self.copy()
+
+        except Exception as e:
+            logging.warning("Cannot read shared image : " + str(e))
+            return dict.fromkeys(adsdatanames)
+
+        values = {}
+
+        for adsdataname in adsdatanames:
+            symbol = self.layout.get(adsdataname)
+
+            if symbol is None:
+                logging.warning("Cannot read shared image : [" + str(adsdataname) + "] : unknown symbol")
+                values[adsdataname] = None
+                continue
+
+            adstype, offset = symbol
+            values[adsdataname] = adstype.unpack_from(image, offset)
+
+        return values
@@ -0,0 +1,118 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+
+
+class Adssnapshot(object):
+    '''
+    Immutable copy of the process image after one ADS cycle
+
+    Consumer threads read any number of values of the same cycle without
+    taking the lock of the ADS data model.
+
+    Attrs:
+        cycle [INT]: number of the ADS read cycle
+        timestamp [FLOAT]: time.time() when the snapshot was taken
+        image [BYTES]: copy of the packed process image
+        objects [TUPLE]: copy of the values of symbols with an unknown datatype
+    '''
+    __slots__ = ('cycle', 'timestamp', 'image', 'objects', 'index', 'offsets', 'types')
+
+    def __init__(self, cycle:int, timestamp:float, adsdata):
+        '''
+        Args:
+            adsdata [Ads_Vars]: process image to copy, the caller holds the model lock
+        '''
+        self.cycle = cycle
+        self.timestamp = timestamp
+        self.image = bytes(adsdata.image)
+        self.objects = tuple(adsdata.objects)
+
+        # The symbol layout only changes with the symbol list, share it
+        self.index = adsdata.index
+        self.offsets = adsdata.offsets
+        self.types = adsdata.types
+
+    def __contains__(self, adsdataname):
+        return adsdataname in self.index
+
+    def __getitem__(self, adsdataname):
+        i = self.index[adsdataname]
+        adstype = self.types[i]
+
+        if adstype is None:
+            return self.objects[i]
+
+        return adstype.unpack_from(self.image, self.offsets[i])
+
+    def read(self, adsdataname):
+        '''
+        Read single data from the snapshot
+
+        Args:
+            adsdataname [String]: Ads variable name, such as GVL.input01
+
+        Return: Value of the symbol, None -> unknown symbol
+        '''
+        try:
+            return self[adsdataname]
+
+        except Exception as e:
+            logging.warning("Cannot read snapshot : [" + str(adsdataname) + "] :" + str(e))
+            return
+
+    def readlist(self, adsdatanames):
+        '''
+        Return: Values of the symbols of the same cycle
+        '''
+        return {adsdataname: self.read(adsdataname) for adsdataname in adsdatanames}
+
+    def changed(self, previous, adsdatanames):
+        '''
+        Compare the raw values with a previous snapshot
+
+        Args:
+            previous [Adssnapshot]: snapshot of an earlier cycle, None -> all symbols changed
+            adsdatanames [LIST]: names of the symbols to compare
+
+        Return: Names of the changed symbols
+        '''
+        # Symbols removed by a reload of the ads symbol list are skipped
+        adsdatanames = [adsdataname for adsdataname in adsdatanames if adsdataname in self.index]
+
+        if previous is None:
+            return adsdatanames
+
+        if previous.index is not self.index:
+            # Symbols were added in between, compare the values
+            return [adsdataname for adsdataname in adsdatanames
+                    if adsdataname not in previous.index or self[adsdataname] != previous[adsdataname]]
+
+        changed = list()
+
+        for adsdataname in adsdatanames:
+            i = self.index[adsdataname]
+            adstype = self.types[i]
+
+            if adstype is None:
+                if self.objects[i] != previous.objects[i]:
+                    changed.append(adsdataname)
+                continue
+
+            start = self.offsets[i]
+            end = start + adstype.size
+
+            if self.image[start:end] != previous.image[start:end]:
+                changed.append(adsdataname)
+
+        return changed
@@ -0,0 +1,196 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import threading
+import time
+from numbers import Number
+
+
+class Adssubscription(object):
+    '''
+    Subscription to the value changes of a set of symbols
+
+    A change is delivered to the callback as callback(adsname, value, snapshot)
+    or put into the queue as (adsname, value, cycle).
+
+    Attrs:
+        names [FROZENSET]: names of the subscribed symbols
+        deadband [FLOAT]: min. change of numeric values, 0 -> every change
+        ratelimit [FLOAT]: min. interval between two changes of a symbol [s], 0 -> no limit
+        values [DICT]: last delivered value of each symbol
+        times [DICT]: time.monotonic() of the last delivery of each symbol
+        pending [SET]: changes held back by the rate limit
+    '''
+
+    def __init__(self, names, callback=None, queue=None, deadband:float=0.0, ratelimit:float=0.0):
+        if callback is None and queue is None:
+            raise ValueError("A subscription requires a callback or a queue")
+
+        self.names = frozenset(names)
+        self.callback = callback
+        self.queue = queue
+        self.deadband = deadband
+        self.ratelimit = ratelimit
+        self.values = {}
+        self.times = {}
+        self.pending = set()
+
+    def setbaseline(self, snapshot):
+        '''
+        Take the current values as reference for the deadband
+        '''
+        if snapshot is not None:
+            self.values = {adsname: snapshot.read(adsname) for adsname in self.names}
+
+    def discard(self, names):
+        self.names = self.names - names
+        self.pending = self.pending - names
+
+        for adsname in names:
+            self.values.pop(adsname, None)
+            self.times.pop(adsname, None)
+
+    def update(self, changed, snapshot, now:float):
+        '''
+        Deliver the changed symbols which pass the deadband and the rate limit
+
+        Args:
+            changed [SET]: names of the changed symbols of the cycle
+        '''
+        for adsname in (self.names & changed) | self.pending:
+            value = snapshot.read(adsname)
+            last = self.values.get(adsname)
+
+            if self.deadband and self.isnumeric(value) and self.isnumeric(last) \
+                    and abs(value - last) < self.deadband:
+                self.pending.discard(adsname)
+                continue
+
+            if self.ratelimit and now - self.times.get(adsname, -self.ratelimit) < self.ratelimit:
+                self.pending.add(adsname)
+                continue
+
+            self.pending.discard(adsname)
+            self.values[adsname] = value
+            self.times[adsname] = now
+            self.deliver(adsname, value, snapshot)
+
+    def deliver(self, adsname, value, snapshot):
+        try:
+            if self.callback is not None:
+                self.callback(adsname, value, snapshot)
+            else:
+                self.queue.put((adsname, value, snapshot.cycle))
+
+        except Exception as e:
+            logging.error("Cannot deliver the change of [" + str(adsname) + "]: " + str(e))
+
+    @staticmethod
+    def isnumeric(value)->bool:
+        return isinstance(value, Number) and not isinstance(value, bool)
+
+
+class Adsdispatcher(threading.Thread):
+    '''
+    Dispatcher thread of the subscriptions
+
+    The ADS thread only hands over the latest snapshot. The changes are
+    computed once per snapshot for all subscriptions and delivered off the
+    ADS thread. A slow dispatcher skips snapshots but never misses the net
+    change, since it always compares against the last processed snapshot.
+    '''
+
+    def __init__(self, snapshot=None):
+        '''
+        Args:
+            snapshot [Adssnapshot]: reference of the first change detection
+        '''
+        threading.Thread.__init__(self, name="ADS dispatcher", daemon=True)
+        self.condition = threading.Condition()
+        self.subscriptions = list()
+        self.previous = snapshot
+        self.latest = None
+        self.isrunning = True
+
+    def add(self, subscription:Adssubscription):
+        with self.condition:
+            subscription.setbaseline(self.previous)
+            self.subscriptions = self.subscriptions + [subscription]
+
+    def remove(self, subscription:Adssubscription):
+        with self.condition:
+            self.subscriptions = [item for item in self.subscriptions if item is not subscription]
+
+    def discard(self, names):
+        '''
+        Remove symbols from all subscriptions, e.g. symbols removed from the ads symbol list
+        '''
+        names = frozenset(names)
+
+        with self.condition:
+            for subscription in self.subscriptions:
+                subscription.discard(names)
+
+    def put(self, snapshot):
+        '''
+        Hand over the snapshot of a new cycle, called by the ADS thread
+        '''
+        with self.condition:
+            self.latest = snapshot
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.isrunning = False
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.latest is None and self.isrunning:
+                    self.condition.wait()
+
+                if not self.isrunning:
+                    return
+
+                snapshot = self.latest
+                self.latest = None
+                subscriptions = self.subscriptions
+
+            try:
+                self.dispatch(snapshot, subscriptions)
+
+            except Exception as e:
+                logging.error("Cannot dispatch the changes of cycle " + str(snapshot.cycle) + ": " + str(e))
+
+    def dispatch(self, snapshot, subscriptions):
+        '''
+        Compute the changes of the snapshot in bulk and update all subscriptions
+        '''
+        previous = self.previous
+        self.previous = snapshot
+
+        if previous is not None and snapshot.image == previous.image and snapshot.objects == previous.objects:
+            changed = set()
+        else:
+            names = set()
+            for subscription in subscriptions:
+                names.update(subscription.names)
+
+            changed = set(snapshot.changed(previous, names))
+
+        now = time.monotonic()
+
+        for subscription in subscriptions:
+            if changed or subscription.pending:
+                subscription.update(changed, snapshot, now)
@@ -0,0 +1,73 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import os
+import threading
+
+
+class Adssymbolwatcher(threading.Thread):
+    '''
+    Watcher of the ads symbol list file
+
+    A changed file is parsed and compared in this thread, the ADS thread
+    only applies the differences between two cycles.
+
+    Attrs:
+        adsmodel [Adsdata]: model of the ads symbol list
+        filepath [STRING]: path of the ads symbol list (yaml)
+        interval [FLOAT]: check interval of the modification time [s]
+    '''
+
+    def __init__(self, adsmodel, filepath:str, interval:float=1.0):
+        threading.Thread.__init__(self, name="ADS symbol watcher", daemon=True)
+        self.adsmodel = adsmodel
+        self.filepath = filepath
+        self.interval = interval
+        self.stopevent = threading.Event()
+        self.mtime = self.getmtime()
+
+    def getmtime(self):
+        try:
+            return os.stat(self.filepath).st_mtime_ns
+
+        except OSError:
+            return None
+
+    def check(self):
+        '''
+        Reload the ads symbol list if the file changed
+
+        Return: Differences of the queued reload, None -> unchanged
+        '''
+        mtime = self.getmtime()
+
+        if mtime is None or mtime == self.mtime:
+            return None
+
+        self.mtime = mtime
+
+        return self.adsmodel.reloadsymbols(self.filepath)
+
+    def run(self):
+        while not self.stopevent.wait(self.interval):
+            try:
+                self.check()
+
+            except Exception as e:
+                logging.error("Cannot check the ads symbol list: " + str(e))
+
+    def stop(self):
+        self.stopevent.set()
+
+        if self.is_alive():
+            self.join()
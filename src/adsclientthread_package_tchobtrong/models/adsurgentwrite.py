@@ -0,0 +1,63 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import threading
+import time
+
+
+class Adsurgentwrite(object):
+    '''
+    Urgent write request, sent by the ADS thread between two cycles
+
+    Attrs:
+        values [DICT]: ads name -> value to write
+        confirm [BOOL]: True -> read the values back after the write
+        queued [FLOAT]: time.perf_counter() when the request was queued
+        success [BOOL]: True -> written (and confirmed), None -> not yet done
+        errors [DICT]: ads name -> error of the failed symbols
+        readback [DICT]: values read back after the write, confirm only
+        latency [FLOAT]: duration from queueing to the end of the write [s]
+    '''
+
+    def __init__(self, values:dict, confirm:bool=False):
+        self.values = values
+        self.confirm = confirm
+        self.queued = time.perf_counter()
+        self.success = None
+        self.errors = {}
+        self.readback = {}
+        self.latency = None
+        self.event = threading.Event()
+
+    def finish(self, errors:dict=None, readback:dict=None):
+        '''
+        Complete the request, called by the ADS thread
+        '''
+        self.errors = dict(errors or {})
+        self.readback = dict(readback or {})
+        self.success = not self.errors
+        self.latency = time.perf_counter() - self.queued
+        self.event.set()
+
+    @property
+    def done(self)->bool:
+        return self.event.is_set()
+
+    def wait(self, timeout:float=None)->bool:
+        '''
+        Wait until the request is done
+
+        Return: True -> written (and confirmed), False -> failed or timeout
+        '''
+        self.event.wait(timeout)
+
+        return bool(self.success)
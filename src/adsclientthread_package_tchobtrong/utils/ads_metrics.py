@@ -0,0 +1,240 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Upper bounds of the latency histograms [s]
+LATENCYBUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5, 1.0, math.inf)
+
+CONTENTTYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+class Ads_Metrics(object):
+    '''
+    In-process metrics of the ADS cycle
+
+    Counters, gauges and histograms with optional labels, exported in the
+    OpenMetrics text format.
+
+    Attrs:
+        counters [DICT]: (name, labels) -> value
+        gauges [DICT]: (name, labels) -> value
+        histograms [DICT]: (name, labels) -> [count of each bucket, sum, count]
+    '''
+    enabled = True
+
+    def __init__(self, buckets=LATENCYBUCKETS):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name:str, value=1, **labels):
+        '''
+        Increase a counter
+        '''
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name:str, value, **labels):
+        '''
+        Set a gauge
+        '''
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name:str, value:float, **labels):
+        '''
+        Add a value to a histogram
+        '''
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            histogram = self.histograms.get(key)
+
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def collect(self)->dict:
+        '''
+        Return: Copy of all metrics, name -> list of (labels, value)
+        '''
+        result = {}
+
+        with self.lock:
+            for (name, labels), value in list(self.counters.items()) + list(self.gauges.items()):
+                result.setdefault(name, list()).append((dict(labels), value))
+
+            for (name, labels), (counts, total, count) in self.histograms.items():
+                result.setdefault(name, list()).append((dict(labels), {'buckets': dict(zip(self.buckets, counts)),
+                                                                       'sum': total,
+                                                                       'count': count}))
+
+        return result
+
+    def exposition(self)->str:
+        '''
+        Return: All metrics in the OpenMetrics text format
+        '''
+        lines = list()
+
+        with self.lock:
+            families = {}
+            for (name, labels), value in self.counters.items():
+                families.setdefault(('counter', name), list()).append((labels, value))
+            for (name, labels), value in self.gauges.items():
+                families.setdefault(('gauge', name), list()).append((labels, value))
+            for (name, labels), value in self.histograms.items():
+                families.setdefault(('histogram', name), list()).append((labels, [list(value[0]), value[1], value[2]]))
+
+        for (metrictype, name), samples in sorted(families.items(), key=lambda item: item[0][1]):
+            lines.append('# TYPE ' + name + ' ' + metrictype)
+
+            for labels, value in samples:
+                if metrictype == 'counter':
+                    lines.append(name + '_total' + self.formatlabels(labels) + ' ' + str(value))
+
+                elif metrictype == 'gauge':
+                    lines.append(name + self.formatlabels(labels) + ' ' + str(value))
+
+                else:
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucketcount in zip(self.buckets, counts):
+                        cumulative += bucketcount
+                        le = '+Inf' if bound == math.inf else repr(float(bound))
+                        lines.append(name + '_bucket' + self.formatlabels(labels + (('le', le),)) + ' ' + str(cumulative))
+                    lines.append(name + '_count' + self.formatlabels(labels) + ' ' + str(count))
+                    lines.append(name + '_sum' + self.formatlabels(labels) + ' ' + repr(total))
+
+        lines.append('# EOF')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def formatlabels(labels)->str:
+        if not labels:
+            return ''
+
+        return '{' + ','.join(str(key) + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+                              for key, value in labels) + '}'
+
+
+class Ads_NullMetrics(object):
+    '''
+    Disabled metrics, all calls do nothing
+    '''
+    enabled = False
+
+    def inc(self, name:str, value=1, **labels):
+        pass
+
+    def set(self, name:str, value, **labels):
+        pass
+
+    def observe(self, name:str, value:float, **labels):
+        pass
+
+    def collect(self)->dict:
+        return {}
+
+    def exposition(self)->str:
+        return '# EOF\n'
+
+
+# Shared instance of the disabled metrics
+NULLMETRICS = Ads_NullMetrics()
+
+
+class Ads_TimedLock(object):
+    '''
+    Lock which records the wait and the hold time into the metrics
+    '''
+
+    def __init__(self, metrics:Ads_Metrics, name:str='ads_lock'):
+        self.lock = threading.Lock()
+        self.metrics = metrics
+        self.name = name
+        self.acquired = 0.0
+
+    def acquire(self, blocking:bool=True, timeout:float=-1):
+        start = time.perf_counter()
+        result = self.lock.acquire(blocking, timeout)
+
+        if result:
+            self.acquired = time.perf_counter()
+            self.metrics.observe(self.name + '_wait_seconds', self.acquired - start)
+
+        return result
+
+    def release(self):
+        held = time.perf_counter() - self.acquired
+        self.lock.release()
+        self.metrics.observe(self.name + '_hold_seconds', held)
+
+    def locked(self):
+        return self.lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class Ads_MetricsServer(threading.Thread):
+    '''
+    Local HTTP endpoint of the metrics, GET /metrics
+    '''
+
+    def __init__(self, metrics:Ads_Metrics, host:str='127.0.0.1', port:int=9100):
+        threading.Thread.__init__(self, name="ADS metrics", daemon=True)
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                body = metrics.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENTTYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug("Metrics request: " + format % args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+
+    def run(self):
+        logging.info("Serving ADS metrics on port " + str(self.server.server_address[1]))
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
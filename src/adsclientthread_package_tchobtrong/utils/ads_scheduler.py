@@ -0,0 +1,207 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import bisect
+import logging
+import math
+import time
+from collections import deque
+
+
+# Upper bounds of the cycle period histogram [ms]
+PERIODBUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, math.inf)
+
+
+class Ads_CycleStats(object):
+    '''
+    Live statistics of the ADS cycles
+
+    Attrs:
+        cycles [INT]: number of released cycles
+        overruns [INT]: number of cycles which ended after the next deadline
+        skipped [INT]: number of deadlines skipped by the overrun policy
+        periods [LIST]: cycle period histogram, count per PERIODBUCKETS bucket
+        jitters [DEQUE]: release delay after the deadline of the recent cycles [s]
+        latencies [DICT]: name -> [last, max, total, count] duration of a cycle phase [s]
+    '''
+
+    def __init__(self, window:int=1000):
+        '''
+        Args:
+            window [int]: number of recent cycles for the jitter percentiles
+        '''
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.periods = [0] * len(PERIODBUCKETS)
+        self.jitters = deque(maxlen=window)
+        self.latencies = {}
+
+    def addrelease(self, period:float, jitter:float):
+        '''
+        Add the period and the jitter of a released cycle [s]
+        '''
+        self.cycles += 1
+        self.jitters.append(jitter)
+
+        if period is not None:
+            self.periods[bisect.bisect_left(PERIODBUCKETS, period * 1000.0)] += 1
+
+    def addlatency(self, name:str, duration:float):
+        '''
+        Add the duration of a cycle phase, such as read or write [s]
+        '''
+        latency = self.latencies.get(name)
+
+        if latency is None:
+            latency = self.latencies[name] = [0.0, 0.0, 0.0, 0]
+
+        latency[0] = duration
+        latency[1] = max(latency[1], duration)
+        latency[2] += duration
+        latency[3] += 1
+
+    def percentile(self, p:float)->float:
+        '''
+        Return: p-th percentile of the recent jitters [s], 0.0 -> no cycle yet
+        '''
+        if not self.jitters:
+            return 0.0
+
+        jitters = sorted(self.jitters)
+        return jitters[min(len(jitters) - 1, int(len(jitters) * p / 100.0))]
+
+    def summary(self)->dict:
+        '''
+        Return: Statistics of the cycles, durations in ms
+        '''
+        return {'cycles': self.cycles,
+                'overruns': self.overruns,
+                'skipped': self.skipped,
+                'jitter_p50': self.percentile(50) * 1000.0,
+                'jitter_p99': self.percentile(99) * 1000.0,
+                'periods': dict(zip(PERIODBUCKETS, self.periods)),
+                'latencies': {name: {'last': last * 1000.0,
+                                     'max': maximum * 1000.0,
+                                     'mean': total / count * 1000.0 if count else 0.0}
+                              for name, (last, maximum, total, count) in self.latencies.items()}}
+
+
+class Ads_Scheduler(object):
+    '''
+    Cycle scheduler with absolute deadlines on the monotonic clock
+
+    The deadlines stay on the grid start + n * cycletime, so the cycle period
+    does not drift with the duration of the ADS requests.
+
+    Overrun policies, if a cycle ends after the next deadline:
+        skip -> skip the missed deadlines, the next cycle starts on the grid
+        catchup -> run the missed cycles back-to-back until the grid is reached
+        log -> log a warning and restart the grid at the end of the cycle
+    '''
+    SKIP = 'skip'
+    CATCHUP = 'catchup'
+    LOG = 'log'
+
+    def __init__(self, cycletime:float, overrunpolicy:str=SKIP, window:int=1000):
+        '''
+        Args:
+            cycletime [float]: cycle time [s]
+            overrunpolicy [String]: skip, catchup or log
+            window [int]: number of recent cycles for the jitter percentiles
+        '''
+        if overrunpolicy not in (self.SKIP, self.CATCHUP, self.LOG):
+            raise ValueError("Unknown overrun policy [" + str(overrunpolicy) + "]")
+
+        self.cycletime = cycletime
+        self.overrunpolicy = overrunpolicy
+        self.deadline = None
+        self.lastrelease = None
+        self.stats = Ads_CycleStats(window)
+
+    def start(self, now:float=None):
+        '''
+        Start the grid, the first cycle is released immediately
+        '''
+        self.deadline = time.monotonic() if now is None else now
+        self.lastrelease = None
+
+    def timeout(self, now:float=None)->float:
+        '''
+        Return: Time until the next deadline [s]
+        '''
+        if self.deadline is None:
+            return 0.0
+
+        return max(0.0, self.deadline - (time.monotonic() if now is None else now))
+
+    def release(self, now:float=None)->bool:
+        '''
+        Release the next cycle, if its deadline is reached
+
+        Return: True -> run the cycle, False -> deadline not yet reached
+        '''
+        if now is None:
+            now = time.monotonic()
+
+        if self.deadline is None:
+            self.start(now)
+
+        if now < self.deadline:
+            return False
+
+        period = None if self.lastrelease is None else now - self.lastrelease
+        self.stats.addrelease(period, now - self.deadline)
+        self.lastrelease = now
+        self.deadline += self.cycletime
+
+        return True
+
+    def finish(self, now:float=None):
+        '''
+        End the released cycle and apply the overrun policy
+        '''
+        if now is None:
+            now = time.monotonic()
+
+        if self.deadline is None or now <= self.deadline:
+            return
+
+        self.stats.overruns += 1
+
+        if self.overrunpolicy == self.SKIP:
+            missed = math.ceil((now - self.deadline) / self.cycletime)
+            self.deadline += missed * self.cycletime
+            self.stats.skipped += missed
+
+        elif self.overrunpolicy == self.LOG:
+            logging.warning("ADS cycle overrun by " + str(round((now - self.deadline) * 1000.0, 3)) + " ms")
+            self.deadline = now
+
+    def wait(self, wakeup=None)->bool:
+        '''
+        Sleep until the deadline and release the next cycle
+
+        Args:
+            wakeup [threading.Event]: ends the sleep early, e.g. for urgent writes between two cycles
+
+        Return: True -> cycle released, False -> woken up before the deadline
+        '''
+        while not self.release():
+            if wakeup is None:
+                time.sleep(self.timeout())
+
+            elif wakeup.wait(self.timeout()):
+                wakeup.clear()
+                return False
+
+        return True
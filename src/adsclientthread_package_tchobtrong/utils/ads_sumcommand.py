@@ -0,0 +1,227 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import struct
+from pyads.constants import ADSIGRP_SUMUP_READ, ADSIGRP_SUMUP_WRITE
+from pyads.structs import SAdsSumRequest
+
+
+# Request and response overhead of each sub-request: index group, index offset, size, error code
+SUBREQUESTBYTES = 16
+
+
+def splitchunks(sizes, maxcount, maxbytes):
+    '''
+    Split sub-requests into chunks within the ADS sum command limits
+
+    Args:
+        sizes [LIST]: data size of each sub-request in bytes
+        maxcount [int]: max. number of sub-requests in a chunk
+        maxbytes [int]: max. payload bytes of a chunk
+
+    Return: (start, end) index of each chunk
+    '''
+    chunks = list()
+    start = 0
+    nbytes = 0
+
+    for i, size in enumerate(sizes):
+        size += SUBREQUESTBYTES
+
+        if i > start and (i - start >= maxcount or nbytes + size > maxbytes):
+            chunks.append((start, i))
+            start = i
+            nbytes = 0
+
+        nbytes += size
+
+    if start < len(sizes):
+        chunks.append((start, len(sizes)))
+
+    return chunks
+
+
+def coalesce(symbols, maxgap:int, maxbytes:int):
+    '''
+    Merge symbols at neighbouring PLC memory addresses into block reads
+
+    Args:
+        symbols [LIST]: (ads name, index group, index offset, size) of each symbol
+        maxgap [int]: max. unused bytes between two symbols of a block, < 0 -> one block per symbol
+        maxbytes [int]: max. byte size of a block
+
+    Return: (index group, index offset, size, members) of each block in memory order,
+            members: (ads name, offset in the block, size) of each symbol
+    '''
+    blocks = list()
+
+    for adsname, igroup, ioffs, size in sorted(symbols, key=lambda symbol: (symbol[1], symbol[2])):
+        if blocks and maxgap >= 0:
+            blockgroup, blockoffs, blocksize, members = blocks[-1]
+            end = max(blockoffs + blocksize, ioffs + size)
+
+            if blockgroup == igroup and ioffs - (blockoffs + blocksize) <= maxgap and end - blockoffs <= maxbytes:
+                members.append((adsname, ioffs - blockoffs, size))
+                blocks[-1] = (blockgroup, blockoffs, end - blockoffs, members)
+                continue
+
+        blocks.append((igroup, ioffs, size, [(adsname, 0, size)]))
+
+    return blocks
+
+
+class AdsSumRead(object):
+    '''
+    Precompiled ADS sum read command
+
+    Each sub-request reads a single symbol or a memory block of several
+    symbols, which are sliced out of the response without copying.
+
+    Attrs:
+        adsnames [LIST]: names of the symbols in request order
+        count [INT]: number of sub-requests
+        request [SAdsSumRequest ARRAY]: sub-requests (index group, index offset, size)
+        errors [struct.Struct]: layout of the error codes at the start of the response
+        offsets [LIST]: (start, end) of the raw data of each sub-request in the response
+        members [LIST]: (ads name, start, end) in the response of the symbols of each sub-request
+        size [INT]: byte size of the response
+    '''
+
+    def __init__(self, blocks):
+        '''
+        Args:
+            blocks [LIST]: (index group, index offset, size, members) of each sub-request,
+                           members: (ads name, offset in the block, size) of each symbol
+        '''
+        self.count = len(blocks)
+        self.request = (SAdsSumRequest * self.count)()
+        self.errors = struct.Struct('<' + 'I' * self.count)
+        self.adsnames = list()
+        self.offsets = list()
+        self.members = list()
+
+        offset = self.errors.size
+
+        for i, (igroup, ioffs, size, members) in enumerate(blocks):
+            self.request[i].iGroup = igroup
+            self.request[i].iOffset = ioffs
+            self.request[i].size = size
+            self.offsets.append((offset, offset + size))
+            self.members.append([(adsname, offset + start, offset + start + membersize)
+                                 for adsname, start, membersize in members])
+            self.adsnames.extend(adsname for adsname, start, membersize in members)
+            offset += size
+
+        self.size = offset
+
+    def execute(self, plc):
+        '''
+        Send the sum read command
+
+        Return: (error codes in request order, raw response as memoryview)
+        '''
+        response = memoryview(plc.read_write(ADSIGRP_SUMUP_READ, self.count, None,
+                                             self.request, None, check_length=False)).cast('B')
+
+        return self.errors.unpack_from(response), response
+
+
+class AdsSumWrite(object):
+    '''
+    Precompiled ADS sum write command
+
+    Attrs:
+        headers [DICT]: packed sub-request (index group, index offset, size) of each symbol
+        sizes [DICT]: byte size of each symbol
+        types [DICT]: Ads_Type of each symbol
+        layouts [DICT]: cached request layout of each write batch
+    '''
+    MAXLAYOUTS = 256
+
+    def __init__(self):
+        self.headers = {}
+        self.sizes = {}
+        self.types = {}
+        self.layouts = {}
+
+    def __contains__(self, adsname):
+        return adsname in self.headers
+
+    def addsymbol(self, adsname, igroup, ioffs, adstype):
+        '''
+        Add a symbol to the command
+
+        Args:
+            adsname [String]: Ads variable name, such as GVL.input01
+            igroup [int]: index group of the sub-request
+            ioffs [int]: index offset of the sub-request
+            adstype [Ads_Type]: datatype of the symbol
+        '''
+        self.headers[adsname] = struct.pack('<III', igroup, ioffs, adstype.size)
+        self.sizes[adsname] = adstype.size
+        self.types[adsname] = adstype
+        self.layouts = {}
+
+    def getlayout(self, adsnames):
+        '''
+        Return: (request header, data codec of elementary datatypes or None, data offsets)
+        '''
+        layout = self.layouts.get(adsnames)
+
+        if layout is None:
+            if len(self.layouts) >= self.MAXLAYOUTS:
+                self.layouts = {}
+
+            header = b''.join(self.headers[adsname] for adsname in adsnames)
+            types = [self.types[adsname] for adsname in adsnames]
+            codec = None
+
+            if all(adstype.fmt is not None for adstype in types):
+                codec = struct.Struct('<' + ''.join(adstype.fmt for adstype in types))
+
+            offsets = list()
+            offset = len(header)
+            for adstype in types:
+                offsets.append(offset)
+                offset += adstype.size
+
+            layout = (header, codec, offsets)
+            self.layouts[adsnames] = layout
+
+        return layout
+
+    def execute(self, plc, writebatch):
+        '''
+        Send the sum write command
+
+        Args:
+            writebatch [DICT]: values of the symbols to write
+
+        Return: Error codes of the failed symbols
+        '''
+        adsnames = tuple(writebatch)
+        header, codec, offsets = self.getlayout(adsnames)
+
+        request = bytearray(header)
+
+        if codec is not None:
+            request += codec.pack(*writebatch.values())
+        else:
+            request += bytes(sum(self.sizes[adsname] for adsname in adsnames))
+            for adsname, offset in zip(adsnames, offsets):
+                self.types[adsname].pack_into(request, offset, writebatch[adsname])
+
+        response = plc.read_write(ADSIGRP_SUMUP_WRITE, len(adsnames), None,
+                                  request, None, check_length=False)
+        errors = struct.unpack_from('<' + 'I' * len(adsnames), response)
+
+        return {adsname: error for adsname, error in zip(adsnames, errors) if error}
@@ -0,0 +1,122 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import marshal
+import os
+import sys
+
+
+# Version of the cache layout, marshal data depends on the Python version
+CACHEFORMAT = (2,) + tuple(sys.version_info[:2])
+
+# Number of PLC projects kept per symbol list, e.g. targets sharing one symbol list
+MAXPROJECTS = 4
+
+
+class Ads_SymbolCache(object):
+    '''
+    Compiled symbol cache in a binary file
+
+    Holds the parsed ads symbol list keyed by the hash of the yaml file and
+    the resolved index group, index offset and size of the symbols keyed by
+    the PLC project, which is identified without the upload of the symbol
+    table. A changed yaml file invalidates all entries.
+
+    Attrs:
+        path [STRING]: path of the cache file
+        yamlhash [STRING]: hash of the ads symbol list of the cached data
+        config [DICT]: parsed ads symbol list
+        projects [DICT]: PLC project -> ads name -> (index group, index offset, size)
+    '''
+
+    def __init__(self, path:str):
+        self.path = path
+        self.yamlhash = None
+        self.config = None
+        self.projects = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as file:
+                content = marshal.load(file)
+
+            if content.get('format') != CACHEFORMAT:
+                logging.info("Ignore the symbol cache of another version: " + str(self.path))
+                return
+
+            self.yamlhash = content['yamlhash']
+            self.config = content['config']
+            self.projects = content['projects']
+
+        except FileNotFoundError:
+            pass
+
+        except Exception as e:
+            logging.warning("Cannot read the symbol cache " + str(self.path) + ": " + str(e))
+
+    def save(self):
+        '''
+        Write the cache file atomically, a failure only disables the cache
+        '''
+        content = {'format': CACHEFORMAT,
+                   'yamlhash': self.yamlhash,
+                   'config': self.config,
+                   'projects': self.projects}
+        temppath = self.path + '.tmp'
+
+        try:
+            with open(temppath, 'wb') as file:
+                marshal.dump(content, file)
+            os.replace(temppath, self.path)
+
+        except Exception as e:
+            logging.warning("Cannot write the symbol cache " + str(self.path) + ": " + str(e))
+
+    def getconfig(self, yamlhash:str):
+        '''
+        Return: Parsed ads symbol list, None -> not cached or the yaml file changed
+        '''
+        if yamlhash != self.yamlhash:
+            return None
+
+        return self.config
+
+    def setconfig(self, yamlhash:str, config):
+        if yamlhash != self.yamlhash:
+            self.projects = {}
+
+        self.yamlhash = yamlhash
+        self.config = config
+        self.save()
+
+    def getsymbols(self, yamlhash:str, project:str):
+        '''
+        Return: ads name -> (index group, index offset, size), None -> not cached for this PLC project
+        '''
+        if yamlhash != self.yamlhash:
+            return None
+
+        return self.projects.get(project)
+
+    def setsymbols(self, yamlhash:str, project:str, symbols:dict):
+        if yamlhash != self.yamlhash:
+            return
+
+        self.projects.pop(project, None)
+
+        while len(self.projects) >= MAXPROJECTS:
+            self.projects.pop(next(iter(self.projects)))
+
+        self.projects[project] = symbols
+        self.save()
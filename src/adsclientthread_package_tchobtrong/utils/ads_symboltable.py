@@ -0,0 +1,225 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import ctypes
+import hashlib
+import struct
+from pyads.constants import ADSIGRP_SYM_DT_UPLOAD, ADSIGRP_SYM_UPLOAD, ADSIGRP_SYM_UPLOADINFO2
+
+
+# Symbol count, symbol table bytes, datatype count, datatype bytes, max./used dynamic symbols
+UPLOADINFO = struct.Struct('<IIIIII')
+
+# Entry length, index group, index offset, size, datatype, flags, name/type/comment length
+SYMBOLENTRY = struct.Struct('<IIIIIIHHH')
+
+# Entry length, version, hash, type hash, size, offset, datatype, flags,
+# name/type/comment length, array dimensions, sub items
+DATATYPEENTRY = struct.Struct('<IIIIIIIIHHHHH')
+
+# Lower bound and number of elements of each array dimension
+ARRAYINFO = struct.Struct('<II')
+
+
+class Ads_SymbolTable(object):
+    '''
+    Symbol table of the ADS server, uploaded with a single ADS request
+
+    Attrs:
+        count [INT]: number of symbols
+        data [BYTES]: raw symbol table of the ADS server
+        digest [STRING]: hash of the raw symbol table, changes with each PLC project change
+        entries [DICT]: upper case ads name -> (ads name, index group, index offset, size, datatype name, flags)
+        datatypes [DICT]: Ads_Types declarations of the uploaded datatype table, empty -> not uploaded
+    '''
+
+    def __init__(self, data, count:int, datatypedata=b'', datatypecount:int=0):
+        self.data = bytes(data)
+        self.count = count
+        self.digest = hashlib.sha1(self.data).hexdigest()
+        self.datatypedata = bytes(datatypedata)
+        self.datatypecount = datatypecount
+        self._entries = None
+        self._datatypes = None
+
+    @staticmethod
+    def uploadinfo(plcconn)->bytes:
+        '''
+        Read the counts and byte sizes of the symbol and datatype tables (1 ADS request)
+
+        Return: Raw upload info in the layout of UPLOADINFO
+        '''
+        return bytes(plcconn.read(ADSIGRP_SYM_UPLOADINFO2, 0, ctypes.c_ubyte * UPLOADINFO.size, return_ctypes=True))
+
+    @classmethod
+    def upload(cls, plcconn, datatypes:bool=False, info:bytes=None):
+        '''
+        Upload the symbol table of the ADS server (2 ADS requests)
+
+        Args:
+            datatypes [bool]: upload the datatype table as well (1 more ADS request)
+            info [bytes]: upload info read before, None -> read with the upload
+
+        Return: Ads_SymbolTable
+        '''
+        if info is None:
+            info = Ads_SymbolTable.uploadinfo(plcconn)
+
+        count, nbytes, datatypecount, datatypebytes = UPLOADINFO.unpack(info)[:4]
+        data = plcconn.read(ADSIGRP_SYM_UPLOAD, 0, ctypes.c_ubyte * nbytes, return_ctypes=True)
+
+        if not datatypes or not datatypebytes:
+            return cls(bytes(data), count)
+
+        datatypedata = plcconn.read(ADSIGRP_SYM_DT_UPLOAD, 0, ctypes.c_ubyte * datatypebytes, return_ctypes=True)
+
+        return cls(bytes(data), count, bytes(datatypedata), datatypecount)
+
+    @staticmethod
+    def pack(symbols)->bytes:
+        '''
+        Pack symbol entries in the layout of the ADS symbol upload
+
+        Args:
+            symbols [LIST]: (ads name, index group, index offset, size, datatype name, flags) of each symbol
+
+        Return: Raw symbol table
+        '''
+        data = bytearray()
+
+        for adsname, igroup, ioffs, size, datatype, flags in symbols:
+            name = adsname.encode('utf-8')
+            typename = datatype.encode('utf-8')
+            body = name + b'\x00' + typename + b'\x00' + b'\x00'
+            length = SYMBOLENTRY.size + len(body)
+            data += SYMBOLENTRY.pack(length, igroup, ioffs, size, 0, flags, len(name), len(typename), 0)
+            data += body
+
+        return bytes(data)
+
+    @staticmethod
+    def packdatatypes(datatypes)->bytes:
+        '''
+        Pack struct datatypes in the layout of the ADS datatype upload
+
+        Args:
+            datatypes [LIST]: (name, size, members) of each struct,
+                              members: (member name, datatype name, offset, size) of each member
+
+        Return: Raw datatype table
+        '''
+        def packentry(name, typename, size, offset, members):
+            body = name.encode('utf-8') + b'\x00' + typename.encode('utf-8') + b'\x00' + b'\x00'
+            subitems = b''.join(packentry(membername, membertype, membersize, memberoffset, ())
+                                for membername, membertype, memberoffset, membersize in members)
+            length = DATATYPEENTRY.size + len(body) + len(subitems)
+            return DATATYPEENTRY.pack(length, 1, 0, 0, size, offset, 0, 0,
+                                      len(name.encode('utf-8')), len(typename.encode('utf-8')), 0,
+                                      0, len(members)) + body + subitems
+
+        return b''.join(packentry(name, '', size, 0, members) for name, size, members in datatypes)
+
+    @property
+    def datatypes(self)->dict:
+        if self._datatypes is None:
+            self._datatypes = self.parsedatatypes()
+
+        return self._datatypes
+
+    def parsedatatypes(self)->dict:
+        '''
+        Return: Ads_Types declarations of the structs and aliases of the raw datatype table
+        '''
+        declarations = {}
+        start = 0
+
+        for i in range(self.datatypecount):
+            if start >= len(self.datatypedata):
+                break
+
+            length, name, typename, size, offset, members = self.parsedatatype(start)
+
+            if members:
+                declarations[name] = {'size': size,
+                                      'members': {member[0]: member[1] for member in members},
+                                      'offsets': {member[0]: member[3] for member in members}}
+            elif typename and typename != name:
+                # Enums and type aliases
+                declarations[name] = {'type': typename}
+
+            if length == 0:
+                break
+            start += length
+
+        return declarations
+
+    def parsedatatype(self, start:int):
+        '''
+        Parse one datatype entry with its sub items
+
+        Return: (entry length, name, datatype name, size, offset, sub items)
+        '''
+        data = self.datatypedata
+        (length, version, hashvalue, typehash, size, offset, datatype, flags,
+         namelength, typelength, commentlength, arraydim, subitems) = DATATYPEENTRY.unpack_from(data, start)
+        position = start + DATATYPEENTRY.size
+        name = data[position:position + namelength].decode('utf-8', 'replace')
+        position += namelength + 1
+        typename = data[position:position + typelength].decode('utf-8', 'replace')
+        position += typelength + 1 + commentlength + 1 + ARRAYINFO.size * arraydim
+        members = list()
+
+        for i in range(subitems):
+            member = self.parsedatatype(position)
+            members.append(member[1:])
+
+            if member[0] == 0:
+                break
+            position += member[0]
+
+        return (length, name, typename, size, offset, members)
+
+    @property
+    def entries(self)->dict:
+        if self._entries is None:
+            self._entries = self.parse()
+
+        return self._entries
+
+    def parse(self)->dict:
+        '''
+        Return: Upper case ads name -> symbol entry of all symbols of the raw table
+        '''
+        entries = {}
+        data = self.data
+        unpack = SYMBOLENTRY.unpack_from
+        start = 0
+
+        for i in range(self.count):
+            length, igroup, ioffs, size, datatype, flags, namelength, typelength, commentlength = unpack(data, start)
+            offset = start + SYMBOLENTRY.size
+            adsname = data[offset:offset + namelength].decode('utf-8', 'replace')
+            offset += namelength + 1
+            typename = data[offset:offset + typelength].decode('utf-8', 'replace')
+            entries[adsname.upper()] = (adsname, igroup, ioffs, size, typename, flags)
+
+            if length == 0:
+                break
+            start += length
+
+        return entries
+
+    def get(self, adsname:str):
+        '''
+        Return: Symbol entry of a symbol, case-insensitive as TwinCAT, None -> not found
+        '''
+        return self.entries.get(adsname.upper())
@@ -0,0 +1,321 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import logging
+import re
+import struct
+
+
+# Struct formats of the TwinCAT elementary datatypes (little endian)
+SCALARS = {'BOOL': '?',
+           'BIT': '?',
+           'BYTE': 'B',
+           'SINT': 'b',
+           'USINT': 'B',
+           'INT': 'h',
+           'UINT': 'H',
+           'WORD': 'H',
+           'DINT': 'i',
+           'UDINT': 'I',
+           'DWORD': 'I',
+           'LINT': 'q',
+           'ULINT': 'Q',
+           'LWORD': 'Q',
+           'REAL': 'f',
+           'LREAL': 'd',
+           'TIME': 'I',
+           'TOD': 'I',
+           'TIME_OF_DAY': 'I',
+           'DATE': 'I',
+           'DT': 'I',
+           'DATE_AND_TIME': 'I',
+           'LTIME': 'Q'}
+
+# Default length of STRING and WSTRING without explicit length
+STRINGLENGTH = 80
+
+# Default pack_mode of the structs, TwinCAT 3 aligns members to 8 bytes
+DEFAULTPACKMODE = 8
+
+STRINGPATTERN = re.compile(r'^(W?STRING)\s*(?:[\(\[]\s*(\d+)\s*[\)\]])?$', re.IGNORECASE)
+ARRAYPATTERN = re.compile(r'^ARRAY\s*\[(.+)\]\s*OF\s+(.+)$', re.IGNORECASE)
+RANGEPATTERN = re.compile(r'^\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*$')
+
+
+class Ads_Type(object):
+    '''
+    Ads datatype with a precompiled struct codec
+
+    Attrs:
+        name [STRING]: TwinCAT name of the datatype
+        codec [struct.Struct]: precompiled codec of the whole datatype
+        size [INT]: byte size in the PLC memory
+        alignment [INT]: natural alignment in the PLC memory
+        fmt [STRING]: struct format of an elementary datatype, None -> compound datatype
+    '''
+    __slots__ = ('name', 'codec', 'size', 'alignment', 'fmt')
+
+    def __init__(self, name:str, codec:struct.Struct, alignment:int=1, fmt:str=None):
+        self.name = name
+        self.codec = codec
+        self.size = codec.size
+        self.alignment = alignment
+        self.fmt = fmt
+
+    def default(self):
+        '''
+        Return: Default value of the datatype, decoded from zeroed memory
+        '''
+        return self.unpack_from(bytes(self.size), 0)
+
+    def unpack_from(self, buffer, offset:int=0):
+        '''
+        Return: Value decoded from the buffer at the offset
+        '''
+        return self.codec.unpack_from(buffer, offset)[0]
+
+    def pack_into(self, buffer, offset:int, value):
+        '''
+        Encode the value into the buffer at the offset
+        '''
+        self.codec.pack_into(buffer, offset, value)
+
+    def signature(self):
+        '''
+        Return: Memory layout of the datatype, equal for datatypes with the same layout
+        '''
+        return (self.name, self.size, self.fmt)
+
+
+class Ads_StringType(Ads_Type):
+    '''
+    STRING(n) and WSTRING(n) datatype, null-terminated in the PLC memory
+    '''
+    __slots__ = ('length', 'encoding', 'width')
+
+    def __init__(self, name:str, length:int, wide:bool=False):
+        self.length = length
+        self.width = 2 if wide else 1
+        self.encoding = 'utf-16-le' if wide else 'utf-8'
+        Ads_Type.__init__(self, name, struct.Struct('<%ds' % ((length + 1) * self.width)), self.width)
+
+    def unpack_from(self, buffer, offset:int=0):
+        raw = self.codec.unpack_from(buffer, offset)[0]
+        return raw.decode(self.encoding, errors='replace').split('\0', 1)[0]
+
+    def pack_into(self, buffer, offset:int, value):
+        # keep at least one null terminator
+        raw = str(value).encode(self.encoding)[:self.length * self.width]
+        self.codec.pack_into(buffer, offset, raw)
+
+
+class Ads_ArrayType(Ads_Type):
+    '''
+    ARRAY[a..b, ...] OF type, decoded to a flat list
+    Arrays of elementary datatypes are decoded in bulk with one struct call.
+    '''
+    __slots__ = ('element', 'count')
+
+    def __init__(self, name:str, element:Ads_Type, count:int):
+        self.element = element
+        self.count = count
+
+        if element.fmt is not None:
+            codec = struct.Struct('<%d%s' % (count, element.fmt))
+        else:
+            codec = struct.Struct('<%dx' % (count * element.size))
+
+        Ads_Type.__init__(self, name, codec, element.alignment)
+
+    def unpack_from(self, buffer, offset:int=0):
+        if self.element.fmt is not None:
+            return list(self.codec.unpack_from(buffer, offset))
+
+        size = self.element.size
+        return [self.element.unpack_from(buffer, offset + i * size) for i in range(self.count)]
+
+    def pack_into(self, buffer, offset:int, value):
+        if len(value) != self.count:
+            raise ValueError(self.name + " requires " + str(self.count) + " elements")
+
+        if self.element.fmt is not None:
+            self.codec.pack_into(buffer, offset, *value)
+            return
+
+        size = self.element.size
+        for i, element in enumerate(value):
+            self.element.pack_into(buffer, offset + i * size, element)
+
+    def signature(self):
+        return (self.name, self.size, self.element.signature(), self.count)
+
+
+class Ads_StructType(Ads_Type):
+    '''
+    User struct declared in the ads symbol list or uploaded from the PLC, decoded to a dict
+    '''
+    __slots__ = ('members',)
+
+    def __init__(self, name:str, members, packmode:int=DEFAULTPACKMODE, size:int=None):
+        '''
+        Args:
+            name [STRING]: name of the struct
+            members [LIST]: (member name, Ads_Type) in declaration order,
+                            or (member name, Ads_Type, offset) with the offsets of the PLC
+            packmode [INT]: TwinCAT pack_mode of the struct, default 8 as TwinCAT 3
+            size [INT]: byte size of the PLC, None -> computed from the members
+        '''
+        self.members = list()
+        offset = 0
+        alignment = 1
+
+        for member in members:
+            membername, membertype = member[:2]
+            memberalignment = min(membertype.alignment, packmode)
+
+            if len(member) > 2:
+                offset = member[2]
+            else:
+                offset = -(-offset // memberalignment) * memberalignment
+
+            self.members.append((membername, membertype, offset))
+            offset += membertype.size
+            alignment = max(alignment, memberalignment)
+
+        if size is None:
+            size = -(-offset // alignment) * alignment
+
+        Ads_Type.__init__(self, name, struct.Struct('<%dx' % size), alignment)
+
+    def unpack_from(self, buffer, offset:int=0):
+        return {membername: membertype.unpack_from(buffer, offset + memberoffset)
+                for membername, membertype, memberoffset in self.members}
+
+    def pack_into(self, buffer, offset:int, value):
+        for membername, membertype, memberoffset in self.members:
+            if membername in value:
+                membertype.pack_into(buffer, offset + memberoffset, value[membername])
+
+    def signature(self):
+        return (self.name, self.size, tuple((membername, membertype.signature(), memberoffset)
+                                            for membername, membertype, memberoffset in self.members))
+
+
+class Ads_Types(object):
+    '''
+    Registry of the TwinCAT datatypes
+
+    Maps each datatype name, including STRING(n), arrays and the user structs
+    declared in the ads symbol list, to an Ads_Type with precompiled codec.
+
+    Attrs:
+        declarations [DICT]: user struct and alias declarations of the ads symbol list
+        types [DICT]: cache of the created datatypes
+    '''
+
+    def __init__(self, declarations:dict=None):
+        '''
+        Args:
+            declarations [DICT]: struct name -> {'pack_mode': n, 'members': {name: type}},
+                                 with the PLC layout {'size': n, 'members': {name: type}, 'offsets': {name: offset}},
+                                 alias name -> {'type': datatype}, e.g. enums
+        '''
+        self.declarations = dict(declarations or {})
+        self.types = {}
+
+    def declare(self, declarations:dict):
+        '''
+        Add declarations, e.g. uploaded from the PLC. Declarations of the ads
+        symbol list take precedence.
+        '''
+        for name, declaration in declarations.items():
+            self.declarations.setdefault(name, declaration)
+
+    def get(self, name:str):
+        '''
+        Return: Ads_Type of the datatype name, None -> unknown datatype
+        '''
+        adstype = self.types.get(name)
+
+        if adstype is None:
+            try:
+                adstype = self.create(str(name).strip(), set())
+
+            except Exception as e:
+                logging.error("Cannot create datatype [" + str(name) + "]: " + str(e))
+
+            if adstype is not None:
+                self.types[name] = adstype
+
+        return adstype
+
+    def create(self, name:str, parents:set):
+        '''
+        Create the Ads_Type of a datatype name
+
+        Return: Ads_Type, None -> unknown datatype
+        '''
+        fmt = SCALARS.get(name.upper())
+
+        if fmt is not None:
+            codec = struct.Struct('<' + fmt)
+            return Ads_Type(name.upper(), codec, codec.size, fmt)
+
+        match = STRINGPATTERN.match(name)
+        if match is not None:
+            length = int(match.group(2)) if match.group(2) else STRINGLENGTH
+            return Ads_StringType(name, length, wide=match.group(1).upper() == 'WSTRING')
+
+        match = ARRAYPATTERN.match(name)
+        if match is not None:
+            element = self.create(match.group(2).strip(), parents)
+            if element is None:
+                return None
+
+            count = 1
+            for dimension in match.group(1).split(','):
+                bounds = RANGEPATTERN.match(dimension)
+                if bounds is None:
+                    raise ValueError("invalid array range [" + dimension + "]")
+                count *= int(bounds.group(2)) - int(bounds.group(1)) + 1
+
+            return Ads_ArrayType(name, element, count)
+
+        declaration = self.declarations.get(name)
+        if declaration is not None:
+            if name in parents:
+                raise ValueError("recursive struct [" + name + "]")
+
+            if 'type' in declaration:
+                return self.create(str(declaration['type']).strip(), parents | {name})
+
+            offsets = declaration.get('offsets')
+            members = list()
+            for membername, membertypename in declaration['members'].items():
+                membertype = self.create(str(membertypename).strip(), parents | {name})
+                if membertype is None:
+                    # Members at known offsets can be skipped, e.g. pointers
+                    if offsets is not None:
+                        continue
+                    raise ValueError("unknown datatype of member [" + str(membername) + "]")
+                if offsets is not None:
+                    members.append((str(membername), membertype, offsets[membername]))
+                else:
+                    members.append((str(membername), membertype))
+
+            return Ads_StructType(name, members, declaration.get('pack_mode', DEFAULTPACKMODE), declaration.get('size'))
+
+        return None
+
+
+# Registry of the elementary datatypes
+DEFAULTTYPES = Ads_Types()
@@ -11,20 +11,81 @@
 # Author: Chobtrong, Thitipun Email: t.chobtrong@mehnert.de
 
 from typing import List
+import hashlib
 import logging
 import re
 import yaml
+from utils.ads_types import Ads_Types, DEFAULTTYPES
+from utils.ads_symbolcache import Ads_SymbolCache
+
+
+# C yaml loader (libyaml) if available, the pure-Python loader is slow on large symbol lists
+YAMLLOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Period of a read group, such as 2ms, 1s or 500us, a plain number is in ms
+PERIODPATTERN = re.compile(r'^\s*(\d+(?:\.\d*)?)\s*(us|ms|s)?\s*$', re.IGNORECASE)
+PERIODUNITS = {'us': 1e-6, 'ms': 1e-3, 's': 1.0}
+
+# Read groups which are only read on request
+ONDEMAND = 'on_demand'
 
 
 class Ads_Vars(object):
     '''
     List of ads variables class
+
+    All values are stored in one packed process image. Each symbol has an
+    integer index into the image; the Ads_Var objects are views on it.
+
+    Attrs:
+        index [DICT]: ads name -> integer index of the symbol
+        vars [LIST]: Ads_Var view of each symbol
+        registry [Ads_Types]: datatypes of the symbol list, including user structs
+        image [BYTEARRAY]: packed values of all symbols with a known datatype
+        offsets [LIST]: byte offset of each symbol in the image
+        types [LIST]: Ads_Type of each symbol, None -> value in objects
+        objects [LIST]: values of symbols with an unknown datatype
+        dirty [BYTEARRAY]: 1 -> value is changed by the application and not yet written
+        groups [DICT]: group name -> names of the symbols with this group
+        readgroups [DICT]: group name -> read period [s] of the group, None -> on demand
+        upload [DICT]: include/exclude patterns, mode and group of the symbols
+                       generated from the PLC symbol table, None -> only listed symbols
+        yamlhash [STRING]: hash of the ads symbol list
+        cache [Ads_SymbolCache]: compiled symbol cache, None -> disabled
+        symbols [DICT]: ads name -> (datatype, mode, notification, group) of all symbols
+        listed [DICT]: ads name -> (datatype, mode, notification, group) of the symbols of the ads symbol list
     '''
     READONLY = 'R'
     WRITEREAD = 'W'
     NOTACTIVE = 'X'
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, cachepath:str=None):
+        '''
+        Args:
+            filepath [String]: path of the ads symbol list (yaml)
+            cachepath [String]: path of the compiled symbol cache, None -> always parse the yaml
+        '''
+        self.index = {}
+        self.vars = list()
+        self.registry = DEFAULTTYPES
+        self.image = bytearray()
+        self.offsets = list()
+        self.types = list()
+        self.objects = list()
+        self.dirty = bytearray()
+        self.readlist = list()
+        self.writelist = list()
+        self.notificationlist = list()
+        self.groups = {}
+        self.readgroups = {}
+        self.upload = None
+        self.yamlhash = None
+        self.config = None
+        self.filepath = filepath
+        self.symbols = {}
+        self.listed = {}
+        self.cache = Ads_SymbolCache(cachepath) if cachepath else None
+
         try:
             # self.getListName(filepath)
             self.getListNameYaml(filepath)
@@ -71,8 +132,7 @@ class Ads_Vars(object):
             varname = info['varname']
             adsname = info['adsname']
             datatype = info['datatype']
-            adsvar = Ads_Var(adsname, datatype)
-            setattr(self, varname, adsvar)
+            self.addvar(adsname, datatype)
 
 
     def getListNameYaml(self, filepath):
@@ -80,32 +140,353 @@ class Ads_Vars(object):
         Get ads symbols from yaml
         '''
         
-        with open(filepath, 'r') as file:
-            self.config = yaml.safe_load(file)
+        with open(filepath, 'rb') as file:
+            content = file.read()
+
+        self.yamlhash = hashlib.sha1(content).hexdigest()
+        self.config = self.cache.getconfig(self.yamlhash) if self.cache is not None else None
+
+        if self.config is None:
+            self.config = yaml.load(content, Loader=YAMLLOADER)
+
+            if self.cache is not None:
+                self.cache.setconfig(self.yamlhash, self.config)
+        else:
+            logging.info("Loaded the ads symbol list from the symbol cache.")
 
         if self.config is not None:
 
+            self.registry = Ads_Types(self.config.get('datatypes'))
+            self.upload = self.config.get('upload')
+            self.readgroups = self.parsereadgroups(self.config)
             self.writelist = list()
             self.readlist = list()
+            self.notificationlist = list()
+            self.groups = {}
+            self.listed = self.parsesymbols(self.config)
+
+            for adsname, (datatype, mode, notification, group) in self.listed.items():
+                self.addsymbol(adsname, datatype, mode, notification, group)
+
+    def parsereadgroups(self, config:dict)->dict:
+        '''
+        Return: group name -> read period [s] of the readgroups section, None -> on demand
+        '''
+        readgroups = {}
+
+        for group, period in (config.get('readgroups') or {}).items():
+            try:
+                readgroups[str(group)] = self.parseperiod(period)
+
+            except ValueError as e:
+                logging.error("Invalid period of the read group [" + str(group) + "]. Read it every cycle: " + str(e))
+
+        return readgroups
+
+    @staticmethod
+    def parsesymbols(config:dict)->dict:
+        '''
+        Return: ads name -> (datatype, mode, notification, group) of the symbols section
+        '''
+        symbollist = config.get('symbols') or {}
+
+        return {str(symbol): (settings['type'], settings['mode'], settings.get('notification'), settings.get('group'))
+                for symbol, settings in symbollist.items()}
+
+    @staticmethod
+    def parseperiod(period):
+        '''
+        Return: Period [s] of a read group, None -> on demand
+        '''
+        if str(period).strip().lower() == ONDEMAND:
+            return None
+
+        match = PERIODPATTERN.match(str(period))
+
+        if match is None:
+            raise ValueError("unknown period [" + str(period) + "]")
+
+        return float(match.group(1)) * PERIODUNITS[(match.group(2) or 'ms').lower()]
+
+    def addsymbol(self, adsname:str, datatype:str, mode:str, notification:dict=None, group:str=None):
+        '''
+        Add a symbol of the ads symbol list with its mode to the read/write lists
+        '''
+        self.addvar(adsname, datatype, notification)
+        self.symbols[adsname] = (datatype, mode, notification, group)
+
+        if group is not None:
+            self.groups.setdefault(str(group), list()).append(adsname)
+
+        if mode == self.READONLY:
+            self.readlist.append(adsname)
+
+        if mode == self.WRITEREAD:
+            self.readlist.append(adsname)
+            self.writelist.append(adsname)
+
+        if notification is not None and mode != self.NOTACTIVE:
+            self.notificationlist.append(adsname)
+
+        if mode == self.NOTACTIVE:
+            logging.debug("!!! The symbol [" + str(adsname) + "] is ignored.")
+
+    def addsymbols(self, symbols):
+        '''
+        Add symbols to the process image at runtime. The layout is rebound to
+        new lists, snapshots keep the layout of their cycle.
+
+        Args:
+            symbols [LIST]: (ads name, datatype, mode, group) of each symbol
+        '''
+        self.rebind()
+
+        for adsname, datatype, mode, group in symbols:
+            self.addsymbol(adsname, datatype, mode, group=group)
+
+    def rebind(self):
+        '''
+        Rebind the layout to copies before a change, snapshots keep the layout of their cycle
+        '''
+        self.index = dict(self.index)
+        self.offsets = list(self.offsets)
+        self.types = list(self.types)
+        self.objects = list(self.objects)
+        self.vars = list(self.vars)
+
+    def diffsymbols(self, filepath:str=None):
+        '''
+        Load the ads symbol list again and compare it with the current symbols.
+        Symbols generated from the PLC symbol table are kept.
+
+        Return: Reload plan with the names of the added, removed, retyped
+                and changed symbols, None -> the ads symbol list is unchanged
+        '''
+        with open(filepath or self.filepath, 'rb') as file:
+            content = file.read()
+
+        yamlhash = hashlib.sha1(content).hexdigest()
+
+        if yamlhash == self.yamlhash:
+            return None
+
+        config = yaml.load(content, Loader=YAMLLOADER) or {}
+        registry = self.registry
+
+        if config.get('datatypes') != (self.config or {}).get('datatypes'):
+            registry = Ads_Types(config.get('datatypes'))
+            # Keep the datatypes uploaded from the PLC
+            registry.declare(self.registry.declarations)
+
+        listed = self.parsesymbols(config)
+        added = [adsname for adsname in listed if adsname not in self.index]
+        removed = [adsname for adsname in self.listed if adsname not in listed]
+        retyped = list()
+        changed = list()
+
+        for adsname, definition in listed.items():
+            i = self.index.get(adsname)
+
+            if i is None:
+                continue
+
+            adstype = registry.get(definition[0])
+            oldtype = self.types[i]
+
+            if (adstype is None) != (oldtype is None) or \
+               (adstype is not None and adstype.signature() != oldtype.signature()):
+                retyped.append(adsname)
 
-            symbollist = self.config['symbols']
-            for symbol in symbollist:
-                varname = str(symbol).replace('.', '_dot_')
-                adsname = str(symbol)
-                datatype = self.config['symbols'][adsname]['type']
-                mode = self.config['symbols'][adsname]['mode']
-                adsvar = Ads_Var(adsname, datatype)
-                setattr(self, varname, adsvar)
+            elif self.symbols.get(adsname) != definition:
+                changed.append(adsname)
 
-                if mode == self.READONLY:
-                    self.readlist.append(adsname)
+        return {'yamlhash': yamlhash,
+                'config': config,
+                'registry': registry,
+                'readgroups': self.parsereadgroups(config),
+                'listed': listed,
+                'added': added,
+                'removed': removed,
+                'retyped': retyped,
+                'changed': changed}
 
-                if mode == self.WRITEREAD:
-                    self.readlist.append(adsname)
-                    self.writelist.append(adsname)
+    def applysymbols(self, plan:dict):
+        '''
+        Apply a reload plan of diffsymbols(). Unchanged symbols keep their index and value,
+        retyped symbols get a new place in the image. The image is compacted when more than
+        half of it is left by removed or retyped symbols. The index slots of removed symbols
+        are not reused, Ads_Var views of the other symbols stay valid. The caller holds the model lock.
+        '''
+        self.rebind()
+        self.registry = plan['registry']
+        listed = plan['listed']
+
+        for adsname in plan['removed']:
+            i = self.index.pop(adsname)
+            self.types[i] = None
+            self.objects[i] = None
+            self.vars[i] = None
+            self.dirty[i] = 0
+            self.symbols.pop(adsname, None)
+
+        for adsname in plan['added'] + plan['retyped']:
+            datatype, mode, notification, group = listed[adsname]
+            self.addvar(adsname, datatype, notification)
+            self.symbols[adsname] = listed[adsname]
+
+        for adsname in plan['changed']:
+            datatype, mode, notification, group = listed[adsname]
+            var = self.vars[self.index[adsname]]
+            if var is not None:
+                var.notification = notification
+            self.symbols[adsname] = listed[adsname]
+
+        self.compact()
+        self.listed = listed
+        self.config = plan['config']
+        self.yamlhash = plan['yamlhash']
+        self.upload = self.config.get('upload')
+        self.readgroups = plan['readgroups']
+        self.buildlists()
+
+        if self.cache is not None:
+            self.cache.setconfig(self.yamlhash, self.config)
+
+    def compact(self)->bool:
+        '''
+        Repack the image without the space of removed and retyped symbols, if it is more than half of the image.
+        Snapshots keep the image and offsets of their cycle.
+
+        Return: True -> image repacked
+        '''
+        used = sum(adstype.size for adstype in self.types if adstype is not None)
+
+        if len(self.image) - used <= used:
+            return False
+
+        image = bytearray(used)
+        offsets = list(self.offsets)
+        offset = 0
+
+        for i, adstype in enumerate(self.types):
+            if adstype is None:
+                continue
+
+            start = self.offsets[i]
+            image[offset:offset + adstype.size] = self.image[start:start + adstype.size]
+            offsets[i] = offset
+            offset += adstype.size
+
+        self.image = image
+        self.offsets = offsets
+
+        return True
+
+    def buildlists(self):
+        '''
+        Build the read/write/notification lists and the groups from the modes of all symbols
+        '''
+        self.readlist = list()
+        self.writelist = list()
+        self.notificationlist = list()
+        self.groups = {}
+
+        for adsname, (datatype, mode, notification, group) in self.symbols.items():
+            if group is not None:
+                self.groups.setdefault(str(group), list()).append(adsname)
+
+            if mode in (self.READONLY, self.WRITEREAD):
+                self.readlist.append(adsname)
+
+            if mode == self.WRITEREAD:
+                self.writelist.append(adsname)
+
+            if notification is not None and mode != self.NOTACTIVE:
+                self.notificationlist.append(adsname)
+
+    def __getattr__(self, varname):
+        '''
+        Attribute-style access to the symbols, such as GVL_dot_input01
+        '''
+        index = self.__dict__.get('index')
+
+        if index is not None and not varname.startswith('__'):
+            i = index.get(varname.replace('_dot_', '.'))
+            if i is not None:
+                return self.vars[i]
+
+        raise AttributeError(varname)
+
+    def addvar(self, adsname:str, datatype:str, notification:dict=None):
+        '''
+        Add a symbol to the process image
+
+        Return: Ads_Var view of the symbol
+        '''
+        i = self.index.get(adsname)
+
+        if i is None:
+            i = len(self.vars)
+            self.index[adsname] = i
+            self.offsets.append(len(self.image))
+            self.types.append(None)
+            self.objects.append(None)
+            self.dirty.append(0)
+            self.vars.append(None)
+
+        adstype = self.registry.get(datatype)
+
+        if adstype is not None and self.types[i] is not adstype:
+            self.offsets[i] = len(self.image)
+            self.image.extend(bytes(adstype.size))
 
-                if mode == self.NOTACTIVE:
-                    logging.info("!!! The symbol [" + str(adsname) + "] is ignored.")
+        self.types[i] = adstype
+
+        adsvar = Ads_Var(adsname, datatype, notification, store=self, index=i)
+        self.vars[i] = adsvar
+
+        return adsvar
+
+    def getindex(self, adsname:str)->int:
+        '''
+        Return: Integer index of the symbol, KeyError if unknown
+        '''
+        return self.index[adsname]
+
+    def getvar(self, adsname:str):
+        '''
+        Return: Ads_Var view of the symbol, KeyError if unknown
+        '''
+        return self.vars[self.index[adsname]]
+
+    def getvalue(self, i:int):
+        '''
+        Return: Value of the symbol with the index i
+        '''
+        adstype = self.types[i]
+
+        if adstype is None:
+            return self.objects[i]
+
+        return adstype.unpack_from(self.image, self.offsets[i])
+
+    def setvalue(self, i:int, value):
+        '''
+        Set the value of the symbol with the index i
+        '''
+        adstype = self.types[i]
+
+        if adstype is None:
+            self.objects[i] = value
+        else:
+            adstype.pack_into(self.image, self.offsets[i], value)
+
+    def setbytes(self, i:int, data):
+        '''
+        Copy the raw PLC memory of the symbol with the index i into the image
+        '''
+        offset = self.offsets[i]
+        self.image[offset:offset + self.types[i].size] = data
 
 
 class Ads_Var(object):
@@ -116,33 +497,70 @@ class Ads_Var(object):
         adsname [STRING]: name of variable in the ads server
         datatype [STRING]: data type of the ads variable
         value [var]: Value of the variable
+        notification [DICT]: device notification settings, None -> polled
+        dirty [BOOL]: True -> value is changed by the application and not yet written
+        store [Ads_Vars]: process image holding the value, None -> stand-alone variable
+        index [INT]: index of the variable in the store
     '''
+    __slots__ = ('adsname', 'datatype', 'notification', 'store', 'index', '_value', '_dirty')
 
-    def __init__(self, adsname:str, datatype:str):
+    def __init__(self, adsname:str, datatype:str, notification:dict=None,
+                 store=None, index:int=None):
         self.adsname = adsname
         self.datatype = datatype
+        self.notification = notification
+        self.store = store
+        self.index = index
+        self.dirty = False
         self.value = self.defaultvalue()
 
         # Create info message
         msg = "[" + self.adsname + "] "
         msg = msg + "is successfully created for ADS server."
-        logging.info(msg)
+        logging.debug(msg)
+
+    @property
+    def value(self):
+        if self.store is None:
+            return self._value
+
+        return self.store.getvalue(self.index)
+
+    @value.setter
+    def value(self, value):
+        if self.store is None:
+            self._value = value
+        else:
+            self.store.setvalue(self.index, value)
+
+    @property
+    def dirty(self):
+        if self.store is None:
+            return self._dirty
+
+        return self.store.dirty[self.index] == 1
+
+    @dirty.setter
+    def dirty(self, dirty):
+        if self.store is None:
+            self._dirty = dirty
+        else:
+            self.store.dirty[self.index] = 1 if dirty else 0
 
 
     def defaultvalue(self):
         '''
         Set default data, depended on its data type
-        CURRENTLY SUPPORT: BOOL, INT, BYTE
+        CURRENTLY SUPPORT: all datatypes of the Ads_Types registry
 
         Return:
             Default value based on the data type
         '''
-        if self.datatype == 'BOOL':
-            value = False
-        elif self.datatype == 'INT':
-            value = 0
-        elif self.datatype == 'BYTE':
-            value = 0
+        registry = DEFAULTTYPES if self.store is None else self.store.registry
+        adstype = registry.get(self.datatype)
+
+        if adstype is not None:
+            value = adstype.default()
         else:
             if hasattr(self, 'adsname'):
                 # create warning message
@@ -0,0 +1,381 @@
+# Copyright 2023 simplixio GmbH or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License").
+# You may not use this file except in compliance with the License.
+# A copy of the License is located at
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# Author: Chobtrong, Thitipun Email: teddy.chobrong@gmail.com
+
+import bisect
+import struct
+import threading
+import time
+import pyads
+from pyads.constants import (ADSIGRP_SUMUP_READ, ADSIGRP_SUMUP_WRITE, ADSIGRP_SYM_DT_UPLOAD,
+                             ADSIGRP_SYM_INFOBYNAMEEX, ADSIGRP_SYM_UPLOAD, ADSIGRP_SYM_UPLOADINFO2,
+                             ADSIGRP_SYM_VALBYHND, ADSIGRP_SYM_VERSION)
+from pyads.structs import SAdsSymbolEntry
+from utils.ads_types import DEFAULTTYPES, Ads_StructType
+from utils.ads_symboltable import UPLOADINFO, Ads_SymbolTable
+
+
+# ADS error codes of the simulated server
+ADSERR_SYMBOLNOTFOUND = 1808
+ADSERR_SYMBOLVERSIONINVALID = 1809
+
+# Index group of the simulated PLC memory
+ADSIGRP_PLCMEMORY = 0x4040
+
+
+class FakeConnection(object):
+    '''
+    In-process stand-in for pyads.Connection
+
+    Simulates the ADS requests used by the ADS data model on a symbol table,
+    with a configurable latency per request. Used for benchmarks and for
+    running the ADS cycle without a PLC.
+
+    Attrs:
+        types [DICT]: ads name -> Ads_Type of each symbol
+        memory [DICT]: ads name -> raw PLC memory of each symbol
+        offsets [DICT]: ads name -> byte offset of each symbol in the PLC memory
+        handles [DICT]: handle -> ads name
+        version [INT]: symbol version, change it to simulate an online change
+        latency [FLOAT]: delay of each ADS request [s]
+        requests [INT]: number of ADS requests
+    '''
+
+    def __init__(self, netid:str=None, port:int=None, symbols:dict=None,
+                 latency:float=0.0, registry=None, version:int=1):
+        '''
+        Args:
+            symbols [DICT]: ads name -> TwinCAT datatype of each symbol
+            latency [float]: delay of each ADS request [s]
+            registry [Ads_Types]: datatypes of the symbols, None -> elementary datatypes
+        '''
+        self.netid = netid
+        self.port = port
+        self.registry = registry if registry is not None else DEFAULTTYPES
+        self.latency = latency
+        self.version = version
+        self.lock = threading.Lock()
+        self.types = {}
+        self.datatypes = {}
+        self.memory = {}
+        self.offsets = {}
+        self.names = {}
+        self.starts = list()
+        self.size = 0
+        self.handles = {}
+        self.nexthandle = 1
+        self.notifications = {}
+        self.requests = 0
+        self.isopen = False
+
+        for adsname, datatype in (symbols or {}).items():
+            self.addsymbol(adsname, datatype)
+
+    def addsymbol(self, adsname:str, datatype:str):
+        '''
+        Add a symbol to the simulated PLC
+        '''
+        adstype = self.registry.get(datatype)
+
+        if adstype is None:
+            raise ValueError("Unknown datatype [" + str(datatype) + "] of [" + str(adsname) + "]")
+
+        if adsname not in self.memory:
+            self.offsets[adsname] = self.size
+            self.names[self.size] = adsname
+            self.starts.append(self.size)
+            self.size += adstype.size
+
+        self.types[adsname] = adstype
+        self.datatypes[adsname] = str(datatype)
+        self.memory[adsname] = bytearray(adstype.size)
+
+    def symboltable(self)->bytes:
+        '''
+        Return: Raw symbol table of the simulated PLC, as uploaded by ADSIGRP_SYM_UPLOAD
+        '''
+        return Ads_SymbolTable.pack((adsname, ADSIGRP_PLCMEMORY, self.offsets[adsname],
+                                     self.types[adsname].size, self.datatypes[adsname], 0)
+                                    for adsname in self.memory)
+
+    def datatypetable(self)->bytes:
+        '''
+        Return: (raw datatype table of the structs of the registry, as uploaded by ADSIGRP_SYM_DT_UPLOAD,
+                 number of datatypes)
+        '''
+        datatypes = list()
+
+        for name in self.registry.declarations:
+            adstype = self.registry.get(name)
+
+            if isinstance(adstype, Ads_StructType):
+                datatypes.append((name, adstype.size,
+                                  [(membername, membertype.name, offset, membertype.size)
+                                   for membername, membertype, offset in adstype.members]))
+
+        return Ads_SymbolTable.packdatatypes(datatypes), len(datatypes)
+
+    def readmemory(self, ioffs:int, size:int)->bytearray:
+        '''
+        Return: PLC memory at an offset, which can span several symbols
+        '''
+        data = bytearray(size)
+        i = max(bisect.bisect_right(self.starts, ioffs) - 1, 0)
+
+        while i < len(self.starts) and self.starts[i] < ioffs + size:
+            start = self.starts[i]
+            memory = self.memory[self.names[start]]
+            low = max(start, ioffs)
+            high = min(start + len(memory), ioffs + size)
+
+            if high > low:
+                data[low - ioffs:high - ioffs] = memory[low - start:high - start]
+            i += 1
+
+        return data
+
+    def writememory(self, ioffs:int, data):
+        '''
+        Write PLC memory at an offset inside a symbol
+        '''
+        start = self.starts[max(bisect.bisect_right(self.starts, ioffs) - 1, 0)]
+        memory = self.memory[self.names[start]]
+        memory[ioffs - start:ioffs - start + len(data)] = data
+
+    def locate(self, adsname:str):
+        '''
+        Return: (PLC memory offset, Ads_Type) of a symbol or of a struct member, e.g. GVL.stMotor.nSpeed,
+                None -> unknown symbol
+        '''
+        if adsname in self.memory:
+            return self.offsets[adsname], self.types[adsname]
+
+        parent, dot, membername = adsname.rpartition('.')
+        located = self.locate(parent) if dot else None
+
+        if located is None or not isinstance(located[1], Ads_StructType):
+            return None
+
+        for name, membertype, memberoffset in located[1].members:
+            if name == membername:
+                return located[0] + memberoffset, membertype
+
+        return None
+
+    def symbolname(self, igroup:int, ioffs:int):
+        '''
+        Return: ads name of a symbol addressed by handle or by PLC memory offset, None -> invalid
+        '''
+        if igroup == ADSIGRP_SYM_VALBYHND:
+            return self.handles.get(ioffs)
+
+        if igroup == ADSIGRP_PLCMEMORY:
+            return self.names.get(ioffs)
+
+        return None
+
+    def request(self):
+        self.requests += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def getvalue(self, adsname:str):
+        '''
+        Return: Value of a symbol of the simulated PLC
+        '''
+        if adsname in self.memory:
+            return self.types[adsname].unpack_from(self.memory[adsname])
+
+        offset, adstype = self.locate(adsname)
+        return adstype.unpack_from(self.readmemory(offset, adstype.size))
+
+    def setvalue(self, adsname:str, value):
+        '''
+        Set a symbol of the simulated PLC, as the PLC program does.
+        Fires the device notifications of the symbol.
+        '''
+        self.types[adsname].pack_into(self.memory[adsname], 0, value)
+
+        for handle, (name, callback) in list(self.notifications.items()):
+            if name == adsname:
+                callback(handle, adsname, time.time(), bytes(self.memory[adsname]))
+
+    def open(self):
+        self.isopen = True
+
+    def close(self):
+        self.isopen = False
+
+    @property
+    def is_open(self):
+        return self.isopen
+
+    def read_state(self):
+        self.request()
+        return (pyads.ADSSTATE_RUN, 0)
+
+    def get_handle(self, adsname:str)->int:
+        self.request()
+
+        if self.locate(adsname) is None:
+            raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+        with self.lock:
+            handle = self.nexthandle
+            self.nexthandle += 1
+            self.handles[handle] = adsname
+
+        return handle
+
+    def release_handle(self, handle:int):
+        self.request()
+        self.handles.pop(handle, None)
+
+    def read(self, igroup:int, ioffs:int, plctype, *args, **kwargs):
+        self.request()
+
+        if igroup == ADSIGRP_SYM_VERSION:
+            return self.version
+
+        if igroup == ADSIGRP_SYM_UPLOADINFO2:
+            table = self.symboltable()
+            datatypes, count = self.datatypetable()
+            return plctype.from_buffer_copy(UPLOADINFO.pack(len(self.memory), len(table),
+                                                            count, len(datatypes), 0, 0))
+
+        if igroup == ADSIGRP_SYM_UPLOAD:
+            return plctype.from_buffer_copy(self.symboltable())
+
+        if igroup == ADSIGRP_SYM_DT_UPLOAD:
+            return plctype.from_buffer_copy(self.datatypetable()[0])
+
+        raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+    def read_write(self, igroup:int, ioffs:int, read_datatype, value, write_datatype,
+                   return_ctypes:bool=False, check_length:bool=True):
+        self.request()
+
+        if igroup == ADSIGRP_SYM_INFOBYNAMEEX:
+            located = self.locate(value)
+
+            if located is None:
+                raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+            info = SAdsSymbolEntry()
+            info.iGroup = ADSIGRP_PLCMEMORY
+            info.iOffs = located[0]
+            info.size = located[1].size
+            return info
+
+        if igroup == ADSIGRP_SUMUP_READ:
+            errors = bytearray()
+            data = bytearray()
+
+            for request in value:
+                if request.iGroup == ADSIGRP_SYM_VERSION:
+                    errors += struct.pack('<I', 0)
+                    data += struct.pack('<B', self.version)
+                    continue
+
+                if request.iGroup == ADSIGRP_PLCMEMORY and request.iOffset + request.size <= self.size:
+                    errors += struct.pack('<I', 0)
+                    data += self.readmemory(request.iOffset, request.size)
+                    continue
+
+                adsname = self.symbolname(request.iGroup, request.iOffset)
+
+                if adsname is None:
+                    errors += struct.pack('<I', ADSERR_SYMBOLVERSIONINVALID)
+                    data += bytes(request.size)
+                else:
+                    errors += struct.pack('<I', 0)
+                    data += self.readmemory(self.locate(adsname)[0], request.size)
+
+            return errors + data
+
+        if igroup == ADSIGRP_SUMUP_WRITE:
+            errors = bytearray()
+            offset = 12 * ioffs
+
+            for i in range(ioffs):
+                igroup, ioffs, size = struct.unpack_from('<III', value, 12 * i)
+                adsname = self.symbolname(igroup, ioffs)
+
+                if igroup == ADSIGRP_PLCMEMORY and ioffs + size <= self.size:
+                    errors += struct.pack('<I', 0)
+                    self.writememory(ioffs, value[offset:offset + size])
+                elif adsname is None:
+                    errors += struct.pack('<I', ADSERR_SYMBOLVERSIONINVALID)
+                else:
+                    errors += struct.pack('<I', 0)
+                    self.writememory(self.locate(adsname)[0], value[offset:offset + size])
+
+                offset += size
+
+            return errors
+
+        raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+    def read_by_name(self, adsname:str, plctype=None, *args, **kwargs):
+        return self.read_list_by_name([adsname])[adsname]
+
+    def write_by_name(self, adsname:str, value, plctype=None, *args, **kwargs):
+        self.write_list_by_name({adsname: value})
+
+    def read_list_by_name(self, adsnames, *args, **kwargs):
+        self.request()
+
+        if any(self.locate(adsname) is None for adsname in adsnames):
+            raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+        return {adsname: self.getvalue(adsname) for adsname in adsnames}
+
+    def write_list_by_name(self, data, *args, **kwargs):
+        self.request()
+
+        if any(self.locate(adsname) is None for adsname in data):
+            raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+        for adsname, value in data.items():
+            offset, adstype = self.locate(adsname)
+            memory = self.readmemory(offset, adstype.size)
+            adstype.pack_into(memory, 0, value)
+            self.writememory(offset, memory)
+
+        return {adsname: 'no error' for adsname in data}
+
+    def notification(self, plctype=None, timestamp_as_filetime:bool=False):
+        '''
+        Decorator of notification callbacks, the callbacks receive the raw PLC memory
+        '''
+        def decorator(func):
+            def wrapper(handle, adsname, timestamp, data):
+                return func(handle, adsname, timestamp, data)
+            return wrapper
+        return decorator
+
+    def add_device_notification(self, adsname:str, attr, callback, user_handle:int=None):
+        self.request()
+
+        if adsname not in self.memory:
+            raise pyads.ADSError(ADSERR_SYMBOLNOTFOUND)
+
+        with self.lock:
+            handle = self.nexthandle
+            self.nexthandle += 1
+            self.notifications[handle] = (adsname, callback)
+
+        return (handle, user_handle if user_handle is not None else handle)
+
+    def del_device_notification(self, notification_handle:int, user_handle:int):
+        self.request()
+        self.notifications.pop(notification_handle, None)
@@ -22,7 +22,7 @@ class yamlconfig(object):
 
         try:
             with open(configpath, 'r') as file:
-                self.config = yaml.safe_load(file)
+                self.config = yaml.load(file, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
                 self.parseallconfig()
                 self.validconfig = True
 
@@ -40,5 +40,36 @@ class yamlconfig(object):
         self.adstarget_username = self.config['ADS']['ads_target_username']
         self.adstarget_pw = self.config['ADS']['ads_target_pw']
         self.adsvarlistpath = self.config['ADS']['ads_var_list_path']
+        self.adsnotificationmode = self.config['ADS'].get('ads_notification_mode', False)
+        self.adsfullwritecycles = self.config['ADS'].get('ads_full_write_cycles', 0)
+        self.adsmaxsubcommands = self.config['ADS'].get('ads_max_sub_commands', 500)
+        self.adsmaxchunkbytes = self.config['ADS'].get('ads_max_chunk_bytes', 65536)
+        self.adsparallelchunks = self.config['ADS'].get('ads_parallel_chunks', 1)
+        self.adssnapshothistory = self.config['ADS'].get('ads_snapshot_history', 16)
+        self.adsworkers = self.config['ADS'].get('ads_workers', 4)
+        self.adscycletime = self.config['ADS'].get('ads_cycle_time', 10)
+        self.adsoverrunpolicy = self.config['ADS'].get('ads_overrun_policy', 'skip')
+        self.adsreconnectmindelay = self.config['ADS'].get('ads_reconnect_min_delay', 100)
+        self.adsreconnectmaxdelay = self.config['ADS'].get('ads_reconnect_max_delay', 5000)
+        self.adskeepaliveinterval = self.config['ADS'].get('ads_keepalive_interval', 1000)
+        self.adsoutagewrites = self.config['ADS'].get('ads_outage_writes', 'buffer')
+        self.adsmetrics = self.config['ADS'].get('ads_metrics', False)
+        self.adsmetricsport = self.config['ADS'].get('ads_metrics_port', 9100)
+        self.adssymbolcache = self.config['ADS'].get('ads_symbol_cache', False)
+        self.adsmaxreadgap = self.config['ADS'].get('ads_max_read_gap', 32)
+        self.adsrecorderpath = self.config['ADS'].get('ads_recorder_path', None)
+        self.adsrecorderfilesize = self.config['ADS'].get('ads_recorder_file_size', 64)
+        self.adsrecorderfiles = self.config['ADS'].get('ads_recorder_files', 4)
+        self.adssharedmemory = self.config['ADS'].get('ads_shared_memory', None)
+        self.adsgatewayaddress = self.config['ADS'].get('ads_gateway_address', None)
+        self.adsfakeconnection = self.config['ADS'].get('ads_fake_connection', False)
+        self.adssymbolreload = self.config['ADS'].get('ads_symbol_reload', False)
+        self.adsreplaypath = self.config['ADS'].get('ads_replay_path', None)
+        self.adsreplayspeed = self.config['ADS'].get('ads_replay_speed', 1.0)
+
+        # Targets of the ads client manager, default -> the single ADS server above
+        self.adstargets = self.config.get('targets') or {
+            'default': {'ads_server_netid': self.adsserver_netid,
+                        'ads_var_list_path': self.adsvarlistpath}}
 
 
@@ -0,0 +1,129 @@
+'''
+Shared fixtures of the test modules: ads symbol list and stand-ins for pyads.Connection
+'''
+
+import struct
+import tempfile
+import pyads
+from pyads.constants import ADSIGRP_SUMUP_READ, ADSIGRP_SUMUP_WRITE, ADSIGRP_SYM_INFOBYNAMEEX, ADSIGRP_SYM_VERSION
+from pyads.structs import SAdsSymbolEntry
+
+
+SYMBOLS = '''
+symbols:
+  GVL.bStart:
+    type: BOOL
+    mode: W
+
+  GVL.nCounter:
+    type: INT
+    mode: R
+    group: counters
+
+  GVL.bReady:
+    type: BOOL
+    mode: R
+    notification:
+      trans_mode: onchange
+      cycle_time: 5
+      max_delay: 5
+'''
+
+
+class FakePlc(object):
+    '''
+    Minimal stand-in for pyads.Connection
+    '''
+
+    def __init__(self):
+        self.values = {'GVL.bStart': False, 'GVL.nCounter': 7, 'GVL.bReady': False}
+        self.notifications = {}
+        self.readrequests = list()
+        self.writerequests = list()
+
+    def notification(self, plctype):
+        def decorator(func):
+            def wrapper(adsdataname, value):
+                return func(0, adsdataname, None, value)
+            return wrapper
+        return decorator
+
+    def add_device_notification(self, adsdataname, attr, callback):
+        self.notifications[adsdataname] = callback
+        return (len(self.notifications), 0)
+
+    def del_device_notification(self, notification_handle, user_handle):
+        pass
+
+    def read_list_by_name(self, names):
+        self.readrequests.append(list(names))
+        if any(name not in self.values for name in names):
+            raise pyads.ADSError(1808)
+        return {name: self.values[name] for name in names}
+
+    def write_list_by_name(self, data):
+        self.writerequests.append(dict(data))
+        self.values.update(data)
+        return {name: 'no error' for name in data}
+
+
+class FakeSumPlc(FakePlc):
+    '''
+    Stand-in for pyads.Connection with symbol handles and sum commands
+    '''
+    FORMATS = {'GVL.bStart': '?', 'GVL.nCounter': 'h', 'GVL.bReady': '?'}
+
+    def __init__(self):
+        FakePlc.__init__(self)
+        self.handles = {}
+        self.nexthandle = 1
+        self.version = 1
+        self.sumrequests = 0
+
+    def get_handle(self, adsdataname):
+        handle = self.nexthandle
+        self.nexthandle += 1
+        self.handles[handle] = adsdataname
+        return handle
+
+    def release_handle(self, handle):
+        del self.handles[handle]
+
+    def read(self, igroup, ioffs, plctype):
+        return self.version
+
+    def read_write(self, igroup, ioffs, readtype, value, writetype, check_length=True):
+        if igroup == ADSIGRP_SYM_INFOBYNAMEEX:
+            info = SAdsSymbolEntry()
+            info.size = struct.calcsize(self.FORMATS[value])
+            return info
+
+        if igroup == ADSIGRP_SUMUP_READ:
+            self.sumrequests += 1
+            errors = b''
+            data = b''
+            for request in value:
+                errors += struct.pack('<I', 0)
+                if request.iGroup == ADSIGRP_SYM_VERSION:
+                    data += struct.pack('<B', self.version)
+                else:
+                    adsdataname = self.handles[request.iOffset]
+                    data += struct.pack('<' + self.FORMATS[adsdataname], self.values[adsdataname])
+            return bytearray(errors + data)
+
+        if igroup == ADSIGRP_SUMUP_WRITE:
+            self.sumrequests += 1
+            offset = 12 * ioffs
+            for i in range(ioffs):
+                igroup, handle, size = struct.unpack_from('<III', value, 12 * i)
+                adsdataname = self.handles[handle]
+                self.values[adsdataname] = struct.unpack_from('<' + self.FORMATS[adsdataname], value, offset)[0]
+                offset += size
+            return bytearray(4 * ioffs)
+
+
+def createsymbolfile(content):
+    symbolfile = tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False)
+    symbolfile.write(content)
+    symbolfile.close()
+    return symbolfile.name
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+import types
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from adsclientasync import AsyncAdsClient
+from adsclientthread import AdsClienthandler
+from models.adsdata import Adsdata
+from utils.fakeconnection import FakeConnection
+from tests.helpers import createsymbolfile
+
+
+SYMBOLS = '''
+symbols:
+  GVL.bStart:
+    type: BOOL
+    mode: W
+
+  GVL.nCounter:
+    type: INT
+    mode: R
+'''
+
+
+class AsyncAdsClient_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the asyncio ADS client, without ADS server
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.client = AsyncAdsClient(None, self.adsmodel, cycletime=0.01, overrunpolicy='skip')
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def runcycle(self):
+        previous = self.adsmodel.getsnapshot()
+        self.client.publish(previous, self.adsmodel.publishsnapshot())
+
+    def test_changes_of_subscribed_symbols(self):
+
+        async def scenario():
+            changes = self.client.changes(['GVL.nCounter'])
+            change = asyncio.ensure_future(changes.__anext__())
+            await asyncio.sleep(0)
+
+            self.adsmodel.write('GVL.bStart', True)
+            self.adsmodel.write('GVL.nCounter', 5)
+            self.runcycle()
+
+            return await change
+
+        self.assertEqual(asyncio.run(scenario()), ('GVL.nCounter', 5), 'Only subscribed changes shall be yielded.')
+
+    def test_wait_for_cycle(self):
+
+        async def scenario():
+            waiter = asyncio.ensure_future(self.client.read('GVL.nCounter', nextcycle=True))
+            await asyncio.sleep(0)
+
+            self.adsmodel.write('GVL.nCounter', 3)
+            self.runcycle()
+
+            return await waiter
+
+        self.assertEqual(asyncio.run(scenario()), 3, 'The read shall return the value of the next cycle.')
+
+
+class AsyncAdsClient_Cycle_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the ADS cycles of the asyncio client on the simulated ADS server
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeConnection(symbols={'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT'})
+        config = types.SimpleNamespace(adsserver_netid='127.0.0.1.1.1',
+                                       adsnotificationmode=False,
+                                       adsreconnectmindelay=100,
+                                       adsreconnectmaxdelay=400,
+                                       adskeepaliveinterval=1000,
+                                       adsoutagewrites='buffer')
+        self.client = AsyncAdsClient(config, self.adsmodel, cycletime=0.005, overrunpolicy='skip',
+                                     connection=lambda netid, port: self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_run_cycles(self):
+
+        async def scenario():
+            async with self.client as client:
+                self.plc.setvalue('GVL.nCounter', 4)
+                await client.waitcycle()
+                value = await client.read('GVL.nCounter', nextcycle=True)
+                await client.write('GVL.bStart', True, wait=True)
+                await client.waitcycle()
+                return value, client.handler
+
+        value, handler = asyncio.run(scenario())
+
+        self.assertEqual(value, 4, 'The cycles shall read the PLC.')
+        self.assertTrue(self.plc.getvalue('GVL.bStart'), 'The cycles shall write the changes to the PLC.')
+        self.assertIsNone(self.client.task, 'The cycle task shall be stopped.')
+        self.assertEqual(handler.state, AdsClienthandler.DISCONNECTED, 'The connection shall be closed.')
+
+    def test_stop_without_start(self):
+
+        asyncio.run(self.client.stop())
+
+        self.assertIsNone(self.client.executor, 'A client which was never started shall stop without error.')
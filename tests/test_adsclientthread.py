@@ -0,0 +1,189 @@
+import os
+import sys
+import threading
+import time
+import types
+import unittest2
+from unittest import mock
+import pyads
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from adsclientmanager import AdsClientmanager
+from adsclientthread import AdsClienthandler
+from models.adsdata import Adsdata
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, FakeSumPlc, createsymbolfile
+
+
+CONFIG = types.SimpleNamespace(adsserver_netid='127.0.0.1.1.1',
+                               adsnotificationmode=False,
+                               adsreconnectmindelay=100,
+                               adsreconnectmaxdelay=400,
+                               adskeepaliveinterval=1000,
+                               adsoutagewrites='buffer')
+
+
+class LossyConnection(FakeSumPlc):
+    '''
+    Stand-in for pyads.Connection, which can lose the connection
+    '''
+    isreachable = True
+
+    def __init__(self, netid=None, port=None):
+        FakeSumPlc.__init__(self)
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def read_state(self):
+        if not LossyConnection.isreachable:
+            raise pyads.ADSError(6)
+        return (5, 0)
+
+    def read_write(self, *args, **kwargs):
+        if not LossyConnection.isreachable:
+            raise pyads.ADSError(6)
+        return FakeSumPlc.read_write(self, *args, **kwargs)
+
+
+class AdsClienthandler_Reconnect_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the supervised connection of the ADS client handler
+    '''
+
+    def setUp(self):
+        LossyConnection.isreachable = True
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.patcher = mock.patch('adsclientthread.pyads.Connection', LossyConnection)
+        self.patcher.start()
+        self.handler = AdsClienthandler("ADS client", None, CONFIG, self.adsmodel)
+
+    def tearDown(self):
+        self.patcher.stop()
+        os.remove(self.symbolfile)
+
+    def test_detect_connection_loss(self):
+
+        self.handler.connect()
+        LossyConnection.isreachable = False
+        self.handler.runcycle()
+
+        self.assertEqual(self.handler.state, AdsClienthandler.DISCONNECTED, 'The connection loss shall be detected.')
+        self.assertEqual(self.adsmodel.symbolinfo, {}, 'The handles shall be resolved again after the reconnect.')
+
+    def test_reconnect_in_next_cycle(self):
+
+        self.handler.connect()
+        LossyConnection.isreachable = False
+        self.handler.runcycle()
+        LossyConnection.isreachable = True
+        self.handler.runcycle()
+
+        self.assertEqual(self.handler.state, AdsClienthandler.CONNECTED, 'The first reconnect shall be immediate.')
+        self.assertEqual(self.handler.stats['reconnects'], 1, 'The reconnect shall be counted.')
+
+    def test_backoff_while_unreachable(self):
+
+        LossyConnection.isreachable = False
+        self.handler.connect()
+        first = self.handler.reconnectdelay
+        self.handler.connect()
+
+        self.assertEqual(first, 0.1, 'The first backoff shall be the min. delay.')
+        self.assertEqual(self.handler.reconnectdelay, 0.2, 'The backoff shall be doubled.')
+
+    def test_buffer_writes_during_outage(self):
+
+        self.handler.connect()
+        LossyConnection.isreachable = False
+        self.handler.runcycle()
+        self.adsmodel.write('GVL.bStart', True)
+        LossyConnection.isreachable = True
+        self.handler.runcycle()
+        self.handler.runcycle()
+
+        self.assertEqual(self.handler.plc.values['GVL.bStart'], True, 'Buffered writes shall be sent after the reconnect.')
+
+    def test_missing_symbol(self):
+
+        plcsymbols = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT'}
+        handler = AdsClienthandler("ADS client", None, CONFIG, self.adsmodel,
+                                   connection=lambda netid, port: FakeConnection(netid, port, symbols=plcsymbols))
+        handler.connect()
+        handler.plc.setvalue('GVL.nCounter', 3)
+        self.adsmodel.write('GVL.bStart', True)
+        handler.runcycle()
+
+        self.assertEqual(handler.state, AdsClienthandler.CONNECTED, 'A missing symbol shall not be a connection failure.')
+        self.assertEqual(handler.reconnectdelay, 0.0, 'A missing symbol shall not start the backoff.')
+        self.assertEqual(handler.missingsymbols, {'GVL.bReady'}, 'The missing symbol shall be reported.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 3, 'The resolved symbols shall be read.')
+        self.assertEqual(handler.plc.getvalue('GVL.bStart'), True, 'The resolved symbols shall be written.')
+        self.assertEqual(handler.stats['errors'], 0, 'The missing symbol shall not fail the cycle.')
+
+
+class AdsClientmanager_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the ADS cycles of several targets on one thread pool
+    '''
+
+    def setUp(self):
+        LossyConnection.isreachable = True
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.config = types.SimpleNamespace(adstargets={'plc1': {'ads_server_netid': '127.0.0.1.1.1', 'cycle_time': 5}},
+                                            adsvarlistpath=self.symbolfile,
+                                            adsfullwritecycles=0,
+                                            adsmaxsubcommands=500,
+                                            adsmaxchunkbytes=65536,
+                                            adsparallelchunks=1,
+                                            adssnapshothistory=8,
+                                            adssymbolcache=False,
+                                            adsmaxreadgap=32,
+                                            adscycletime=10,
+                                            adsoverrunpolicy='skip',
+                                            **vars(CONFIG))
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_run_and_stop(self):
+
+        run_event = threading.Event()
+        run_event.set()
+        manager = AdsClientmanager("ADS manager", run_event, self.config, workers=2, connection=LossyConnection)
+        manager.start()
+        time.sleep(0.1)
+        manager.stop()
+        manager.join(1.0)
+
+        self.assertFalse(manager.is_alive(), 'The manager shall stop without waiting for a deadline.')
+        self.assertGreaterEqual(manager.handlers['plc1'].stats['cycles'], 5, 'The cycles shall run at their deadlines.')
+        self.assertEqual(manager.facade.default, 'plc1', 'The single target shall be the default target.')
+
+    def test_write_now(self):
+
+        run_event = threading.Event()
+        run_event.set()
+        self.config.adstargets['plc1']['cycle_time'] = 1000
+        manager = AdsClientmanager("ADS manager", run_event, self.config, workers=2, connection=LossyConnection)
+        manager.start()
+        handler = manager.handlers['plc1']
+
+        while handler.stats['cycles'] < 1:
+            time.sleep(0.001)
+
+        request = handler.adsmodel.writenow({'GVL.bStart': True})
+        written = request.wait(0.5)
+        manager.stop()
+        manager.join(1.0)
+
+        self.assertTrue(written, 'The urgent write shall be sent.')
+        self.assertLess(request.latency, 0.1, 'The urgent write shall not wait for the next cycle.')
+        self.assertEqual(handler.plc.values['GVL.bStart'], True, 'The value shall be written to the PLC.')
+        self.assertEqual(handler.stats['cycles'], 1, 'The urgent write shall not start a cycle.')
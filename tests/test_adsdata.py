@@ -0,0 +1,698 @@
+import os
+import queue
+import sys
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from models.adsfacade import Adsfacade
+from utils.ads_sumcommand import coalesce, splitchunks
+from utils.fakeconnection import ADSIGRP_PLCMEMORY
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, FakePlc, FakeSumPlc, createsymbolfile
+
+
+class Adsdata_Notification_Testcase(unittest2.TestCase):
+    '''
+    Test cases for ADS device notifications of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakePlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_notified_symbol_is_not_polled(self):
+
+        count = self.adsmodel.addnotifications(self.plc)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(count, 1, 'One notification shall be registered.')
+        self.assertNotIn('GVL.bReady', self.plc.readrequests[0], 'Notified symbols shall not be polled.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 7, 'Polled symbols shall be read.')
+
+    def test_notification_updates_model(self):
+
+        self.adsmodel.addnotifications(self.plc)
+        self.plc.notifications['GVL.bReady']('GVL.bReady', b'\x01')
+
+        self.assertEqual(self.adsmodel.read('GVL.bReady'), True, 'The notification shall update the model.')
+
+    def test_delete_notifications_polls_again(self):
+
+        self.adsmodel.addnotifications(self.plc)
+        self.adsmodel.delnotifications(self.plc)
+
+        self.assertEqual(self.adsmodel.pollreadlist, self.adsmodel.readlist, 'All read symbols shall be polled.')
+
+
+class Adsdata_Write_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the dirty-tracking write path of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.plc = FakePlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_skip_write_without_changes(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.writerequests, [], 'No ADS write shall be sent without changes.')
+
+    def test_write_only_changed_symbols_once(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        adsmodel.write('GVL.bStart', True)
+        adsmodel.writeads(self.plc)
+        adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.writerequests, [{'GVL.bStart': True}], 'The changed symbol shall be written once.')
+
+    def test_changed_symbol_is_not_overwritten_by_read(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        adsmodel.write('GVL.bStart', True)
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.read('GVL.bStart'), True, 'An unsent value shall not be overwritten.')
+
+    def test_force_full_write(self):
+
+        adsmodel = Adsdata(self.symbolfile, fullwritecycles=2)
+        adsmodel.writeads(self.plc)
+        adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.writerequests, [{'GVL.bStart': False}], 'All write symbols shall be written every 2 cycles.')
+
+
+class Adsdata_Batch_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the bulk read/write and the write transactions of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakePlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_read_many(self):
+
+        self.adsmodel.write('GVL.bStart', True)
+        values = self.adsmodel.readmany(['GVL.bStart', 'GVL.nCounter', 'GVL.nUnknown'])
+
+        self.assertEqual(values, {'GVL.bStart': True, 'GVL.nCounter': 0, 'GVL.nUnknown': None}, 'Unknown symbols shall be None.')
+
+    def test_write_many_in_one_cycle(self):
+
+        self.assertTrue(self.adsmodel.writemany({'GVL.bStart': True, 'GVL.nCounter': 5}), 'Valid values shall be written.')
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.writerequests, [{'GVL.bStart': True}], 'The write symbols shall go out in one write cycle.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 5, 'The model shall be updated.')
+
+    def test_write_many_rejects_invalid_set(self):
+
+        self.assertFalse(self.adsmodel.writemany({'GVL.bStart': True, 'GVL.nCounter': 'x'}), 'An invalid value shall be reported.')
+        self.assertFalse(self.adsmodel.writemany({'GVL.bStart': True, 'GVL.nUnknown': 1}), 'An unknown symbol shall be reported.')
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.adsmodel.read('GVL.bStart'), False, 'Nothing of an invalid set shall be written.')
+        self.assertEqual(self.plc.writerequests, [], 'No ADS write shall be sent.')
+
+    def test_batch(self):
+
+        with self.adsmodel.batch():
+            self.adsmodel.write('GVL.bStart', True)
+            self.adsmodel.writeads(self.plc)
+            self.assertEqual(self.adsmodel.read('GVL.bStart'), True, 'The batch shall see its own writes.')
+
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.writerequests, [{'GVL.bStart': True}], 'The batch shall be written at the end of the block.')
+
+    def test_batch_discarded_on_error(self):
+
+        with self.assertRaises(RuntimeError):
+            with self.adsmodel.batch() as batch:
+                batch.write('GVL.bStart', True)
+                raise RuntimeError()
+
+        self.assertEqual(self.adsmodel.read('GVL.bStart'), False, 'A failed batch shall not be written.')
+
+
+class Adsdata_UrgentWrite_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the urgent writes between two cycles
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeConnection(symbols={'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'})
+        self.adsmodel.resolvesymbols(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_write_now(self):
+
+        self.adsmodel.write('GVL.bStart', False)
+        request = self.adsmodel.writenow({'GVL.bStart': True}, confirm=True)
+        self.assertTrue(self.adsmodel.urgentevent.is_set(), 'The ADS thread shall be woken up.')
+        requests = self.plc.requests
+
+        self.assertEqual(self.adsmodel.writeurgent(self.plc), 1, 'The urgent write shall be sent.')
+        self.assertTrue(request.wait(0), 'The urgent write shall be confirmed.')
+        self.assertEqual(self.plc.requests - requests, 2, 'One write and one read back request.')
+        self.assertGreater(request.latency, 0, 'The latency shall be measured.')
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.requests - requests, 2, 'An older value shall not be written by the write cycle.')
+        self.assertEqual(self.plc.getvalue('GVL.bStart'), True, 'The value shall be written to the PLC.')
+
+    def test_reject_invalid_write_now(self):
+
+        request = self.adsmodel.writenow({'GVL.nCounter': 1})
+
+        self.assertTrue(request.done, 'A read symbol shall be rejected at once.')
+        self.assertFalse(request.wait(0), 'The rejected write shall fail.')
+        self.assertEqual(self.adsmodel.writeurgent(self.plc), 0, 'Nothing shall be sent.')
+
+    def test_write_now_without_connection(self):
+
+        request = self.adsmodel.writenow({'GVL.bStart': True})
+        self.adsmodel.writeurgent(None)
+
+        self.assertEqual(request.errors, {'GVL.bStart': 'not connected'}, 'The urgent write shall fail without connection.')
+
+
+class Adsdata_Reload_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the reload of the ads symbol list at runtime
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeConnection(symbols={'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT',
+                                           'GVL.bReady': 'BOOL', 'GVL.nNew': 'DINT'})
+        self.adsmodel.resolvesymbols(self.plc)
+        self.plc.setvalue('GVL.nCounter', 5)
+        self.adsmodel.readads(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_reload_changed_symbols(self):
+
+        info = self.adsmodel.symbolinfo['GVL.nCounter']
+
+        with open(self.symbolfile, 'w') as file:
+            file.write(SYMBOLS.replace('mode: W', 'mode: R').split('  GVL.bReady:')[0] +
+                       '''
+  GVL.nNew:
+    type: DINT
+    mode: R
+''')
+
+        diff = self.adsmodel.reloadsymbols()
+        self.assertEqual(self.adsmodel.read('GVL.nNew'), None, 'The reload shall wait for the ADS thread.')
+        self.plc.setvalue('GVL.nNew', 9)
+        self.assertTrue(self.adsmodel.applyreload(self.plc), 'The reload shall be applied.')
+
+        self.assertEqual(diff, {'added': ['GVL.nNew'], 'removed': ['GVL.bReady'], 'retyped': [], 'changed': ['GVL.bStart']},
+                         'The differences shall be reported.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 5, 'Unchanged symbols shall keep their values.')
+        self.assertIs(self.adsmodel.symbolinfo['GVL.nCounter'], info, 'Unchanged symbols shall not be resolved again.')
+        self.assertNotIn('GVL.bReady', self.adsmodel.readlist, 'Removed symbols shall not be read.')
+        self.assertEqual(self.adsmodel.writedict, {}, 'Changed modes shall be applied.')
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.read('GVL.nNew'), 9, 'Added symbols shall be resolved and read.')
+        self.assertEqual(self.adsmodel.getsnapshot()['GVL.nNew'], 9, 'The snapshot shall contain the added symbols.')
+
+    def test_remove_subscribed_symbol(self):
+
+        changes = queue.Queue()
+        self.adsmodel.subscribe(['GVL.nCounter', 'GVL.bReady'], queue=changes)
+
+        with open(self.symbolfile, 'w') as file:
+            file.write(SYMBOLS.replace('''  GVL.nCounter:
+    type: INT
+    mode: R
+    group: counters
+''', ''))
+
+        self.adsmodel.reloadsymbols()
+        self.adsmodel.applyreload(self.plc)
+        self.plc.setvalue('GVL.bReady', True)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(changes.get(timeout=1.0)[:2], ('GVL.bReady', True), 'The other symbols shall be delivered.')
+        self.assertTrue(self.adsmodel.dispatcher.is_alive(), 'A removed symbol shall not stop the dispatcher.')
+        self.adsmodel.dispatcher.stop()
+
+    def test_retype_compacts_image(self):
+
+        self.plc.setvalue('GVL.bReady', True)
+        self.adsmodel.readads(self.plc)
+
+        for datatype in ('DINT', 'INT') * 5:
+            with open(self.symbolfile, 'w') as file:
+                file.write(SYMBOLS.replace('type: INT', 'type: ' + datatype))
+
+            self.adsmodel.reloadsymbols()
+            self.adsmodel.applyreload(self.plc)
+
+        self.assertLessEqual(len(self.adsmodel.adsdata.image), 2 * 4, 'Repeated reloads shall not grow the image.')
+        self.assertEqual(self.adsmodel.read('GVL.bReady'), True, 'The values shall be kept by the compaction.')
+
+    def test_unchanged_file(self):
+
+        self.assertIsNone(self.adsmodel.reloadsymbols(), 'An unchanged file shall not be reloaded.')
+        self.assertFalse(self.adsmodel.applyreload(self.plc), 'Nothing shall be applied.')
+
+
+class Adsdata_SumCommand_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the precompiled sum commands of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeSumPlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_read_with_one_sum_command(self):
+
+        notFoundSymbol = self.adsmodel.resolvesymbols(self.plc)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(notFoundSymbol, False, 'All symbols shall be resolved.')
+        self.assertEqual(self.plc.sumrequests, 1, 'All symbols shall be read with one sum command.')
+        self.assertEqual(self.plc.readrequests, [], 'No symbol shall be read by name.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 7, 'The sum read shall update the model.')
+
+    def test_write_with_sum_command(self):
+
+        self.adsmodel.resolvesymbols(self.plc)
+        self.adsmodel.write('GVL.bStart', True)
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.values['GVL.bStart'], True, 'The sum write shall write the changed symbol.')
+        self.assertEqual(self.plc.writerequests, [], 'No symbol shall be written by name.')
+
+    def test_resolve_again_after_online_change(self):
+
+        self.adsmodel.resolvesymbols(self.plc)
+        self.adsmodel.readads(self.plc)
+        self.plc.version = 2
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.symbolversion, 2, 'The symbols shall be resolved again.')
+        self.assertEqual(len(self.plc.handles), 3, 'The old handles shall be released.')
+
+    def test_release_handles(self):
+
+        self.adsmodel.resolvesymbols(self.plc)
+        self.adsmodel.releasehandles(self.plc)
+
+        self.assertEqual(self.plc.handles, {}, 'All handles shall be released.')
+
+
+class Adsdata_Chunk_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the chunked ADS requests of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.plc = FakeSumPlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_split_chunks_by_count_and_bytes(self):
+
+        self.assertEqual(splitchunks([1, 1, 1], 2, 1000), [(0, 2), (2, 3)], 'Chunks shall respect the count limit.')
+        self.assertEqual(splitchunks([100, 100], 10, 150), [(0, 1), (1, 2)], 'Chunks shall respect the byte limit.')
+
+    def test_sum_read_in_chunks(self):
+
+        adsmodel = Adsdata(self.symbolfile, maxsubcommands=2)
+        adsmodel.resolvesymbols(self.plc)
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(self.plc.sumrequests, 2, 'The read shall be split into two chunks.')
+        self.assertEqual(len(adsmodel.readchunkstats), 2, 'Each chunk shall have statistics.')
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 7, 'The chunks shall update the model.')
+
+    def test_parallel_chunks(self):
+
+        adsmodel = Adsdata(self.symbolfile, maxsubcommands=1, parallelchunks=2)
+        adsmodel.resolvesymbols(self.plc)
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 7, 'Parallel chunks shall update the model.')
+
+    def test_missing_symbol_is_isolated(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        del self.plc.values['GVL.bReady']
+        self.plc.values['GVL.nCounter'] = 9
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 9, 'A missing symbol shall not discard the other symbols.')
+
+    def test_unconvertible_symbol_is_isolated(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        read = self.plc.read_list_by_name
+
+        def readstruct(names):
+            if 'GVL.bReady' in names:
+                raise KeyError(65)
+            return read(names)
+
+        self.plc.read_list_by_name = readstruct
+        self.plc.values['GVL.nCounter'] = 9
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 9, 'A symbol pyads cannot convert shall not discard the other symbols.')
+
+
+class Adsdata_BlockRead_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the memory-block reads of neighbouring symbols
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.plc = FakeConnection(symbols={'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'})
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_coalesce_by_gap(self):
+
+        blocks = coalesce([('c', ADSIGRP_PLCMEMORY, 100, 1), ('a', ADSIGRP_PLCMEMORY, 0, 2),
+                           ('b', ADSIGRP_PLCMEMORY, 6, 4)], 4, 1000)
+
+        self.assertEqual(blocks[0], (ADSIGRP_PLCMEMORY, 0, 10, [('a', 0, 2), ('b', 6, 4)]), 'Symbols within the gap shall share a block.')
+        self.assertEqual(len(blocks), 2, 'Symbols beyond the gap shall get their own block.')
+
+    def test_read_one_block(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        adsmodel.resolvesymbols(self.plc)
+        self.plc.setvalue('GVL.nCounter', 12)
+        self.plc.setvalue('GVL.bReady', True)
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.sumreads[0].count, 2, 'All symbols shall be read as one block plus the symbol version.')
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 12, 'The block shall be sliced into the symbols.')
+        self.assertEqual(adsmodel.read('GVL.bReady'), True, 'The block shall be sliced into the symbols.')
+
+    def test_disable_blocks(self):
+
+        adsmodel = Adsdata(self.symbolfile, maxreadgap=-1)
+        adsmodel.resolvesymbols(self.plc)
+        adsmodel.readads(self.plc)
+
+        self.assertEqual(adsmodel.sumreads[0].count, 4, 'Each symbol shall be read on its own.')
+
+
+class Adsdata_ReadGroup_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the read groups with their own periods
+    '''
+    SYMBOLS = '''
+readgroups:
+  slow: 100ms
+  diag: on_demand
+
+symbols:
+  GVL.bStart:
+    type: BOOL
+    mode: W
+
+  GVL.nCounter:
+    type: INT
+    mode: R
+    group: slow
+
+  GVL.bReady:
+    type: BOOL
+    mode: R
+    group: diag
+'''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(self.SYMBOLS)
+        self.plc = FakeConnection(symbols={'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'})
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.adsmodel.setcycletime(0.01)
+        self.adsmodel.resolvesymbols(self.plc)
+        self.adsmodel.readads(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_slow_group_period(self):
+
+        self.plc.setvalue('GVL.nCounter', 5)
+        cycles = 0
+
+        while self.adsmodel.read('GVL.nCounter') != 5 and cycles < 20:
+            self.adsmodel.readads(self.plc)
+            cycles += 1
+
+        self.assertGreater(cycles, 1, 'The slow group shall not be read every cycle.')
+        self.assertLessEqual(cycles, 10, 'The slow group shall be read every 100ms / 10ms cycles.')
+
+    def test_rounded_period(self):
+
+        with self.assertLogs(level='WARNING') as logs:
+            self.adsmodel.setcycletime(0.03)
+
+        self.assertEqual(self.adsmodel.groupcycles['slow'], 3, 'The period shall be rounded to whole cycles.')
+        self.assertIn('[slow]', logs.output[0], 'A period which is no multiple of the cycle time shall be logged.')
+
+        with self.assertLogs(level='WARNING'):
+            self.adsmodel.setcycletime(0.2)
+
+        self.assertEqual(self.adsmodel.groupcycles['slow'], 1, 'A period shorter than the cycle shall be read every cycle.')
+
+    def test_on_demand_group(self):
+
+        self.plc.setvalue('GVL.bReady', True)
+        self.plc.setvalue('GVL.bStart', True)
+        self.adsmodel.readads(self.plc)
+        before = self.adsmodel.read('GVL.bReady')
+        self.adsmodel.requestread('diag')
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.read('GVL.bStart'), True, 'Symbols without a read group shall be read every cycle.')
+        self.assertEqual(before, False, 'On demand groups shall only be read on request.')
+        self.assertEqual(self.adsmodel.read('GVL.bReady'), True, 'A requested group shall be read in the next cycle.')
+
+
+class Adsdata_Snapshot_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the snapshots of the process image
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile, snapshothistory=2)
+        self.plc = FakePlc()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_snapshot_after_each_cycle(self):
+
+        self.adsmodel.readads(self.plc)
+        snapshot = self.adsmodel.getsnapshot()
+
+        self.assertEqual(snapshot.cycle, self.adsmodel.cycle, 'The latest snapshot shall be published.')
+        self.assertEqual(snapshot.read('GVL.nCounter'), 7, 'The snapshot shall contain the read values.')
+
+    def test_snapshot_is_immutable(self):
+
+        self.adsmodel.readads(self.plc)
+        snapshot = self.adsmodel.getsnapshot()
+        self.plc.values['GVL.nCounter'] = 8
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(snapshot.read('GVL.nCounter'), 7, 'A published snapshot shall not change.')
+        self.assertEqual(self.adsmodel.getsnapshot().read('GVL.nCounter'), 8, 'The next snapshot shall contain the new value.')
+
+    def test_snapshot_of_cycle(self):
+
+        self.adsmodel.readads(self.plc)
+        cycle = self.adsmodel.cycle
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.getsnapshot(cycle).cycle, cycle, 'Recent cycles shall be kept.')
+
+        self.adsmodel.readads(self.plc)
+
+        self.assertIsNone(self.adsmodel.getsnapshot(cycle), 'Old cycles shall be dropped.')
+
+
+class Adsfacade_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the namespaced access to several ADS data models
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.facade = Adsfacade({'plc1': Adsdata(self.symbolfile), 'plc2': Adsdata(self.symbolfile)})
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_namespaced_write(self):
+
+        self.facade.write('plc2:GVL.bStart', True)
+
+        self.assertEqual(self.facade.read('plc2:GVL.bStart'), True, 'The target shall be written.')
+        self.assertEqual(self.facade.read('plc1:GVL.bStart'), False, 'Other targets shall not be changed.')
+
+    def test_namespaced_write_many(self):
+
+        self.facade.writemany({'plc1:GVL.bStart': True, 'plc2:GVL.nCounter': 3})
+
+        self.assertEqual(self.facade.readmany(['plc1:GVL.bStart', 'plc2:GVL.nCounter', 'plc9:GVL.bStart']),
+                         {'plc1:GVL.bStart': True, 'plc2:GVL.nCounter': 3, 'plc9:GVL.bStart': None},
+                         'The values shall be read and written per target.')
+
+    def test_default_of_added_model(self):
+
+        facade = Adsfacade()
+        facade.addmodel('plc1', self.facade.getmodel('plc1'))
+        facade.addmodel('plc2', self.facade.getmodel('plc2'))
+        facade.write('GVL.bStart', True)
+
+        self.assertEqual(facade.default, 'plc1', 'The first added model shall be the default target.')
+        self.assertTrue(facade.read('plc1:GVL.bStart'), 'Names without target shall use the default target.')
+
+    def test_unknown_target(self):
+
+        self.assertIsNone(self.facade.read('plc9:GVL.bStart'), 'Unknown targets shall return None.')
+        self.assertIsNone(self.facade.read('GVL.bStart'), 'Names without target require a default target.')
+
+
+class Adsdata_Subscription_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the change subscriptions of the ADS data model
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakePlc()
+        self.changes = queue.Queue()
+
+    def tearDown(self):
+        self.adsmodel.dispatcher.stop()
+        os.remove(self.symbolfile)
+
+    def test_match_symbols(self):
+
+        self.adsmodel.subscribe('GVL.n*', queue=self.changes)
+
+        self.assertEqual(self.adsmodel.matchsymbols('GVL.b*'), ['GVL.bStart', 'GVL.bReady'], 'Glob patterns shall match.')
+        self.assertEqual(self.adsmodel.matchsymbols('group:counters'), ['GVL.nCounter'], 'Groups shall match.')
+
+    def test_notify_only_changes(self):
+
+        self.adsmodel.subscribe('group:counters', queue=self.changes)
+        self.adsmodel.readads(self.plc)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.changes.get(timeout=1)[:2], ('GVL.nCounter', 7), 'The change shall be delivered.')
+        self.adsmodel.dispatcher.put(self.adsmodel.getsnapshot())
+        self.assertRaises(queue.Empty, self.changes.get, timeout=0.1)
+
+    def test_deadband(self):
+
+        self.adsmodel.subscribe('GVL.nCounter', queue=self.changes, deadband=5)
+        self.plc.values['GVL.nCounter'] = 3
+        self.adsmodel.readads(self.plc)
+        self.plc.values['GVL.nCounter'] = 6
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.changes.get(timeout=1)[:2], ('GVL.nCounter', 6), 'Only changes beyond the deadband shall be delivered.')
+        self.assertTrue(self.changes.empty(), 'Changes within the deadband shall be filtered.')
+
+
+class Adsdata_FakeConnection_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the ADS cycle on the simulated ADS server
+    '''
+    SYMBOLS = '''
+symbols:
+  GVL.sName:
+    type: STRING(10)
+    mode: W
+
+  GVL.aValues:
+    type: ARRAY[1..3] OF REAL
+    mode: R
+'''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(self.SYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeConnection(symbols={'GVL.sName': 'STRING(10)', 'GVL.aValues': 'ARRAY[1..3] OF REAL'})
+        self.adsmodel.resolvesymbols(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_read_array(self):
+
+        self.plc.setvalue('GVL.aValues', [1.0, 2.0, 3.0])
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.read('GVL.aValues'), [1.0, 2.0, 3.0], 'The array shall be read with the sum command.')
+
+    def test_write_string(self):
+
+        self.adsmodel.write('GVL.sName', 'robot')
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.getvalue('GVL.sName'), 'robot', 'The string shall be written with the sum command.')
+
+
+    def test_reject_mismatched_array(self):
+
+        plc = FakeConnection(symbols={'GVL.sName': 'STRING(10)', 'GVL.aValues': 'ARRAY[1..4] OF REAL'})
+        self.adsmodel.resolvesymbols(plc)
+        plc.setvalue('GVL.aValues', [1.0, 2.0, 3.0, 4.0])
+        self.adsmodel.write('GVL.sName', 'robot')
+        self.adsmodel.writeads(plc)
+        self.adsmodel.readads(plc)
+
+        self.assertEqual(self.adsmodel.rejected, {'GVL.aValues'}, 'A compound symbol of another size shall be rejected.')
+        self.assertEqual(self.adsmodel.read('GVL.aValues'), [0.0, 0.0, 0.0], 'A rejected symbol shall not be read by name.')
+        self.assertEqual(plc.getvalue('GVL.sName'), 'robot', 'The other symbols shall be written.')
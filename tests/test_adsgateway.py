@@ -0,0 +1,124 @@
+import os
+import socket
+import struct
+import sys
+import tempfile
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from models.adsgateway import Adsgateway, Adsgatewayclient, Adsgatewaysession
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, createsymbolfile
+
+
+PLCSYMBOLS = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'}
+
+
+class Adsgateway_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the gateway serving the ADS data model to local clients
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.plc = FakeConnection(symbols=PLCSYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.adsmodel.resolvesymbols(self.plc)
+        self.gateway = Adsgateway(self.adsmodel, '127.0.0.1:0')
+        self.gateway.start()
+        self.client = Adsgatewayclient(self.gateway.address)
+
+    def tearDown(self):
+        self.client.close()
+        self.gateway.stop()
+        os.remove(self.symbolfile)
+
+    def test_read(self):
+
+        self.plc.setvalue('GVL.nCounter', 42)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.client.read('GVL.nCounter'), 42, 'The client shall read the model.')
+        self.assertEqual(self.client.readmany(['GVL.bStart', 'GVL.nUnknown']), {'GVL.bStart': False, 'GVL.nUnknown': None},
+                         'Unknown symbols shall be None.')
+        self.assertEqual(self.client.cycle, self.adsmodel.cycle, 'The values shall be of the current cycle.')
+
+    def test_write_many(self):
+
+        self.assertTrue(self.client.writemany({'GVL.bStart': True, 'GVL.nCounter': 5}), 'The values shall be written.')
+        self.assertFalse(self.client.writemany({'GVL.nCounter': 'x'}), 'Invalid values shall be rejected.')
+        self.adsmodel.writeads(self.plc)
+
+        self.assertEqual(self.plc.getvalue('GVL.bStart'), True, 'The write symbols shall be written to the PLC.')
+        self.assertEqual(self.adsmodel.read('GVL.nCounter'), 5, 'The model shall be updated.')
+
+    def test_subscribe(self):
+
+        self.assertTrue(self.client.subscribe(['GVL.nCounter']), 'The subscription shall be accepted.')
+        self.assertEqual(self.client.receive()[1], {'GVL.nCounter': 0}, 'The current value shall be sent first.')
+        self.adsmodel.readads(self.plc)
+
+        self.assertIsNone(self.client.receive(0.05), 'Unchanged values shall not be sent.')
+        self.plc.setvalue('GVL.nCounter', 3)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.client.receive()[1], {'GVL.nCounter': 3}, 'Changes shall be pushed.')
+
+    def test_unix_socket(self):
+
+        path = tempfile.mktemp(suffix='.sock')
+        gateway = Adsgateway(self.adsmodel, 'unix:' + path)
+        gateway.start()
+        client = Adsgatewayclient('unix:' + path)
+
+        self.assertEqual(client.read('GVL.nCounter'), 0, 'The gateway shall serve Unix sockets.')
+        client.close()
+        gateway.stop()
+        self.assertFalse(os.path.exists(path), 'The socket file shall be removed.')
+
+
+class Adsgateway_Backpressure_Testcase(unittest2.TestCase):
+    '''
+    Test cases for slow clients of the gateway
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.plc = FakeConnection(symbols=PLCSYMBOLS)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.adsmodel.resolvesymbols(self.plc)
+        self.gateway = Adsgateway(self.adsmodel, '127.0.0.1:0', maxbuffer=64)
+        self.gateway.bind()
+        self.sock, self.peer = socket.socketpair()
+        self.session = Adsgatewaysession(self.sock, 'test')
+        self.gateway.selector.register(self.sock, 1, self.session)
+        self.gateway.sessions[self.sock] = self.session
+        self.session.subscribed = self.gateway.subscribed = {'GVL.nCounter'}
+        self.gateway.update(self.adsmodel.snapshot)
+        self.session.pending.clear()
+
+    def tearDown(self):
+        self.gateway.shutdown()
+        self.peer.close()
+        os.remove(self.symbolfile)
+
+    def test_coalesce_slow_subscriber(self):
+
+        self.session.outbuffer += b'\x00' * 64
+
+        for value in (1, 2, 3):
+            self.plc.setvalue('GVL.nCounter', value)
+            self.adsmodel.readads(self.plc)
+            self.gateway.update(self.adsmodel.snapshot)
+            self.gateway.flush(self.session)
+
+        self.assertTrue(self.session.paused, 'A full client shall not be read from.')
+        self.assertEqual(self.gateway.stats['coalesced'], 2, 'The changes of a slow client shall be coalesced.')
+        self.session.outbuffer.clear()
+        self.gateway.flush(self.session)
+
+        self.assertFalse(self.session.paused, 'A drained client shall be read again.')
+        self.assertEqual(struct.unpack('<h', self.session.outbuffer[-2:])[0], 3, 'Only the latest value shall be sent.')
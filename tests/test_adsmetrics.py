@@ -0,0 +1,66 @@
+import os
+import sys
+import urllib.request
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from utils.ads_metrics import NULLMETRICS, Ads_Metrics, Ads_MetricsServer
+from tests.helpers import SYMBOLS, FakePlc, createsymbolfile
+
+
+class Ads_Metrics_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the metrics of the ADS cycle
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.metrics = Ads_Metrics()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_openmetrics_exposition(self):
+
+        self.metrics.inc('ads_cycles', target='plc1')
+        self.metrics.observe('ads_read_seconds', 0.003)
+        text = self.metrics.exposition()
+
+        self.assertIn('ads_cycles_total{target="plc1"} 1', text, 'Counters shall have the _total suffix.')
+        self.assertIn('ads_read_seconds_bucket{le="0.005"} 1', text, 'Histogram buckets shall be cumulative.')
+        self.assertTrue(text.endswith('# EOF\n'), 'The exposition shall end with EOF.')
+
+    def test_model_instrumentation(self):
+
+        adsmodel = Adsdata(self.symbolfile, metrics=self.metrics)
+        adsmodel.readads(FakePlc())
+        metrics = self.metrics.collect()
+
+        self.assertEqual(metrics['ads_symbols_changed'], [({}, 1)], 'The changed symbols of the cycle shall be counted.')
+        self.assertIn('ads_lock_hold_seconds', metrics, 'The lock hold time shall be recorded.')
+
+    def test_disabled_metrics(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        adsmodel.readads(FakePlc())
+
+        self.assertIs(adsmodel.metrics, NULLMETRICS, 'Metrics shall be disabled by default.')
+        self.assertEqual(NULLMETRICS.collect(), {}, 'Disabled metrics shall not collect anything.')
+
+    def test_http_endpoint(self):
+
+        self.metrics.inc('ads_reconnects')
+        server = Ads_MetricsServer(self.metrics, port=0)
+        server.start()
+
+        try:
+            url = 'http://127.0.0.1:' + str(server.server.server_address[1]) + '/metrics'
+            body = urllib.request.urlopen(url, timeout=5).read().decode('utf-8')
+
+        finally:
+            server.stop()
+
+        self.assertIn('ads_reconnects_total 1', body, 'The metrics shall be served over HTTP.')
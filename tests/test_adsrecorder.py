@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from models.adsrecorder import Adsrecorder, Adsrecording
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, createsymbolfile
+
+
+PLCSYMBOLS = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'}
+
+
+class Adsrecorder_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the recorder of the ADS read cycles
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.path = tempfile.mktemp(suffix='.rec')
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.plc = FakeConnection(symbols=PLCSYMBOLS)
+        self.adsmodel.resolvesymbols(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+        for path in (self.path, self.path + '.1'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def runcycles(self, values):
+        for value in values:
+            self.plc.setvalue('GVL.nCounter', value)
+            self.adsmodel.readads(self.plc)
+
+    def test_record_changes(self):
+
+        recorder = Adsrecorder(self.adsmodel, self.path, segmentcycles=2)
+        recorder.start()
+        self.runcycles([1, 1, 2, 3, 3])
+        recorder.stop()
+        series = Adsrecording(self.path).series('GVL.nCounter')
+
+        self.assertEqual([value for timestamp, value in series], [1, 2, 3], 'Only the changes shall be returned.')
+        self.assertEqual(recorder.stats['recorded'], 5, 'Each cycle shall be recorded.')
+        self.assertEqual(sorted(series), series, 'The timestamps shall be monotonic.')
+
+    def test_full_ring_drops_oldest_cycles(self):
+
+        recorder = Adsrecorder(self.adsmodel, self.path, capacity=2)
+        recorder.openfile()
+        self.adsmodel.recorder = recorder
+        self.runcycles([1, 2, 3, 4])
+        recorder.drain()
+        recorder.flush()
+        recorder.closefile()
+        cycles = [cycle for cycle, timestamp, layout, image in Adsrecording(self.path).frames()]
+
+        self.assertEqual(recorder.stats['dropped'], 2, 'A full ring shall drop cycles instead of blocking.')
+        self.assertEqual(len(cycles), 2, 'The latest cycles shall be recorded.')
+
+    def test_slots_lapped_during_drain(self):
+
+        recorder = Adsrecorder(self.adsmodel, self.path, capacity=4)
+        recorder.openfile()
+        self.adsmodel.recorder = recorder
+        self.runcycles([1, 2, 3, 4])
+        runcycles = self.runcycles
+
+        class Ring(list):
+            def __getitem__(self, i):
+                # The ADS thread laps two slots while the recorder copies them
+                if not hasattr(self, 'lapped'):
+                    self.lapped = True
+                    runcycles([5, 6])
+                return list.__getitem__(self, i)
+
+        recorder.ring = Ring(recorder.ring)
+        recorder.drain()
+        recorder.drain()
+        recorder.flush()
+        recorder.closefile()
+        cycles = [cycle for cycle, timestamp, layout, image in Adsrecording(self.path).frames()]
+
+        self.assertEqual(cycles, sorted(cycles), 'The cycles shall be recorded in order.')
+        self.assertEqual(recorder.stats['recorded'] + recorder.stats['dropped'], 6, 'Each lost cycle shall be counted as dropped.')
+
+    def test_rotate_full_file(self):
+
+        recorder = Adsrecorder(self.adsmodel, self.path, filesize=256, maxfiles=2, segmentcycles=1)
+        recorder.start()
+        self.runcycles(range(20))
+        recorder.stop()
+        changes = list(Adsrecording(self.path).changes())
+
+        self.assertTrue(os.path.exists(self.path + '.1'), 'A full file shall be rotated.')
+        self.assertEqual(changes[-1][2]['GVL.nCounter'], 19, 'The current file shall contain the latest cycles.')
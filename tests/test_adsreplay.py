@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import time
+import unittest2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from models.adsrecorder import Adsrecorder, Adsrecording
+from models.adsreplay import Adsreplay, Adsreplayconnection
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, createsymbolfile
+
+
+PLCSYMBOLS = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'}
+
+
+class Adsreplay_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the replay of recorded ADS read cycles
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.path = tempfile.mktemp(suffix='.rec')
+        adsmodel = Adsdata(self.symbolfile)
+        plc = FakeConnection(symbols=PLCSYMBOLS)
+        adsmodel.resolvesymbols(plc)
+        recorder = Adsrecorder(adsmodel, self.path)
+        recorder.start()
+
+        for value in range(1, 6):
+            plc.setvalue('GVL.nCounter', value)
+            adsmodel.readads(plc)
+            time.sleep(0.002)
+
+        recorder.stop()
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_replay_feeds_model(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        replay = Adsreplay(adsmodel, self.path)
+        stats = replay.run()
+
+        self.assertEqual(stats['cycles'], 5, 'Each recorded cycle shall be replayed.')
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 5, 'The model shall show the last recorded cycle.')
+        self.assertGreater(stats['cyclespersecond'], 0, 'The achieved cycles per second shall be reported.')
+
+    def test_capture_writes(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        replay = Adsreplay(adsmodel, self.path)
+        adsmodel.write('GVL.bStart', True)
+        replay.run(maxcycles=2)
+        firstcycle = next(Adsrecording(self.path).frames())[0]
+
+        self.assertEqual(replay.stats['cycles'], 2, 'The replay shall stop after maxcycles.')
+        self.assertEqual(replay.writes, [(firstcycle, 'GVL.bStart', True)],
+                         'The writes of the model shall be captured with the cycle.')
+
+    def test_replay_speed(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        recorded = Adsreplay(adsmodel, self.path, speed=1.0).run()
+        fast = Adsreplay(adsmodel, self.path, speed=100.0).run()
+
+        self.assertGreaterEqual(recorded['duration'], 0.008, 'Speed 1 shall keep the recorded timing.')
+        self.assertLess(fast['duration'], recorded['duration'], 'A higher speed shall replay faster.')
+
+    def test_clock_follows_speed(self):
+
+        plc = Adsreplayconnection(self.path, speed=1.0)
+        plc.open()
+        first = plc.getvalue('GVL.nCounter')
+        time.sleep(0.05)
+        plc.read_state()
+
+        self.assertEqual(first, 1, 'The first frame shall be loaded at start.')
+        self.assertEqual(plc.getvalue('GVL.nCounter'), 5, 'The frames shall follow the replay clock.')
+        self.assertTrue(plc.finished, 'The end of the recording shall be reported.')
@@ -0,0 +1,67 @@
+import threading
+import unittest2
+from src.adsclientthread_package_tchobtrong.utils.ads_scheduler import Ads_Scheduler
+
+
+class Ads_Scheduler_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the deadline-based cycle scheduler
+    '''
+
+    def test_deadlines_do_not_drift(self):
+
+        scheduler = Ads_Scheduler(0.005)
+        scheduler.start(now=0.0)
+
+        self.assertEqual(scheduler.release(now=0.0), True, 'The first cycle shall be released immediately.')
+        scheduler.finish(now=0.003)
+        self.assertEqual(scheduler.release(now=0.004), False, 'The cycle shall wait for its deadline.')
+        self.assertEqual(scheduler.release(now=0.0051), True, 'The cycle shall be released at its deadline.')
+        self.assertAlmostEqual(scheduler.deadline, 0.010, msg='The deadlines shall stay on the grid.')
+
+    def test_skip_overrun(self):
+
+        scheduler = Ads_Scheduler(0.005, Ads_Scheduler.SKIP)
+        scheduler.start(now=0.0)
+        scheduler.release(now=0.0)
+        scheduler.finish(now=0.012)
+
+        self.assertEqual(scheduler.stats.overruns, 1, 'The overrun shall be counted.')
+        self.assertEqual(scheduler.stats.skipped, 2, 'The missed deadlines shall be skipped.')
+        self.assertAlmostEqual(scheduler.deadline, 0.015, msg='The next cycle shall start on the grid.')
+
+    def test_catchup_overrun(self):
+
+        scheduler = Ads_Scheduler(0.005, Ads_Scheduler.CATCHUP)
+        scheduler.start(now=0.0)
+        scheduler.release(now=0.0)
+        scheduler.finish(now=0.012)
+
+        self.assertEqual(scheduler.release(now=0.012), True, 'The missed cycle shall run immediately.')
+        self.assertEqual(scheduler.release(now=0.012), True, 'All missed cycles shall run back-to-back.')
+        self.assertEqual(scheduler.release(now=0.012), False, 'The cycles shall stop at the grid.')
+
+    def test_jitter_statistics(self):
+
+        scheduler = Ads_Scheduler(0.005)
+        scheduler.start(now=0.0)
+        scheduler.release(now=0.0)
+        scheduler.release(now=0.006)
+        summary = scheduler.stats.summary()
+
+        self.assertEqual(summary['cycles'], 2, 'All cycles shall be counted.')
+        self.assertAlmostEqual(summary['jitter_p99'], 1.0, msg='The jitter shall be the delay after the deadline.')
+        self.assertEqual(summary['periods'][10], 1, 'The period shall be in the 10 ms bucket.')
+
+    def test_wakeup_before_deadline(self):
+
+        scheduler = Ads_Scheduler(10.0)
+        wakeup = threading.Event()
+        scheduler.start()
+        scheduler.wait(wakeup)
+        deadline = scheduler.deadline
+        wakeup.set()
+
+        self.assertFalse(scheduler.wait(wakeup), 'The sleep shall end with the wakeup event.')
+        self.assertFalse(wakeup.is_set(), 'The wakeup event shall be reset.')
+        self.assertEqual(scheduler.deadline, deadline, 'The deadline shall not change.')
@@ -0,0 +1,84 @@
+import os
+import sys
+import unittest2
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from models.adssharedimage import MAXRETRIES, SEQUENCE, SEQUENCEOFFSET, Adssharedclient, Adssharedimage
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, createsymbolfile
+
+
+PLCSYMBOLS = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'}
+
+UPLOADSYMBOLS = SYMBOLS + '''
+upload:
+  include: ['GVL_Robot.*']
+'''
+
+
+class Adssharedimage_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the process image shared with other local processes
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(UPLOADSYMBOLS)
+        self.name = 'adstest' + str(os.getpid())
+        self.plc = FakeConnection(symbols=dict({'GVL_Robot.nState': 'DINT'}, **PLCSYMBOLS))
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.sharedimage = Adssharedimage(self.adsmodel, self.name)
+        self.sharedimage.start()
+        self.client = Adssharedclient(self.name)
+
+    def tearDown(self):
+        self.client.close()
+        self.sharedimage.stop()
+        os.remove(self.symbolfile)
+
+    def test_read_published_cycle(self):
+
+        self.adsmodel.resolvesymbols(self.plc)
+        self.plc.setvalue('GVL.nCounter', 42)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.client.read('GVL.nCounter'), 42, 'The client shall read the published image.')
+        self.assertEqual(self.client.readmany(['GVL.nCounter', 'GVL.bStart']), {'GVL.nCounter': 42, 'GVL.bStart': False},
+                         'The client shall read several symbols of one cycle.')
+        self.assertEqual(self.client.cycle, self.adsmodel.cycle, 'The cycle of the read image shall be known.')
+
+    def test_layout_change(self):
+
+        self.assertIsNone(self.client.read('GVL_Robot.nState'), 'Unknown symbols shall return None.')
+        self.adsmodel.resolvesymbols(self.plc)
+        self.plc.setvalue('GVL_Robot.nState', 7)
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.client.read('GVL_Robot.nState'), 7, 'The client shall follow a changed symbol layout.')
+
+    def test_write_in_progress_is_not_read(self):
+
+        self.client.read('GVL.nCounter')
+        SEQUENCE.pack_into(self.sharedimage.memory.buf, SEQUENCEOFFSET, self.sharedimage.sequence + 1)
+
+        self.assertIsNone(self.client.read('GVL.nCounter'), 'A torn image shall not be returned.')
+        self.assertGreater(self.client.stats['retries'], 0, 'The client shall retry during a write.')
+
+    def test_layout_changes_during_read(self):
+
+        self.client.read('GVL.nCounter')
+
+        def copy(start=None, end=None):
+            # A writer which publishes a new layout during each copy
+            self.client.layoutversion += 1
+            return (None, None, self.client.layoutversion), bytes(2)
+
+        with mock.patch.object(self.client, 'copy', side_effect=copy):
+            with self.assertLogs(level='WARNING'):
+                value = self.client.read('GVL.nCounter')
+
+        self.assertIsNone(value, 'The read shall give up after a bounded number of retries.')
+        self.assertEqual(self.client.stats['retries'], MAXRETRIES, 'Each layout change shall be retried in a loop.')
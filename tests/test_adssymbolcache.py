@@ -0,0 +1,147 @@
+import os
+import sys
+import unittest2
+from unittest import mock
+from pyads.constants import ADSIGRP_SYM_UPLOAD
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src', 'adsclientthread_package_tchobtrong'))
+
+from models.adsdata import Adsdata
+from utils.ads_symboltable import Ads_SymbolTable
+from utils.ads_types import Ads_Types
+from utils.fakeconnection import FakeConnection
+from tests.helpers import SYMBOLS, createsymbolfile
+
+
+PLCSYMBOLS = {'GVL.bStart': 'BOOL', 'GVL.nCounter': 'INT', 'GVL.bReady': 'BOOL'}
+
+
+class Ads_SymbolCache_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the symbol table upload and the compiled symbol cache
+    '''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(SYMBOLS)
+        self.cachefile = self.symbolfile + '.cache'
+        self.plc = FakeConnection(symbols=PLCSYMBOLS)
+
+    def tearDown(self):
+        for path in (self.symbolfile, self.cachefile):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_resolve_with_symbol_upload(self):
+
+        adsmodel = Adsdata(self.symbolfile)
+        err = adsmodel.resolvesymbols(self.plc)
+        self.plc.setvalue('GVL.nCounter', 7)
+        adsmodel.readads(self.plc)
+
+        self.assertFalse(err, 'All symbols shall be found in the symbol table.')
+        self.assertEqual(self.plc.requests, 4, 'Upload info, upload, symbol version and one sum read.')
+        self.assertEqual(self.plc.handles, {}, 'Symbols of the symbol table shall not need handles.')
+        self.assertEqual(adsmodel.read('GVL.nCounter'), 7, 'The symbols shall be read by index group/offset.')
+
+    def test_missing_symbol_in_table(self):
+
+        del self.plc.memory['GVL.bReady']
+        err = Adsdata(self.symbolfile).resolvesymbols(self.plc)
+
+        self.assertTrue(err, 'A symbol missing in the symbol table shall be reported.')
+
+    def test_resolve_struct_member(self):
+
+        symbolfile = createsymbolfile(SYMBOLS + '''
+  GVL.stMotor.nSpeed:
+    type: INT
+    mode: W
+''')
+        registry = Ads_Types({'ST_Motor': {'pack_mode': 8, 'members': {'bOn': 'BOOL', 'nSpeed': 'INT'}}})
+        plc = FakeConnection(symbols=dict({'GVL.stMotor': 'ST_Motor'}, **PLCSYMBOLS), registry=registry)
+        adsmodel = Adsdata(symbolfile)
+        os.remove(symbolfile)
+        err = adsmodel.resolvesymbols(plc)
+        plc.setvalue('GVL.stMotor', {'bOn': True, 'nSpeed': 1200})
+        adsmodel.readads(plc)
+
+        self.assertFalse(err, 'Struct members shall be resolved outside of the symbol table.')
+        self.assertEqual(list(plc.handles.values()), ['GVL.stMotor.nSpeed'], 'Only the struct member shall need a handle.')
+        self.assertEqual(adsmodel.read('GVL.stMotor.nSpeed'), 1200, 'The struct member shall be read.')
+
+        adsmodel.write('GVL.stMotor.nSpeed', 800)
+        adsmodel.writeads(plc)
+
+        self.assertEqual(plc.getvalue('GVL.stMotor'), {'bOn': True, 'nSpeed': 800}, 'The struct member shall be written.')
+
+    def test_cached_startup(self):
+
+        Adsdata(self.symbolfile, symbolcache=True).resolvesymbols(self.plc)
+
+        with mock.patch('utils.ads_vars.yaml.load', side_effect=AssertionError), \
+             mock.patch.object(Ads_SymbolTable, 'parse', side_effect=AssertionError), \
+             mock.patch.object(self.plc, 'read', wraps=self.plc.read) as read:
+            adsmodel = Adsdata(self.symbolfile, symbolcache=True)
+            err = adsmodel.resolvesymbols(self.plc)
+
+        self.assertFalse(err, 'The symbols shall be resolved from the symbol cache.')
+        self.assertNotIn(ADSIGRP_SYM_UPLOAD, [call.args[0] for call in read.call_args_list],
+                         'The symbol table shall not be uploaded on a cache hit.')
+        self.assertEqual(len(adsmodel.readlist), 3, 'The symbol list shall be loaded from the symbol cache.')
+        self.assertEqual(adsmodel.symbolinfo['GVL.nCounter'][2], self.plc.offsets['GVL.nCounter'], 'The cached offsets shall be used.')
+
+    def test_changed_plc_project_invalidates_cache(self):
+
+        Adsdata(self.symbolfile, symbolcache=True).resolvesymbols(self.plc)
+        plc = FakeConnection(symbols=dict({'GVL.nOther': 'DINT'}, **PLCSYMBOLS))
+        adsmodel = Adsdata(self.symbolfile, symbolcache=True)
+        adsmodel.resolvesymbols(plc)
+
+        self.assertEqual(adsmodel.symbolinfo['GVL.nCounter'][2], plc.offsets['GVL.nCounter'], 'A changed symbol table shall be resolved again.')
+
+
+class Ads_SymbolTable_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the symbol model generated from the PLC symbol table
+    '''
+    SYMBOLS = '''
+upload:
+  include: ['GVL_Robot.*']
+  exclude: ['*.aDebug']
+  mode: W
+  group: robot
+
+symbols:
+  GVL_Robot.nState:
+    type: INT
+    mode: R
+'''
+
+    def setUp(self):
+        self.symbolfile = createsymbolfile(self.SYMBOLS)
+        registry = Ads_Types({'ST_Position': {'pack_mode': 8, 'members': {'bValid': 'BOOL', 'x': 'LREAL'}}})
+        self.plc = FakeConnection(symbols={'GVL_Other.nValue': 'INT',
+                                           'GVL_Robot.stPos': 'ST_Position',
+                                           'GVL_Robot.nState': 'INT',
+                                           'GVL_Robot.aDebug': 'ARRAY[1..4] OF DINT'},
+                                  registry=registry)
+        self.adsmodel = Adsdata(self.symbolfile)
+        self.adsmodel.resolvesymbols(self.plc)
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_filter_symbol_table(self):
+
+        self.assertEqual(sorted(self.adsmodel.readlist), ['GVL_Robot.nState', 'GVL_Robot.stPos'], 'Only the included symbols shall be added.')
+        self.assertEqual(list(self.adsmodel.writedict), ['GVL_Robot.stPos'], 'Listed symbols shall keep their mode.')
+        self.assertEqual(self.adsmodel.matchsymbols('group:robot'), ['GVL_Robot.stPos'], 'Generated symbols shall get the upload group.')
+
+    def test_read_uploaded_struct(self):
+
+        self.plc.setvalue('GVL_Robot.stPos', {'bValid': True, 'x': 1.5})
+        self.adsmodel.readads(self.plc)
+
+        self.assertEqual(self.adsmodel.read('GVL_Robot.stPos'), {'bValid': True, 'x': 1.5}, 'The struct layout shall be uploaded from the PLC.')
+        self.assertEqual(self.adsmodel.getsnapshot()['GVL_Robot.stPos']['x'], 1.5, 'The snapshot shall contain the generated symbols.')
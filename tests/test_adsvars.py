@@ -1,5 +1,23 @@
+import os
+import tempfile
 import unittest2
-from src.adsclientthread_package_tchobtrong.utils.ads_vars import Ads_Var
+from src.adsclientthread_package_tchobtrong.utils.ads_vars import Ads_Var, Ads_Vars
+from src.adsclientthread_package_tchobtrong.utils.ads_types import Ads_Types
+
+
+SYMBOLS = '''
+symbols:
+  GVL.bStart:
+    type: BOOL
+    mode: W
+
+  GVL.nCounter:
+    type: INT
+    mode: R
+'''
+
+DATATYPES = {'ST_Position': {'pack_mode': 8,
+                             'members': {'bValid': 'BOOL', 'x': 'LREAL', 'aAxis': 'ARRAY[1..2] OF INT'}}}
 
 
 class Ads_Var_Testcase(unittest2.TestCase):
@@ -17,4 +35,111 @@ class Ads_Var_Testcase(unittest2.TestCase):
         self.assertEqual(adsvar.value, False, 'The default shall be False.')
 
 
+class Ads_Vars_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the packed process image of ADS Vars
+    '''
+
+    def setUp(self):
+        symbolfile = tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False)
+        symbolfile.write(SYMBOLS)
+        symbolfile.close()
+        self.symbolfile = symbolfile.name
+
+    def tearDown(self):
+        os.remove(self.symbolfile)
+
+    def test_values_in_packed_image(self):
+
+        adslist = Ads_Vars(self.symbolfile)
+        adslist.getvar('GVL.nCounter').value = 300
+
+        self.assertEqual(len(adslist.image), 3, 'BOOL and INT shall be packed into 3 bytes.')
+        self.assertEqual(adslist.getvalue(adslist.getindex('GVL.nCounter')), 300, 'The value shall be stored in the image.')
+
+    def test_attribute_access(self):
+
+        adslist = Ads_Vars(self.symbolfile)
+        adsvar = getattr(adslist, 'GVL_dot_bStart')
+
+        self.assertEqual(adsvar.adsname, 'GVL.bStart', 'Attribute-style access shall return the variable.')
+        self.assertEqual(hasattr(adslist, 'GVL_dot_bUnknown'), False, 'Unknown symbols shall not exist.')
+
+    def test_read_group_periods(self):
+
+        self.assertEqual(Ads_Vars.parseperiod('2ms'), 0.002, 'Periods shall be parsed with units.')
+        self.assertEqual(Ads_Vars.parseperiod('1s'), 1.0, 'Periods shall be parsed with units.')
+        self.assertEqual(Ads_Vars.parseperiod(20), 0.02, 'Plain periods shall be in ms.')
+        self.assertIsNone(Ads_Vars.parseperiod('on_demand'), 'on_demand groups shall have no period.')
+
+    def test_diff_symbols(self):
+
+        adslist = Ads_Vars(self.symbolfile)
+        adslist.getvar('GVL.bStart').value = True
+        offset = adslist.offsets[adslist.getindex('GVL.bStart')]
+
+        with open(self.symbolfile, 'w') as file:
+            file.write(SYMBOLS.replace('mode: W', 'mode: R').replace('type: INT', 'type: DINT') +
+                       '''
+  GVL.nNew:
+    type: INT
+    mode: R
+''')
+
+        plan = adslist.diffsymbols()
+        adslist.applysymbols(plan)
+
+        self.assertEqual((plan['added'], plan['removed'], plan['retyped'], plan['changed']),
+                         (['GVL.nNew'], [], ['GVL.nCounter'], ['GVL.bStart']), 'The differences shall be found.')
+        self.assertEqual(adslist.getvalue(adslist.getindex('GVL.bStart')), True, 'Unchanged layouts shall keep their value.')
+        self.assertEqual(adslist.offsets[adslist.getindex('GVL.bStart')], offset, 'Unchanged layouts shall keep their place.')
+        self.assertEqual(adslist.types[adslist.getindex('GVL.nCounter')].name, 'DINT', 'Retyped symbols shall get the new datatype.')
+        self.assertEqual(adslist.writelist, [], 'The modes shall be applied.')
+        self.assertIsNone(adslist.diffsymbols(), 'An unchanged file shall have no differences.')
+
+
+class Ads_Types_Testcase(unittest2.TestCase):
+    '''
+    Test cases for the TwinCAT datatypes of ADS Vars
+    '''
+
+    def setUp(self):
+        self.registry = Ads_Types(DATATYPES)
+
+    def test_real_array(self):
+
+        adstype = self.registry.get('ARRAY[0..3] OF REAL')
+        buffer = bytearray(adstype.size)
+        adstype.pack_into(buffer, 0, [1.5, 2.5, 3.5, 4.5])
+
+        self.assertEqual(adstype.size, 16, 'The array shall have 4 REAL elements.')
+        self.assertEqual(adstype.unpack_from(buffer), [1.5, 2.5, 3.5, 4.5], 'The array shall be decoded in bulk.')
+
+    def test_string(self):
+
+        adstype = self.registry.get('STRING(5)')
+        buffer = bytearray(adstype.size)
+        adstype.pack_into(buffer, 0, 'abcdefgh')
+
+        self.assertEqual(adstype.size, 6, 'STRING(5) shall include the null terminator.')
+        self.assertEqual(adstype.unpack_from(buffer), 'abcde', 'The string shall be truncated to its length.')
+
+    def test_user_struct(self):
+
+        adstype = self.registry.get('ST_Position')
+        buffer = bytearray(adstype.size)
+        adstype.pack_into(buffer, 0, {'bValid': True, 'x': 2.0, 'aAxis': [3, 4]})
+
+        self.assertEqual(adstype.size, 24, 'The members shall be aligned by pack_mode.')
+        self.assertEqual(adstype.unpack_from(buffer), {'bValid': True, 'x': 2.0, 'aAxis': [3, 4]}, 'The struct shall be decoded to a dict.')
+
+    def test_default_pack_mode(self):
+
+        registry = Ads_Types({'ST_Axis': {'members': {'bValid': 'BOOL', 'x': 'LREAL'}}})
+
+        self.assertEqual(registry.get('ST_Axis').size, 16, 'Structs without pack_mode shall be aligned like TwinCAT 3.')
+
+    def test_unknown_type(self):
+
+        self.assertIsNone(self.registry.get('FB_Unknown'), 'Unknown datatypes shall not be created.')
 